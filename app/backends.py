@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.settings import load_ini
+from app.textnorm import register_sql_functions
+
+# رابط مشترک ذخیره‌سازی. Database (SQLite، پیش‌فرض) و DbapiBackend (هر درایور DB-API 2،
+# مثلاً pyodbc برای Access) آن را پیاده می‌کنند؛ ابزار انتقال فقط از همین متدها استفاده می‌کند.
+
+BACKEND_TYPES = ("sqlite", "access", "dbapi-sqlite")
+ACCESS_DRIVER = "{Microsoft Access Driver (*.mdb, *.accdb)}"
+
+# dialect -> (قالب نام جدول/ستون، صفحه‌بندی با SELECT TOP به جای LIMIT)
+DIALECTS = {
+    "sqlite": ('"{}"', False),
+    "access": ("[{}]", True),
+    "ansi": ('"{}"', False),
+}
+
+class BackendError(Exception):
+    pass
+
+class Backend:
+    dialect = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def quote(self, name):
+        return DIALECTS[self.dialect][0].format(name)
+
+    def _select(self, table, columns, where="", order="", limit=None):
+        top = DIALECTS[self.dialect][1] and limit is not None
+        sql = f"SELECT {f'TOP {int(limit)} ' if top else ''}{','.join(map(self.quote, columns))} FROM {self.quote(table)}"
+        if where:
+            sql += f" WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None and not top:
+            sql += f" LIMIT {int(limit)}"
+        return sql
+
+    def _fetchall(self, sql, args=()):
+        cur = self.conn.cursor()
+        cur.execute(sql, args)
+        return [tuple(r) for r in cur.fetchall()]
+
+    # --- primitives برای انتقال داده ---
+    def columns(self, table):
+        """نام ستون‌های جدول یا None اگر جدول وجود ندارد"""
+        cur = self.conn.cursor()
+        try:
+            cur.execute(f"SELECT * FROM {self.quote(table)} WHERE 1=0")
+        except self.errors:
+            return None
+        return [d[0] for d in cur.description]
+
+    def max_key(self, table, key="id"):
+        return self._fetchall(f"SELECT MAX({self.quote(key)}) FROM {self.quote(table)}")[0][0]
+
+    def read_after(self, table, columns, key, after, limit):
+        """صفحه بعدی به ترتیب key با شرط key > after (keyset؛ بدون OFFSET)"""
+        where = f"{self.quote(key)} > ?" if after is not None else ""
+        sql = self._select(table, columns, where, self.quote(key), limit)
+        return self._fetchall(sql, (after,) if after is not None else ())
+
+    def write_rows(self, table, columns, rows):
+        """درج گروهی؛ داخل with backend.transaction() صدا زده شود"""
+        sql = (f"INSERT INTO {self.quote(table)} ({','.join(map(self.quote, columns))}) "
+               f"VALUES ({','.join('?' * len(columns))})")
+        self.conn.cursor().executemany(sql, rows)
+
+    @contextmanager
+    def bulk_load(self):
+        """محدوده انتقال انبوه؛ پیاده‌سازی‌ها می‌توانند بررسی‌ها را موقتاً کنار بگذارند"""
+        yield self
+
+    # --- فهرست‌ها (بدون FTS؛ Database نسخه سریع‌تر خود را دارد) ---
+    def _list(self, table, columns, search, q, limit, after):
+        # keyset روی id (after آخرین ردیف صفحه قبل)؛ OFFSET در همه پایگاه‌ها (مثلاً Access) نیست
+        where, args = [], []
+        if q:
+            where.append("(" + " OR ".join(f"{self.quote(c)} LIKE ?" for c in search) + ")")
+            args = [f"%{q}%"] * len(search)
+        if after:
+            where.append(f"{self.quote('id')} < ?"); args.append(after[0])
+        return self._fetchall(self._select(table, columns, " AND ".join(where), f"{self.quote('id')} DESC", limit), args)
+
+    def list_customers(self, q=None, limit=None, after=None):
+        return self._list("customers", ("id", "name", "phone", "address"), ("name", "phone", "address"), q, limit, after)
+
+    def list_products(self, q=None, limit=None, after=None):
+        return self._list("products", ("id", "name", "price"), ("name",), q, limit, after)
+
+    def release(self):
+        """بستن اتصال ترد جاری"""
+
+    def close(self):
+        pass
+
+class DbapiBackend(Backend):
+    """آداپتور هر درایور DB-API 2 با paramstyle=qmark؛ یک اتصال برای هر ترد"""
+
+    def __init__(self, module, connect, dialect="ansi", name=""):
+        if getattr(module, "paramstyle", None) != "qmark":
+            raise BackendError(f"{module.__name__}: فقط درایورهای qmark پشتیبانی می‌شوند")
+        self.module = module
+        self.errors = (module.Error,)
+        self.dialect = dialect
+        self.db_name = name
+        self._connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = set()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock:
+                self._all.add(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.conn
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def release(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._all.discard(conn)
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            conns, self._all = self._all, set()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+def access_connection_string(path):
+    return f"DRIVER={ACCESS_DRIVER};DBQ={path};"
+
+def _sqlite_connect(target):
+    conn = sqlite3.connect(target, check_same_thread=False)
+    register_sql_functions(conn)  # تریگرهای FTS فایل‌هایی که هنوز به طرح ۲ ارتقا نیافته‌اند
+    return conn
+
+def open_backend(db_type, target):
+    """db_type مانند settings.ini؛ target مسیر فایل (sqlite) یا connection string/مسیر فایل (access)"""
+    if db_type == "sqlite":
+        from app.db import Database
+        return Database(target)
+    if db_type == "access":
+        try:
+            import pyodbc
+        except ImportError:
+            raise BackendError("برای Access بسته pyodbc و درایور ODBC Access لازم است (pip install pyodbc).")
+        if "=" not in target:
+            target = access_connection_string(target)
+        return DbapiBackend(pyodbc, lambda: pyodbc.connect(target), "access", target)
+    if db_type == "dbapi-sqlite":
+        # همان آداپتور DB-API روی sqlite3؛ برای آزمایش انتقال بدون درایور Access
+        return DbapiBackend(sqlite3, lambda: _sqlite_connect(target), "sqlite", target)
+    raise BackendError(f"نوع پایگاه‌داده ناشناخته: {db_type}")
+
+def configured(values=None):
+    """(db_type, target) از settings.ini"""
+    values = load_ini() if values is None else values
+    db_type = values.get("db_type", "sqlite").strip().lower()
+    if db_type == "access":
+        return db_type, values.get("access.connection_string") or values.get("access.file_path", "")
+    return db_type, values.get("sqlite.db_file", "hesabdari.db")
@@ -0,0 +1,125 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+from urllib.parse import quote
+
+# نسخه پشتیبان آنلاین با sqlite3 backup API: صفحه‌ها در گام‌های کوچک کپی می‌شوند
+# و بین گام‌ها قفل آزاد است؛ در حالت WAL خواندن نسخه پشتیبان نویسنده‌ها را مسدود نمی‌کند.
+
+STEP_PAGES = 256       # صفحه در هر گام (با صفحه 4KB حدود 1MB)
+STEP_SLEEP = 0.005     # ثانیه مکث بین گام‌ها
+MAX_RESTARTS = 3       # اگر نوشتن مداوم باعث شروع دوباره شود، یک‌جا کپی می‌شود
+KEEP = 10
+CHUNK = 1024 * 1024
+
+class _Restarted(Exception):
+    pass
+
+class BackupManager:
+    def __init__(self, db_name, backup_dir=None, keep=KEEP, compress=True):
+        self.db_name = db_name
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(os.path.abspath(db_name)), "backups")
+        self.keep = keep
+        self.compress = compress
+        self.stem = os.path.splitext(os.path.basename(db_name))[0]
+        # فقط نام دقیق {stem}-YYYYmmdd-HHMMSS-label ؛ نسخه‌های co-2 جزو co شمرده نمی‌شوند
+        self._name_re = re.compile(rf"{re.escape(self.stem)}-\d{{8}}-\d{{6}}-.+\.db(\.gz)?")
+
+    def snapshots(self):
+        """فهرست نسخه‌ها از جدید به قدیم"""
+        try:
+            names = os.listdir(self.backup_dir)
+        except FileNotFoundError:
+            return []
+        return sorted((os.path.join(self.backup_dir, n) for n in names if self._name_re.fullmatch(n)), reverse=True)
+
+    def snapshot(self, label="manual", progress=None, rotate=True):
+        """progress(copied_pages, total_pages) ؛ مسیر فایل نسخه را برمی‌گرداند"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = os.path.join(self.backup_dir, f"{self.stem}-{time.strftime('%Y%m%d-%H%M%S')}-{label}.db")
+        final = name + (".gz" if self.compress else "")
+        # هر دو مرحله در فایل .tmp نوشته و در پایان تغییر نام می‌شوند؛ کپی نیمه‌کاره نسخه شمرده نمی‌شود
+        raw, packed = name + ".tmp", final + ".tmp"
+        try:
+            self._copy(raw, progress)
+            if self.compress:
+                with open(raw, "rb") as src, gzip.open(packed, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK)
+                os.replace(packed, final)
+            else:
+                os.replace(raw, final)
+        finally:
+            for tmp in (raw, packed):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        if rotate:
+            self.rotate()
+        return final
+
+    def _copy(self, path, progress):
+        src = sqlite3.connect(self.db_name)
+        try:
+            for attempt in range(MAX_RESTARTS + 1):
+                dst = sqlite3.connect(path)
+                state = {"remaining": None}
+
+                def step(status, remaining, total):
+                    # افزایش remaining یعنی منبع تغییر کرده و کپی از اول شروع شده
+                    if state["remaining"] is not None and remaining > state["remaining"]:
+                        raise _Restarted()
+                    state["remaining"] = remaining
+                    if progress:
+                        progress(total - remaining, total)
+
+                try:
+                    # در آخرین تلاش همه صفحه‌ها در یک گام کپی می‌شوند (در WAL فقط قفل خواندن)
+                    pages = -1 if attempt == MAX_RESTARTS else STEP_PAGES
+                    src.backup(dst, pages=pages, progress=step, sleep=STEP_SLEEP)
+                    return
+                except _Restarted:
+                    continue
+                finally:
+                    dst.close()
+        finally:
+            src.close()
+
+    def rotate(self):
+        for old in self.snapshots()[self.keep:]:
+            os.remove(old)
+
+    def restore(self, snapshot_path, progress=None):
+        """جایگزینی محتوای دیتابیس با یک نسخه؛ پیش از آن از وضعیت فعلی نسخه گرفته می‌شود.
+        progress(copied_pages, total_pages) برای نسخه pre-restore و سپس خود بازیابی"""
+        if not os.path.isfile(snapshot_path):
+            raise FileNotFoundError(f"نسخه پشتیبان پیدا نشد: {snapshot_path}")
+        src_path = snapshot_path
+        if snapshot_path.endswith(".gz"):
+            os.makedirs(self.backup_dir, exist_ok=True)
+            src_path = os.path.join(self.backup_dir, "restore.tmp")
+        try:
+            if src_path != snapshot_path:
+                with gzip.open(snapshot_path, "rb") as src, open(src_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK)
+            # نسخه‌ها تغییر نمی‌کنند؛ immutable فایل‌های -wal/-shm کنار آن نمی‌سازد
+            src = sqlite3.connect(f"file:{quote(os.path.abspath(src_path))}?mode=ro&immutable=1", uri=True)
+            try:
+                # نسخه خراب یا فایل غیر SQLite پیش از دست زدن به دیتابیس رد می‌شود
+                check = src.execute("PRAGMA quick_check").fetchone()[0]
+                if check != "ok":
+                    raise sqlite3.DatabaseError(f"نسخه پشتیبان سالم نیست: {check}")
+                # چرخش تا پایان بازیابی عقب می‌افتد تا خود نسخه انتخاب‌شده حذف نشود
+                self.snapshot("pre-restore", progress=progress, rotate=False)
+                dst = sqlite3.connect(self.db_name, timeout=30)
+                try:
+                    src.backup(dst, progress=progress and (lambda status, remaining, total: progress(total - remaining, total)))
+                finally:
+                    dst.close()
+            finally:
+                src.close()
+        finally:
+            if src_path != snapshot_path and os.path.exists(src_path):
+                os.remove(src_path)
+        self.rotate()
@@ -0,0 +1,207 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from app.textnorm import normalize
+
+# کش فهرست کالا/مشتری برای تکمیل خودکار: ستون‌ها در array/list فشرده، ایندکس پیشوندی
+# (فهرست مرتب نام‌های یکسان‌شده + bisect) و ایندکس سه‌حرفی برای جستجوی میان نام.
+# بارگذاری روی ترد پس‌زمینه انجام می‌شود و تا آماده شدن، پیشنهادها از FTS دیتابیس می‌آیند.
+# با add_customer/add_product همان ردیف اضافه می‌شود؛ تغییرهای انبوه کش را دوباره بارگذاری می‌کنند.
+
+SUGGEST_LIMIT = 20
+POSTING_SCAN = 5000  # سه‌حرفی‌های پرتکرارتر با جستجوی مستقیم در متن پیوسته بررسی می‌شوند
+KINDS = {
+    # kind -> (پرس‌وجو، typecode ستون سوم یا None برای list)
+    "products": ("SELECT id, name, price FROM products ORDER BY id", "d"),
+    "customers": ("SELECT id, name, phone FROM customers ORDER BY id", None),
+}
+
+def _key(text):
+    return normalize(text or "").strip().lower()
+
+def _trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+class Catalog:
+    """suggest(q) -> [(id, name, extra)] ؛ extra قیمت کالا یا تلفن مشتری"""
+
+    def __init__(self, db, kind):
+        self.db = db
+        self.kind = kind
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._version = 0
+        self._loader = None
+        self._grams = None
+        db.subscribe(self._on_change)
+
+    # --- loading ---
+    def load(self):
+        """بارگذاری همزمان (روی ترد فراخوان)"""
+        while True:
+            version = self._version
+            self._load()
+            if version == self._version:
+                break  # در حین بارگذاری تغییری نیامده
+        self._ready.set()
+        self._build_grams()
+
+    def load_async(self):
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._load_in_thread, name=f"catalog-{self.kind}", daemon=True)
+            self._loader.start()
+
+    def _load_in_thread(self):
+        try:
+            self.load()
+        finally:
+            self.db.release()  # اتصال مخصوص این ترد
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def close(self):
+        """پیش از بستن Database: قطع اشتراک و انتظار برای پایان بارگذاری پس‌زمینه"""
+        self.db.unsubscribe(self._on_change)
+        loader = self._loader
+        if loader is not None:
+            loader.join()
+
+    def _load(self):
+        sql, typecode = KINDS[self.kind]
+        rows = self.db.conn.execute(sql).fetchall()
+        ids = array("q", (r[0] for r in rows))
+        names = [r[1] or "" for r in rows]
+        extra = array(typecode, (r[2] or 0 for r in rows)) if typecode else [r[2] or "" for r in rows]
+        del rows
+        norm = [_key(n) for n in names]
+        order = sorted(range(len(norm)), key=norm.__getitem__)
+        # متن پیوسته همه نام‌ها برای جستجوی میانی با str.find؛ starts آغاز هر نام در آن
+        blob = "\n".join(norm) + "\n"
+        starts = array("l", accumulate((len(k) + 1 for k in norm), initial=0))
+        with self._lock:
+            self.ids, self.names, self.extra, self.norm = ids, names, extra, norm
+            self.keys = [norm[i] for i in order]
+            self.order = array("i", order)
+            self.blob, self.starts = blob, starts
+            self._grams = None
+
+    def _build_grams(self):
+        with self._lock:
+            norm = self.norm; n = len(norm)
+        grams = {}
+        for i in range(n):
+            for g in _trigrams(norm[i]):
+                posting = grams.get(g)
+                if posting is None:
+                    posting = grams[g] = array("i")
+                posting.append(i)
+        with self._lock:
+            # ردیف‌هایی که در حین ساخت اضافه شده‌اند
+            for i in range(n, len(self.norm)):
+                for g in _trigrams(self.norm[i]):
+                    grams.setdefault(g, array("i")).append(i)
+            if self.norm is norm:
+                self._grams = grams
+
+    def ready(self):
+        return self._ready.is_set()
+
+    def __len__(self):
+        return len(self.ids) if self.ready() else 0
+
+    # --- invalidation ---
+    def _on_change(self, table, row):
+        if table != self.kind:
+            return
+        with self._lock:
+            self._version += 1
+            if not self.ready():
+                return  # بارگذاری جاری دوباره انجام می‌شود
+            if row is None:
+                self._ready.clear()
+                self.load_async(); return
+            self._append(row[0], row[1], row[2])
+
+    def _append(self, row_id, name, value):
+        i = len(self.ids)
+        self.ids.append(row_id); self.names.append(name or "")
+        self.extra.append(value or (0 if isinstance(self.extra, array) else ""))
+        key = _key(name); self.norm.append(key)
+        pos = bisect_left(self.keys, key)
+        self.keys.insert(pos, key); self.order.insert(pos, i)
+        self.starts.append(self.starts[-1] + len(key) + 1)
+        self.blob += key + "\n"
+        if self._grams is not None:
+            for g in _trigrams(key):
+                self._grams.setdefault(g, array("i")).append(i)
+
+    # --- lookup ---
+    def _row(self, i):
+        return self.ids[i], self.names[i], self.extra[i]
+
+    def get(self, row_id):
+        if not self.ready():
+            return None
+        with self._lock:
+            # شناسه‌ها صعودی بارگذاری و اضافه می‌شوند
+            i = bisect_left(self.ids, row_id)
+            return self._row(i) if i < len(self.ids) and self.ids[i] == row_id else None
+
+    def find(self, name):
+        """اولین ردیف با نام دقیقاً برابر (پس از یکسان‌سازی)"""
+        if not self.ready():
+            return None
+        key = _key(name)
+        with self._lock:
+            pos = bisect_left(self.keys, key)
+            if pos < len(self.keys) and self.keys[pos] == key:
+                return self._row(self.order[pos])
+        return None
+
+    def suggest(self, q, limit=SUGGEST_LIMIT):
+        """ابتدا نام‌هایی که با q شروع می‌شوند، سپس (برای q سه‌حرفی به بالا) نام‌هایی که q را دارند"""
+        key = _key(q)
+        if not key:
+            return []
+        if not self.ready():
+            self.load_async()
+            return [tuple(r[:3]) for r in getattr(self.db, f"list_{self.kind}")(q, limit, 0)]
+        with self._lock:
+            keys, order = self.keys, self.order
+            hits = []
+            pos = bisect_left(keys, key)
+            while pos < len(keys) and len(hits) < limit and keys[pos].startswith(key):
+                hits.append(order[pos]); pos += 1
+            if len(hits) < limit and len(key) >= 3:
+                self._infix(key, hits, limit)
+            return [self._row(i) for i in hits]
+
+    def _infix(self, key, hits, limit):
+        seen = set(hits)
+        if self._grams is not None:
+            postings = [self._grams.get(g) for g in _trigrams(key)]
+            if not all(postings):
+                return
+            smallest = min(postings, key=len)
+            if len(smallest) <= POSTING_SCAN:
+                norm = self.norm
+                for i in smallest:
+                    if i not in seen and key in norm[i]:
+                        hits.append(i)
+                        if len(hits) >= limit:
+                            return
+                return
+        starts, find = self.starts, self.blob.find
+        pos = find(key)
+        while pos >= 0:
+            i = bisect_right(starts, pos) - 1
+            if i not in seen:
+                hits.append(i); seen.add(i)
+                if len(hits) >= limit:
+                    return
+            pos = find(key, starts[i + 1])
@@ -0,0 +1,234 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+
+from app.backends import BACKEND_TYPES, BackendError, configured, open_backend
+from app.backup import KEEP
+from app.db import Database, EXPORT_QUERIES
+from app import perf
+from app.importer import DEFAULT_BATCH, KINDS, import_file, rejects_path
+from app.migrate import CHUNK, WORKERS, MigrationError, migrate
+from app.reports import REPORTS
+from app.workspace import CONSOLIDATED, WorkspaceError, WorkspaceManager, default_path
+
+# رابط خط فرمان بدون وابستگی به ویجت‌های PyQt؛ خروجی‌ها سطر به سطر نوشته می‌شوند
+# تا بتوان آن‌ها را pipe کرد و جدول‌های میلیونی در حافظه بارگذاری نشوند.
+
+class _Writer:
+    def __init__(self, fmt, headers, out=None):
+        self.fmt = fmt; self.headers = list(headers); self.out = out or sys.stdout
+        if fmt == "csv":
+            self._csv = csv.writer(self.out)
+            self._csv.writerow(self.headers)
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+        else:
+            self.out.write(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False))
+            self.out.write("\n")
+
+def _emit(rows, headers, fmt, formatters=None):
+    w = _Writer(fmt, headers)
+    if formatters:
+        for r in rows:
+            w.write([formatters[c](v) if c in formatters else v for c, v in enumerate(r)])
+    else:
+        for r in rows:
+            w.write(r)
+
+# --- subcommands ---
+def cmd_import(db, args):
+    def report(processed, imported, rejected):
+        print(f"\r{processed:,} processed, {imported:,} imported, {rejected:,} rejected", end="", file=sys.stderr)
+    rejects = args.rejects or rejects_path(args.path)
+    imported, rejected = import_file(db, args.kind, args.path, args.batch_size, report, rejects)
+    print(file=sys.stderr)
+    print(json.dumps({"imported": imported, "rejected": rejected}))
+
+def cmd_export(db, args):
+    cur = db.iter_rows(args.table)
+    _emit(cur, [d[0] for d in cur.description], args.format)
+
+def cmd_report(db, args):
+    title, headers, query, formatters = REPORTS[args.kind]
+    _emit(query(db, args.start, args.end), headers, args.format, formatters if args.render else None)
+
+def cmd_consolidated(db, args):
+    manager = WorkspaceManager()
+    try:
+        for path in [db.db_name, *args.others]:
+            if not os.path.exists(path):
+                raise WorkspaceError(f"دیتابیس پیدا نشد: {path}")
+            manager.open(path, activate=False)
+        title, headers, query, formatters = CONSOLIDATED[args.kind]
+        _emit(query(manager, args.start, args.end), headers, args.format, formatters if args.render else None)
+    finally:
+        manager.close_all()
+
+def cmd_pdf(db, args):
+    from app import documents  # QtGui فقط برای این فرمان (بدون پنجره، offscreen)
+    from app.reports import invoices_in_range
+    count = [0]
+    def ids():
+        for r in invoices_in_range(db, args.start, args.end):
+            count[0] += 1
+            yield r[0]
+    if args.out_dir:
+        documents.export_invoices_separately(db, ids(), args.out_dir, workers=args.workers)
+        print(json.dumps({"invoices": count[0], "dir": args.out_dir}))
+    else:
+        documents.export_invoices_pdf(db, ids(), args.out)
+        print(json.dumps({"invoices": count[0], "file": args.out}))
+
+def cmd_backup(db, args):
+    m = db.backups(backup_dir=args.dir, keep=args.keep, compress=not args.no_compress)
+    print(json.dumps({"backup": m.snapshot(args.label)}))
+
+def cmd_restore(db, args):
+    m = db.backups(backup_dir=args.dir)
+    m.restore(args.snapshot)
+    print(json.dumps({"restored": args.snapshot}))
+
+def cmd_backups(db, args):
+    for path in db.backups(backup_dir=args.dir).snapshots():
+        print(path)
+
+def cmd_wipe(db, args):
+    if not args.yes:
+        print("برای پاکسازی کامل --yes را اضافه کنید.", file=sys.stderr)
+        return 2
+    db.wipe_all()
+    print(json.dumps({"wiped": True}))
+
+def cmd_migrate(db, args):
+    if args.source is None:
+        args.from_type, args.source = configured()
+    source = open_backend(args.from_type, args.source)
+    target = open_backend(args.to_type, args.target) if args.target else db
+    checkpoint = args.checkpoint or f"{target.db_name}.migrate.json"
+    def report(table, rows):
+        print(f"\r{table}: {rows:,}".ljust(40), end="", file=sys.stderr)
+    try:
+        copied = migrate(source, target, checkpoint, chunk=args.chunk_size, workers=args.workers, progress=report)
+    finally:
+        print(file=sys.stderr)
+        source.close()
+        if target is not db:
+            target.close()
+    print(json.dumps(copied))
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="python -m app", description="عملیات حسابداری بدون رابط گرافیکی")
+    p.add_argument("--db", help="مسیر فایل دیتابیس (پیش‌فرض: sqlite.db_file در settings.ini، یا hesabdari.db اگر فقط آن هست)")
+    p.add_argument("--perf", action="store_true", help="آمار زمان متدهای دیتابیس در stderr و ثبت پرس‌وجوهای کند")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("import", help="ورود انبوه از CSV/XLSX")
+    s.add_argument("kind", choices=sorted(KINDS))
+    s.add_argument("path")
+    s.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    s.add_argument("--rejects", help="فایل CSV سطرهای رد شده (پیش‌فرض: <ورودی>.rejected.csv)")
+    s.set_defaults(func=cmd_import)
+
+    s = sub.add_parser("export", help="خروجی کامل یک جدول")
+    s.add_argument("table", choices=sorted(EXPORT_QUERIES))
+    s.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    s.set_defaults(func=cmd_export)
+
+    s = sub.add_parser("report", help="گزارش فروش در یک بازه تاریخ (ISO)")
+    s.add_argument("kind", choices=sorted(REPORTS))
+    s.add_argument("--from", dest="start", required=True, type=date.fromisoformat, help="yyyy-mm-dd")
+    s.add_argument("--to", dest="end", required=True, type=date.fromisoformat, help="yyyy-mm-dd")
+    s.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    s.add_argument("--render", action="store_true", help="تاریخ شمسی و مبالغ قالب‌بندی‌شده")
+    s.set_defaults(func=cmd_report)
+
+    s = sub.add_parser("consolidated", help="گزارش تلفیقی چند دفتر (--db و فایل‌های دیگر) با یک پرس‌وجو")
+    s.add_argument("kind", choices=sorted(CONSOLIDATED))
+    s.add_argument("others", nargs="*", metavar="DB", help="فایل‌های دیتابیس دیگر")
+    s.add_argument("--from", dest="start", required=True, type=date.fromisoformat, help="yyyy-mm-dd")
+    s.add_argument("--to", dest="end", required=True, type=date.fromisoformat, help="yyyy-mm-dd")
+    s.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    s.add_argument("--render", action="store_true", help="ماه شمسی و مبالغ قالب‌بندی‌شده")
+    s.set_defaults(func=cmd_consolidated)
+
+    s = sub.add_parser("pdf", help="PDF فاکتورهای یک بازه تاریخ")
+    s.add_argument("--from", dest="start", required=True, type=date.fromisoformat)
+    s.add_argument("--to", dest="end", required=True, type=date.fromisoformat)
+    g = s.add_mutually_exclusive_group(required=True)
+    g.add_argument("--out", help="یک فایل PDF چندصفحه‌ای")
+    g.add_argument("--out-dir", help="هر فاکتور در یک فایل")
+    s.add_argument("--workers", type=int, default=4)
+    s.set_defaults(func=cmd_pdf)
+
+    s = sub.add_parser("backup", help="نسخه پشتیبان آنلاین (فشرده و چرخشی)")
+    s.add_argument("--dir", help="پوشه نسخه‌ها (پیش‌فرض: backups کنار دیتابیس)")
+    s.add_argument("--keep", type=int, default=KEEP)
+    s.add_argument("--label", default="manual")
+    s.add_argument("--no-compress", action="store_true")
+    s.set_defaults(func=cmd_backup)
+
+    s = sub.add_parser("restore", help="بازیابی از یک نسخه پشتیبان")
+    s.add_argument("snapshot")
+    s.add_argument("--dir")
+    s.set_defaults(func=cmd_restore)
+
+    s = sub.add_parser("backups", help="فهرست نسخه‌های پشتیبان")
+    s.add_argument("--dir")
+    s.set_defaults(func=cmd_backups)
+
+    s = sub.add_parser("migrate", help="انتقال همه جدول‌ها بین دو پایگاه‌داده (مثلاً Access -> SQLite)، قابل ادامه")
+    s.add_argument("--from-type", choices=BACKEND_TYPES, default="access")
+    s.add_argument("--from", dest="source", help="مسیر یا connection string مبدأ (پیش‌فرض از settings.ini)")
+    s.add_argument("--to-type", choices=BACKEND_TYPES, default="sqlite")
+    s.add_argument("--to", dest="target", help="مقصد (پیش‌فرض: همان --db)")
+    s.add_argument("--checkpoint", help="فایل پیشرفت (پیش‌فرض: <مقصد>.migrate.json)")
+    s.add_argument("--chunk-size", type=int, default=CHUNK)
+    s.add_argument("--workers", type=int, default=WORKERS)
+    s.set_defaults(func=cmd_migrate)
+
+    s = sub.add_parser("wipe", help="پاکسازی کامل دیتابیس")
+    s.add_argument("--yes", action="store_true")
+    s.set_defaults(func=cmd_wipe)
+    return p
+
+CREATES_DB = ("import", "migrate")  # فقط این فرمان‌ها دیتابیس تازه می‌سازند
+ERRORS = (BackendError, MigrationError, WorkspaceError, sqlite3.Error, OSError, ValueError, RuntimeError)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    path = args.db or default_path()
+    if args.command not in CREATES_DB and not os.path.exists(path):
+        # نام اشتباه در کار زمان‌بندی‌شده نباید بی‌صدا یک دیتابیس خالی بسازد
+        print(f"دیتابیس پیدا نشد: {path}", file=sys.stderr)
+        return 1
+    try:
+        db = Database(path)
+    except (sqlite3.Error, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    monitor = None
+    if args.perf or perf.enabled():
+        monitor = perf.PerfMonitor()
+        monitor.instrument_database(db)
+        monitor.instrument_reports(REPORTS, conn=lambda: db.conn)
+        monitor.instrument_reports(CONSOLIDATED, "consolidated")
+    try:
+        return args.func(db, args) or 0
+    except BrokenPipeError:
+        # خروجی به head و مانند آن pipe شده و زودتر بسته شده است
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except ERRORS as e:
+        # فایل ناموجود، سرستون نامعتبر، بسته نصب‌نشده و ...: پیام به جای traceback
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if monitor is not None:
+            print(monitor.format(), file=sys.stderr)
+        db.close()
@@ -1,82 +1,633 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date as _date
+
+from app.backends import Backend
+from app.pricing import line_amounts, invoice_totals
+from app.settings import Settings
+from app.textnorm import register_sql_functions, fts_query, sql_normalize
+
+# تنظیمات اتصال: WAL تا خواننده‌ها نویسنده را مسدود نکنند، و کش/mmap بزرگ‌تر
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,       # KiB ~ 64MB
+    "mmap_size": 268435456,     # 256MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # ms
+    "foreign_keys": "ON",
+}
+STATEMENT_CACHE = 256  # تعداد دستورهای آماده (prepared) نگه‌داشته‌شده برای هر اتصال
+
+# نسخه طرح دیتابیس (PRAGMA user_version)
+#   1: تاریخ فاکتورها به صورت ISO (yyyy-MM-dd)
+#   2: تریگرهای FTS بدون توابع برنامه (fa_norm/fa_norm_phone)
+#   3: جدول‌های خلاصه WITHOUT ROWID و خلاصه ماهانه مشتری/کالا
+SCHEMA_VERSION = 3
+
+# جدول‌های FTS5 بدون محتوا (contentless) که با تریگر همگام می‌شوند.
+# یکسان‌سازی در تریگرها با replace خود SQLite است، پس هر کلاینت SQLite (بدون
+# register_sql_functions) هم می‌تواند در customers/products بنویسد.
+# table -> [(column, phone?)]
+FTS_TABLES = {
+    "customers": [("name", False), ("phone", True), ("address", False)],
+    "products": [("name", False)],
+}
+
+AGG_TABLES = ("agg_daily", "agg_customer", "agg_product", "agg_customer_month", "agg_product_month")
+TABLES = ("customers", "products", "invoices", "settings", "invoice_items") + AGG_TABLES
+# امتیازدهی (rank) همه نتیجه‌های MATCH را می‌خواند؛ جستجوی با نتیجه بیشتر به ترتیب جدیدترین (rowid) نمایش داده می‌شود
+RANK_LIMIT = 1000
+INDEXES = {
+    "idx_invoices_date": "invoices(date)",
+    "idx_invoices_customer": "invoices(customer_id, date)",
+    "idx_invoice_items_invoice": "invoice_items(invoice_id)",
+    "idx_invoice_items_product": "invoice_items(product_id)",
+}
+
+# جدول‌های خلاصه فروش که با تریگر روی invoices/invoice_items به‌روز می‌مانند.
+# WITHOUT ROWID: ردیف‌های یک بازه روز/ماه پشت هم روی دیسک‌اند و خواندن بازه بدون جستجوی rowid است.
+# گزارش مشتری/کالا ماه‌های کامل بازه را از جدول ماهانه (month = yyyy-MM) و فقط روزهای لبه را از جدول روزانه می‌خواند.
+AGGREGATES = """
+    CREATE TABLE IF NOT EXISTS agg_daily (
+        day TEXT PRIMARY KEY,
+        invoices INTEGER NOT NULL DEFAULT 0, subtotal REAL NOT NULL DEFAULT 0,
+        discount REAL NOT NULL DEFAULT 0, tax REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agg_customer (
+        day TEXT NOT NULL, customer_id INTEGER NOT NULL,
+        invoices INTEGER NOT NULL DEFAULT 0, tax REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, customer_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agg_product (
+        day TEXT NOT NULL, product_id INTEGER NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0, discount REAL NOT NULL DEFAULT 0,
+        tax REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agg_customer_month (
+        month TEXT NOT NULL, customer_id INTEGER NOT NULL,
+        invoices INTEGER NOT NULL DEFAULT 0, tax REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, customer_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agg_product_month (
+        month TEXT NOT NULL, product_id INTEGER NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0, discount REAL NOT NULL DEFAULT 0,
+        tax REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, product_id)
+    ) WITHOUT ROWID;
+"""
+
+# sign: 1 برای درج و -1 برای حذف؛ row: new یا old
+def _agg_invoice_sql(row, sign):
+    return f"""
+        INSERT INTO agg_daily(day,invoices,subtotal,discount,tax,total)
+        VALUES ({row}.date,{sign},{sign}*{row}.subtotal,{sign}*{row}.discount,{sign}*{row}.tax,{sign}*{row}.total)
+        ON CONFLICT(day) DO UPDATE SET invoices=invoices+excluded.invoices, subtotal=subtotal+excluded.subtotal,
+            discount=discount+excluded.discount, tax=tax+excluded.tax, total=total+excluded.total;
+        INSERT INTO agg_customer(day,customer_id,invoices,tax,total)
+        VALUES ({row}.date,coalesce({row}.customer_id,0),{sign},{sign}*{row}.tax,{sign}*{row}.total)
+        ON CONFLICT(day,customer_id) DO UPDATE SET invoices=invoices+excluded.invoices,
+            tax=tax+excluded.tax, total=total+excluded.total;
+        INSERT INTO agg_customer_month(month,customer_id,invoices,tax,total)
+        VALUES (substr({row}.date,1,7),coalesce({row}.customer_id,0),{sign},{sign}*{row}.tax,{sign}*{row}.total)
+        ON CONFLICT(month,customer_id) DO UPDATE SET invoices=invoices+excluded.invoices,
+            tax=tax+excluded.tax, total=total+excluded.total;
+    """
+
+def _agg_item_sql(row, sign):
+    return f"""
+        INSERT INTO agg_product(day,product_id,quantity,discount,tax,total)
+        SELECT i.date,coalesce({row}.product_id,0),{sign}*{row}.quantity,{sign}*{row}.discount,{sign}*{row}.tax,{sign}*{row}.total
+        FROM invoices i WHERE i.id={row}.invoice_id
+        ON CONFLICT(day,product_id) DO UPDATE SET quantity=quantity+excluded.quantity,
+            discount=discount+excluded.discount, tax=tax+excluded.tax, total=total+excluded.total;
+        INSERT INTO agg_product_month(month,product_id,quantity,discount,tax,total)
+        SELECT substr(i.date,1,7),coalesce({row}.product_id,0),{sign}*{row}.quantity,{sign}*{row}.discount,{sign}*{row}.tax,{sign}*{row}.total
+        FROM invoices i WHERE i.id={row}.invoice_id
+        ON CONFLICT(month,product_id) DO UPDATE SET quantity=quantity+excluded.quantity,
+            discount=discount+excluded.discount, tax=tax+excluded.tax, total=total+excluded.total;
+    """
+
+AGG_TRIGGERS = {
+    "invoices_agg_ai": f"AFTER INSERT ON invoices BEGIN {_agg_invoice_sql('new', 1)} END",
+    # ردیف‌ها پیش از سرفاکتور حذف می‌شوند تا تریگر ردیف‌ها هنوز تاریخ فاکتور را ببیند
+    "invoices_agg_bd": f"BEFORE DELETE ON invoices BEGIN DELETE FROM invoice_items WHERE invoice_id=old.id; {_agg_invoice_sql('old', -1)} END",
+    "invoice_items_agg_ai": f"AFTER INSERT ON invoice_items BEGIN {_agg_item_sql('new', 1)} END",
+    "invoice_items_agg_ad": f"AFTER DELETE ON invoice_items BEGIN {_agg_item_sql('old', -1)} END",
+}
+
+# پرس‌وجوهای خروجی کامل جدول‌ها؛ نتیجه به صورت جریانی (cursor) خوانده می‌شود
+EXPORT_QUERIES = {
+    "customers": "SELECT id,name,phone,address FROM customers ORDER BY id",
+    "products": "SELECT id,name,price FROM products ORDER BY id",
+    "invoices": "SELECT id,date,customer_id,customer,subtotal,discount,tax,total FROM invoices ORDER BY id",
+    "invoice_items": "SELECT id,invoice_id,product_id,description,quantity,unit_price,discount,tax,total FROM invoice_items ORDER BY id",
+}
+
+def iso_date(value):
+    """تاریخ فاکتور به شکل ISO؛ date یا رشته yyyy/MM/dd یا yyyy-MM-dd"""
+    if isinstance(value, _date):
+        return value.isoformat()
+    return str(value).strip().replace("/", "-")
+
+def _norm_expr(col, phone):
+    return sql_normalize(col, phone)
+
+class ConnectionManager:
+    """یک اتصال تنظیم‌شده برای هر ترد، به همراه API تراکنش"""
+
+    def __init__(self, db_name, pragmas=PRAGMAS, cached_statements=STATEMENT_CACHE):
+        self.db_name = db_name
+        self.pragmas = dict(pragmas)
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = set()
+        self._hooks = []
+        # پایگاه داده حافظه‌ای بین اتصال‌ها مشترک نیست؛ یک اتصال برای همه تردها
+        self._shared = self._open() if db_name == ":memory:" else None
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_name, isolation_level=None, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for key, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {key}={value}")
+        register_sql_functions(conn)
+        with self._lock:
+            self._all.add(conn)
+            hooks = list(self._hooks)
+        for hook in hooks:
+            hook(conn)
+        return conn
+
+    def add_hook(self, hook):
+        """hook(conn) روی اتصال‌های باز و هر اتصالی که بعداً ساخته شود اجرا می‌شود"""
+        with self._lock:
+            self._hooks.append(hook)
+            conns = list(self._all)
+        for conn in conns:
+            hook(conn)
+
+    def connection(self):
+        if self._shared is not None:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate=True):
+        """تراکنش صریح؛ تراکنش‌های تو در تو به تراکنش بیرونی می‌پیوندند"""
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            self._local.after_commit = []
+            raise
+        conn.commit()
+        pending, self._local.after_commit = getattr(self._local, "after_commit", []), []
+        for fn in pending:
+            fn()
+
+    def after_commit(self, fn):
+        """fn پس از commit تراکنش جاری این ترد (با rollback کنار می‌رود)؛ بیرون از تراکنش بی‌درنگ"""
+        if not self.connection().in_transaction:
+            fn(); return
+        pending = getattr(self._local, "after_commit", None)
+        if pending is None:
+            pending = self._local.after_commit = []
+        pending.append(fn)
+
+    def dedicated(self):
+        """اتصال جدا از اتصال ترد (مثلاً برای cursor صفحه‌ای طولانی)؛ با discard بسته می‌شود"""
+        return self._shared if self._shared is not None else self._open()
+
+    def discard(self, conn):
+        if conn is self._shared:
+            return
+        with self._lock:
+            self._all.discard(conn)
+        conn.close()
+
+    def release(self):
+        """بستن اتصال ترد جاری (مثلاً هنگام پایان یک ترد کارگر)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._all.discard(conn)
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            conns, self._all = self._all, set()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+        self._shared = None
+
+class Database(Backend):
+    """پیاده‌سازی SQLite (پیش‌فرض) رابط Backend، به همراه FTS، جدول‌های خلاصه و گزارش‌ها"""
 
-class Database:
     def __init__(self, db_name="hesabdari.db"):
         self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+        self.pool = ConnectionManager(db_name)
+        self._listeners = []
         self.create_tables()
+        self.settings = Settings(self)
+
+    @property
+    def conn(self):
+        return self.pool.connection()
+
+    def transaction(self):
+        return self.pool.transaction()
 
     def create_tables(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, phone TEXT, address TEXT
-            )
+        # طرح کامل فقط با خواندن بررسی می‌شود تا باز کردن برنامه پشت ورود داده یا
+        # مهاجرتی که قفل نوشتن را گرفته نماند؛ BEGIN IMMEDIATE فقط وقتی DDL لازم است
+        if self._schema_ready(self.conn):
+            self.has_fts = self._create_fts()
+            return
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS customers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT, phone TEXT, address TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT, price REAL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS invoices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    customer TEXT, date TEXT, subtotal REAL, tax REAL, total REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY, value TEXT
+                )
+            """)
+            self._migrate_invoices(conn)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS invoice_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    invoice_id INTEGER NOT NULL REFERENCES invoices(id),
+                    product_id INTEGER REFERENCES products(id),
+                    description TEXT, quantity REAL, unit_price REAL,
+                    discount REAL DEFAULT 0, tax REAL DEFAULT 0, total REAL DEFAULT 0
+                )
+            """)
+            for name, on in INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {on}")
+            self._create_aggregates(conn)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._upgrade(conn, version)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self.has_fts = self._create_fts()
+
+    def _schema_ready(self, conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            return False
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+        if not names.issuperset(TABLES) or not names.issuperset(INDEXES) or not names.issuperset(AGG_TRIGGERS):
+            return False
+        return {"customer_id", "discount"} <= {r[1] for r in conn.execute("PRAGMA table_info(invoices)")}
+
+    def _upgrade(self, conn, version):
+        if version < 1:
+            # تاریخ‌های yyyy/MM/dd قابل پرس‌وجوی بازه‌ای نیستند؛ تبدیل به ISO
+            # (جدول‌های خلاصه در گام 3 از نو ساخته می‌شوند)
+            conn.execute("UPDATE invoices SET date=replace(date,'/','-') WHERE date LIKE '____/__/__'")
+        if version < 2:
+            # تریگرهای قدیمی به fa_norm نیاز داشتند؛ _create_fts آن‌ها را دوباره می‌سازد
+            # (محتوای ایندکس یکسان است و بازسازی نمی‌خواهد)
+            self._drop_fts_triggers(conn)
+        if version < 3:
+            # جدول rowid به WITHOUT ROWID تبدیل نمی‌شود؛ حذف و از روی فاکتورها دوباره ساخته می‌شوند
+            self._drop_aggregate_triggers(conn)
+            for table in AGG_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._create_aggregates(conn)
+
+    def _migrate_invoices(self, conn):
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(invoices)")}
+        if "customer_id" not in cols:
+            conn.execute("ALTER TABLE invoices ADD COLUMN customer_id INTEGER REFERENCES customers(id)")
+        if "discount" not in cols:
+            conn.execute("ALTER TABLE invoices ADD COLUMN discount REAL DEFAULT 0")
+
+    # --- sales aggregates ---
+    def _create_aggregates(self, conn):
+        existed = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='agg_daily'").fetchone()
+        for stmt in AGGREGATES.split(";"):
+            if stmt.strip():
+                conn.execute(stmt)
+        for name, body in AGG_TRIGGERS.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        if not existed:
+            self._rebuild_aggregates(conn)
+
+    def _drop_aggregate_triggers(self, conn):
+        for name in AGG_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def _rebuild_aggregates(self, conn):
+        for table in AGG_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("""
+            INSERT INTO agg_daily(day,invoices,subtotal,discount,tax,total)
+            SELECT date, count(*), total(subtotal), total(discount), total(tax), total(total)
+            FROM invoices GROUP BY date
+        """)
+        conn.execute("""
+            INSERT INTO agg_customer(day,customer_id,invoices,tax,total)
+            SELECT date, coalesce(customer_id,0), count(*), total(tax), total(total)
+            FROM invoices GROUP BY date, coalesce(customer_id,0)
         """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, price REAL DEFAULT 0
-            )
+        conn.execute("""
+            INSERT INTO agg_product(day,product_id,quantity,discount,tax,total)
+            SELECT i.date, coalesce(it.product_id,0), total(it.quantity), total(it.discount), total(it.tax), total(it.total)
+            FROM invoice_items it JOIN invoices i ON i.id = it.invoice_id
+            GROUP BY i.date, coalesce(it.product_id,0)
         """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS invoices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer TEXT, date TEXT, subtotal REAL, tax REAL, total REAL
-            )
+        # ماهانه از روی خلاصه روزانه (ردیف‌های کمتر از خود فاکتورها)
+        conn.execute("""
+            INSERT INTO agg_customer_month(month,customer_id,invoices,tax,total)
+            SELECT substr(day,1,7), customer_id, sum(invoices), total(tax), total(total)
+            FROM agg_customer GROUP BY 1, 2
         """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY, value TEXT
-            )
+        conn.execute("""
+            INSERT INTO agg_product_month(month,product_id,quantity,discount,tax,total)
+            SELECT substr(day,1,7), product_id, total(quantity), total(discount), total(tax), total(total)
+            FROM agg_product GROUP BY 1, 2
         """)
-        self.conn.commit()
+
+    def rebuild_aggregates(self):
+        with self.transaction() as conn:
+            self._rebuild_aggregates(conn)
+
+    # --- Backend: انتقال انبوه ---
+    def write_rows(self, table, columns, rows):
+        if table == "invoices" and "date" in columns:
+            i = columns.index("date")
+            rows = [r[:i] + (iso_date(r[i]) if r[i] is not None else None,) + r[i + 1:] for r in rows]
+        super().write_rows(table, columns, rows)
+
+    @contextmanager
+    def bulk_load(self):
+        """کلید خارجی موقتاً خاموش (ترتیب رسیدن جدول‌ها آزاد است) و در پایان بازسازی خلاصه‌ها"""
+        conn = self.conn
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            yield self
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+        self.rebuild_aggregates()
+        self.settings.reload()
+        self.notify("customers"); self.notify("products")
+
+    def release(self):
+        self.pool.release()
+
+    # --- full-text search ---
+    def _fts_ready(self, conn):
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+        return all({f"{t}_fts", f"{t}_fts_ai", f"{t}_fts_ad", f"{t}_fts_au"} <= names for t in FTS_TABLES)
+
+    def _create_fts(self):
+        if self._fts_ready(self.conn):
+            return True
+        try:
+            with self.transaction() as conn:
+                for table, cols in FTS_TABLES.items():
+                    fts = f"{table}_fts"
+                    exists = conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)).fetchone()
+                    names = ",".join(c for c, _ in cols)
+                    conn.execute(f"""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                            {names}, content='', prefix='2 3',
+                            tokenize='unicode61 remove_diacritics 2'
+                        )
+                    """)
+                    new_vals = ",".join(_norm_expr(f"new.{c}", phone) for c, phone in cols)
+                    old_vals = ",".join(_norm_expr(f"old.{c}", phone) for c, phone in cols)
+                    insert = f"INSERT INTO {fts}(rowid,{names}) VALUES (new.id,{new_vals});"
+                    delete = f"INSERT INTO {fts}({fts},rowid,{names}) VALUES ('delete',old.id,{old_vals});"
+                    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN {insert} END")
+                    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN {delete} END")
+                    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END")
+                    if not exists:
+                        src_vals = ",".join(_norm_expr(c, phone) for c, phone in cols)
+                        conn.execute(f"INSERT INTO {fts}(rowid,{names}) SELECT id,{src_vals} FROM {table}")
+            return True
+        except sqlite3.OperationalError as e:
+            if "no such module: fts5" not in str(e):
+                raise
+            # SQLite بدون FTS5 ساخته شده؛ جستجو با LIKE انجام می‌شود
+            return False
+
+    def _drop_fts_triggers(self, conn):
+        for table in FTS_TABLES:
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+
+    def _drop_fts(self, conn):
+        self._drop_fts_triggers(conn)
+        for table in FTS_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+    def _search_fts(self, table, columns, q, limit, after):
+        """after: آخرین ردیف صفحه قبل (keyset)؛ صفحه بعدی بدون OFFSET از همان‌جا ادامه می‌دهد"""
+        match = fts_query(q) if self.has_fts else None
+        if match is None:
+            return None
+        fts, cols = f"{table}_fts", ",".join("t." + c for c in columns)
+        page, args = ("LIMIT ?", [limit]) if limit is not None else ("", [])
+        conn = self.conn
+        try:
+            broad = conn.execute(f"SELECT count(*) FROM (SELECT 1 FROM {fts} WHERE {fts} MATCH ? LIMIT ?)",
+                                 (match, RANK_LIMIT + 1)).fetchone()[0] > RANK_LIMIT
+            if broad:
+                key = "AND rowid < ?" if after else ""
+                return conn.execute(f"""
+                    SELECT {cols} FROM (SELECT rowid FROM {fts} WHERE {fts} MATCH ? {key} ORDER BY rowid DESC {page}) f
+                    JOIN {table} t ON t.id = f.rowid ORDER BY f.rowid DESC
+                """, [match] + ([after[0]] if after else []) + args).fetchall()
+            key = ""
+            if after:
+                # rank ردیف آخر دوباره محاسبه می‌شود (حداکثر RANK_LIMIT نتیجه)
+                key = f"WHERE (rank, rowid) > ((SELECT rank FROM {fts} WHERE {fts} MATCH ?1 AND rowid = ?2), ?2)"
+                args = [after[0]] + args
+            return conn.execute(f"""
+                SELECT {cols}
+                FROM (SELECT rowid, rank FROM (SELECT rowid, rank FROM {fts} WHERE {fts} MATCH ?1) {key}
+                      ORDER BY rank, rowid {page}) f
+                JOIN {table} t ON t.id = f.rowid ORDER BY f.rank, f.rowid
+            """, [match] + args).fetchall()
+        except sqlite3.OperationalError as e:
+            if "interrupt" in str(e):
+                raise
+            return None
+
+    # --- change notification ---
+    def subscribe(self, listener):
+        """listener(table, row) پس از افزودن مشتری/کالا؛ row=None یعنی جدول به صورت انبوه تغییر کرده"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def notify(self, table, row=None):
+        """داخل تراکنش، listener ها پس از commit صدا زده می‌شوند تا اتصال‌های دیگر (مثلاً
+        بارگذاری Catalog روی ترد خودش) داده ثبت‌شده را ببینند"""
+        self.pool.after_commit(lambda: self._notify(table, row))
+
+    def _notify(self, table, row):
+        for listener in list(self._listeners):
+            listener(table, row)
 
     # --- CRUD helpers ---
     def add_customer(self, name, phone, address):
-        self.cursor.execute("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", (name, phone, address))
-        self.conn.commit()
+        row_id = self.conn.execute("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", (name, phone, address)).lastrowid
+        self.notify("customers", (row_id, name, phone, address))
+        return row_id
 
     def add_product(self, name, price):
-        self.cursor.execute("INSERT INTO products (name, price) VALUES (?,?)", (name, price))
-        self.conn.commit()
+        row_id = self.conn.execute("INSERT INTO products (name, price) VALUES (?,?)", (name, price)).lastrowid
+        self.notify("products", (row_id, name, price))
+        return row_id
+
+    # --- bulk insert (داخل with db.transaction() صدا زده شود) ---
+    def add_customers_many(self, rows):
+        self.conn.executemany("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", rows)
+        self.notify("customers")
+
+    def add_products_many(self, rows):
+        self.conn.executemany("INSERT INTO products (name, price) VALUES (?,?)", rows)
+        self.notify("products")
 
-    def list_customers(self, q=None):
+    # after: آخرین ردیف صفحه قبل؛ صفحه‌بندی keyset روی id به جای OFFSET که همه ردیف‌های قبلی را می‌خواند
+    def list_customers(self, q=None, limit=None, after=None):
         if q:
-            self.cursor.execute("SELECT id,name,phone,address FROM customers WHERE name LIKE ? OR phone LIKE ? OR address LIKE ? ORDER BY id DESC",
-                                (f"%{q}%", f"%{q}%", f"%{q}%"))
-        else:
-            self.cursor.execute("SELECT id,name,phone,address FROM customers ORDER BY id DESC")
-        return self.cursor.fetchall()
+            rows = self._search_fts("customers", ("id", "name", "phone", "address"), q, limit, after)
+            if rows is not None:
+                return rows
+        return self._list("SELECT id,name,phone,address FROM customers", ("name", "phone", "address") if q else (), q, limit, after)
 
-    def list_products(self, q=None):
+    def list_products(self, q=None, limit=None, after=None):
         if q:
-            self.cursor.execute("SELECT id,name,price FROM products WHERE name LIKE ? ORDER BY id DESC", (f"%{q}%",))
-        else:
-            self.cursor.execute("SELECT id,name,price FROM products ORDER BY id DESC")
-        return self.cursor.fetchall()
+            rows = self._search_fts("products", ("id", "name", "price"), q, limit, after)
+            if rows is not None:
+                return rows
+        return self._list("SELECT id,name,price FROM products", ("name",) if q else (), q, limit, after)
+
+    def _list(self, select, search, q, limit, after):
+        where, args = [], []
+        if search:
+            where.append("(" + " OR ".join(f"{c} LIKE ?" for c in search) + ")"); args += [f"%{q}%"] * len(search)
+        if after:
+            where.append("id < ?"); args.append(after[0])
+        sql = select + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"; args.append(limit)
+        return self.conn.execute(sql, args).fetchall()
 
     def save_invoice_basic(self, customer, date, subtotal, tax, total):
-        self.cursor.execute("INSERT INTO invoices (customer,date,subtotal,tax,total) VALUES (?,?,?,?,?)",
-                            (customer, date, subtotal, tax, total))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        return self.conn.execute("INSERT INTO invoices (customer,date,subtotal,tax,total) VALUES (?,?,?,?,?)",
+                                 (customer, iso_date(date), subtotal, tax, total)).lastrowid
+
+    def find_customer_id(self, name):
+        row = self.conn.execute("SELECT id FROM customers WHERE name=? ORDER BY id LIMIT 1", (name,)).fetchone()
+        return row[0] if row else None
+
+    def add_invoice(self, date, items, customer_id=None, customer_name=None, vat_percent=0):
+        """ثبت فاکتور با ردیف‌ها؛ items: [(product_id, quantity, unit_price, discount_pct), ...]"""
+        lines = [(pid, qty, price, line_amounts(qty, price, disc, vat_percent)) for pid, qty, price, disc in items]
+        subtotal, discount, tax, total = invoice_totals(l[3] for l in lines)
+        with self.transaction() as conn:
+            if customer_name is None and customer_id is not None:
+                row = conn.execute("SELECT name FROM customers WHERE id=?", (customer_id,)).fetchone()
+                customer_name = row[0] if row else None
+            inv_id = conn.execute(
+                "INSERT INTO invoices (customer,customer_id,date,subtotal,discount,tax,total) VALUES (?,?,?,?,?,?,?)",
+                (customer_name, customer_id, iso_date(date), float(subtotal), float(discount), float(tax), float(total))).lastrowid
+            conn.executemany("""
+                INSERT INTO invoice_items (invoice_id,product_id,description,quantity,unit_price,discount,tax,total)
+                VALUES (?,?,(SELECT name FROM products WHERE id=?),?,?,?,?,?)
+            """, [(inv_id, pid, pid, float(qty), float(price), float(d), float(t), float(n))
+                  for pid, qty, price, (g, d, t, n) in lines])
+        return inv_id
+
+    def get_invoice(self, invoice_id):
+        """(header, items)؛ header: (id, date, customer, subtotal, discount, tax, total)"""
+        conn = self.conn
+        header = conn.execute("SELECT id,date,customer,subtotal,discount,tax,total FROM invoices WHERE id=?",
+                              (invoice_id,)).fetchone()
+        if header is None:
+            return None, []
+        items = conn.execute("""
+            SELECT description,quantity,unit_price,discount,tax,total FROM invoice_items
+            WHERE invoice_id=? ORDER BY id
+        """, (invoice_id,)).fetchall()
+        return header, items
+
+    def delete_invoice(self, invoice_id):
+        self.conn.execute("DELETE FROM invoices WHERE id=?", (invoice_id,))
+
+    def iter_rows(self, kind, arraysize=1000):
+        """cursor روی کل جدول برای خروجی؛ نام ستون‌ها در cursor.description"""
+        cur = self.conn.execute(EXPORT_QUERIES[kind])
+        cur.arraysize = arraysize
+        return cur
 
     def get_setting(self, key, default=None):
-        self.cursor.execute("SELECT value FROM settings WHERE key=?", (key,))
-        row = self.cursor.fetchone()
-        return row[0] if row else default
+        return self.settings.get(key, default)
 
     def set_setting(self, key, value):
-        self.cursor.execute("INSERT INTO settings(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, value))
-        self.conn.commit()
+        """در کش اعمال می‌شود؛ ذخیره با settings.flush() (در close خودکار)"""
+        self.settings.set(key, value)
+
+    def backups(self, **kwargs):
+        from app.backup import BackupManager
+        return BackupManager(self.db_name, **kwargs)
 
-    def wipe_all(self):
-        self.cursor.execute("DELETE FROM customers")
-        self.cursor.execute("DELETE FROM products")
-        self.cursor.execute("DELETE FROM invoices")
-        self.conn.commit()
+    def wipe_all(self, snapshot=True):
+        if snapshot and self.db_name != ":memory:":
+            self.backups().snapshot("pre-wipe")
+        with self.transaction() as conn:
+            # حذف ردیف‌به‌ردیف از ایندکس FTS و جدول‌های خلاصه کند است؛
+            # تریگرها را کنار گذاشته، همه را خالی و دوباره می‌سازیم
+            if self.has_fts:
+                self._drop_fts(conn)
+            self._drop_aggregate_triggers(conn)
+            conn.execute("DELETE FROM invoice_items")
+            conn.execute("DELETE FROM invoices")
+            conn.execute("DELETE FROM customers")
+            conn.execute("DELETE FROM products")
+            for table in AGG_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            self._create_aggregates(conn)
+        if self.has_fts:
+            self.has_fts = self._create_fts()
+        self.notify("customers"); self.notify("products")
 
     def close(self):
-        self.conn.close()
+        self.settings.flush()
+        self.pool.close()
@@ -0,0 +1,329 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html import escape
+from string import Template
+
+from PyQt6.QtCore import Qt, QBuffer, QIODevice, QMarginsF, QRectF, QSizeF
+from PyQt6.QtGui import (
+    QColor, QFont, QGuiApplication, QImage, QImageWriter, QPageLayout, QPageSize, QPainter, QPdfWriter,
+    QTextDocument, QTextOption
+)
+
+from app.jalali import format_iso
+from app.reports import fmt_money, fmt_qty
+
+# رندر برداری فاکتور/گزارش مستقیم از داده (بدون نیاز به پنجره یا QtPrintSupport)
+
+RESOLUTION = 96  # چیدمان با همان DPI صفحه؛ متن در PDF برداری می‌ماند
+MARGINS_MM = QMarginsF(12, 12, 12, 12)
+FONT_FAMILIES = ["Vazirmatn", "Tahoma", "Segoe UI", "DejaVu Sans"]
+BATCH_WORKERS = min(8, os.cpu_count() or 1)
+# خروجی تصویر: پسوند -> فرمت QImageWriter؛ کیفیت فقط برای فرمت‌های با اتلاف
+IMAGE_FORMATS = {"png": "png", "jpg": "jpeg", "jpeg": "jpeg", "webp": "webp"}
+LOSSY_FORMATS = {"jpeg", "webp"}
+IMAGE_DPI = 150
+IMAGE_QUALITY = 90
+TILE_PX = 4096  # بیشترین ارتفاع هر تکه؛ سند بلندتر در چند فایل name-1.png, name-2.png, ...
+IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+
+_app = None
+
+def ensure_gui_app():
+    """برای اجرای بدون پنجره (CLI/سرور) یک QGuiApplication با پلتفرم offscreen می‌سازد"""
+    global _app
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _app = QGuiApplication([])
+    return QGuiApplication.instance()
+
+@lru_cache(maxsize=8)
+def _font(size):
+    f = QFont(); f.setFamilies(FONT_FAMILIES); f.setPointSizeF(size)
+    return f
+
+STYLE = """
+    body { font-size: 10pt; }
+    h1 { font-size: 16pt; margin: 0; }
+    table.lines { border-collapse: collapse; margin-top: 8px; }
+    table.lines th { background: #e8ebf5; padding: 4px; border: 1px solid #9aa3bd; }
+    table.lines td { padding: 4px; border: 1px solid #c3c8d8; }
+    td.num { text-align: left; }
+    .muted { color: #555; }
+"""
+
+INVOICE_TEMPLATE = Template("""
+<body dir="rtl">
+<table width="100%"><tr>
+  <td><h1>$company</h1><div class="muted">$company_address<br/>$company_phone</div></td>
+  <td align="left"><b>فاکتور شماره $id</b><br/>تاریخ: $date</td>
+</tr></table>
+<p>مشتری: <b>$customer</b></p>
+<table class="lines" width="100%">
+<tr><th>#</th><th>شرح کالا</th><th>تعداد</th><th>قیمت واحد</th><th>تخفیف</th><th>مالیات</th><th>مبلغ</th></tr>
+$rows
+</table>
+<table width="100%" style="margin-top: 10px;">
+<tr><td width="70%"></td><td>جمع جزء</td><td class="num">$subtotal</td></tr>
+<tr><td></td><td>تخفیف</td><td class="num">$discount</td></tr>
+<tr><td></td><td>مالیات</td><td class="num">$tax</td></tr>
+<tr><td></td><td><b>جمع کل ($currency)</b></td><td class="num"><b>$total</b></td></tr>
+</table>
+</body>
+""")
+
+def company_info(db):
+    get = db.get_setting
+    return {
+        "company": get("company_name_fa", ""),
+        "company_address": get("company_address_fa", ""),
+        "company_phone": get("company_phone", ""),
+        "currency": get("currency_symbol", "ریال"),
+    }
+
+def invoice_html(header, items, company):
+    inv_id, date, customer, subtotal, discount, tax, total = header
+    rows = "".join(
+        f"<tr><td>{i}</td><td>{escape(desc or '')}</td><td class='num'>{fmt_qty(qty)}</td>"
+        f"<td class='num'>{fmt_money(price)}</td><td class='num'>{fmt_money(disc)}</td>"
+        f"<td class='num'>{fmt_money(t)}</td><td class='num'>{fmt_money(n)}</td></tr>"
+        for i, (desc, qty, price, disc, t, n) in enumerate(items, start=1))
+    return INVOICE_TEMPLATE.substitute(
+        {k: escape(str(v)) for k, v in company.items()},
+        id=inv_id, date=format_iso(date), customer=escape(customer or ""), rows=rows,
+        subtotal=fmt_money(subtotal), discount=fmt_money(discount), tax=fmt_money(tax), total=fmt_money(total))
+
+def report_html(title, headers, rows, formatters=None):
+    formatters = formatters or {}
+    head = "".join(f"<th>{escape(h)}</th>" for h in headers)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{escape(formatters.get(c, str)(v) if v is not None else '')}</td>"
+                         for c, v in enumerate(r)) + "</tr>"
+        for r in rows)
+    return (f'<body dir="rtl"><h1>{escape(title)}</h1>'
+            f'<table class="lines" width="100%"><tr>{head}</tr>{body}</table></body>')
+
+# --- rendering ---
+def page_layout():
+    return QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Portrait,
+                       MARGINS_MM, QPageLayout.Unit.Millimeter)
+
+def _new_writer(path):
+    writer = QPdfWriter(path)
+    writer.setResolution(RESOLUTION)
+    writer.setPageLayout(page_layout())
+    writer.setCreator("Hesabdari")
+    return writer
+
+def _document(html, page_size=None):
+    doc = QTextDocument()
+    doc.setDefaultFont(_font(10))
+    opt = QTextOption(); opt.setTextDirection(Qt.LayoutDirection.RightToLeft)
+    doc.setDefaultTextOption(opt)
+    doc.setDefaultStyleSheet(STYLE)
+    doc.setHtml(html)
+    if page_size is not None:
+        doc.setPageSize(page_size)
+    return doc
+
+def _paint_pages(painter, device, doc, first):
+    h = doc.pageSize().height(); w = doc.pageSize().width()
+    for page in range(doc.pageCount()):
+        if not (first and page == 0):
+            device.newPage()
+        painter.save()
+        painter.translate(0, -page * h)
+        doc.drawContents(painter, QRectF(0, page * h, w, h))
+        painter.restore()
+
+def _render_pages(device, html_pages):
+    """هر HTML از صفحه جدید روی device (QPdfWriter یا QPrinter) با صفحه‌بندی همان سند"""
+    # چیدمان همیشه با RESOLUTION (مانند PDF)؛ برای چاپگر با DPI دیگر فقط painter بزرگ‌نمایی می‌شود
+    page_size = QSizeF(device.pageLayout().paintRectPixels(RESOLUTION).size())
+    painter = QPainter(device)
+    scale = device.resolution() / RESOLUTION
+    painter.scale(scale, scale)
+    try:
+        first = True
+        for html in html_pages:
+            _paint_pages(painter, device, _document(html, page_size), first)
+            first = False
+    finally:
+        painter.end()
+
+def render_pdf(html_pages, path):
+    """هر HTML از صفحه جدید شروع می‌شود؛ همه در یک فایل PDF"""
+    ensure_gui_app()
+    _render_pages(_new_writer(path), html_pages)
+    return path
+
+def print_pages(html_pages, printer):
+    """همان صفحه‌های PDF روی QPrinter (چاپ یا پیش‌نمایش چاپ)، نه تصویر پنجره"""
+    _render_pages(printer, html_pages)
+
+def _invoice_pages(db, invoice_ids, company):
+    for inv_id in invoice_ids:
+        header, items = db.get_invoice(inv_id)
+        if header is not None:
+            yield invoice_html(header, items, company)
+
+def export_invoices_pdf(db, invoice_ids, path):
+    """چند فاکتور در یک PDF چندصفحه‌ای"""
+    return render_pdf(_invoice_pages(db, invoice_ids, company_info(db)), path)
+
+def export_invoices_separately(db, invoice_ids, out_dir, workers=BATCH_WORKERS, progress=None):
+    """هر فاکتور در فایل جدا (invoice-<id>.pdf) روی چند ترد؛ خروجی تعداد فایل‌ها.
+
+    داده‌ها در ترد فراخوان خوانده می‌شوند و حداکثر workers*4 کار در صف می‌ماند
+    تا حافظه با تعداد فاکتورها رشد نکند.
+    """
+    ensure_gui_app()
+    os.makedirs(out_dir, exist_ok=True)
+    company = company_info(db)
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for inv_id in invoice_ids:
+            header, items = db.get_invoice(inv_id)
+            if header is None:
+                continue
+            path = os.path.join(out_dir, f"invoice-{inv_id}.pdf")
+            pending.append(pool.submit(render_pdf, [invoice_html(header, items, company)], path))
+            if len(pending) >= workers * 4:
+                pending.pop(0).result(); done += 1
+                if progress: progress(done)
+        for f in pending:
+            f.result(); done += 1
+            if progress: progress(done)
+    return done
+
+# --- image export ---
+class ImageCache:
+    """خروجی کدشده آخرین تصویرها با کلید hash سند و تنظیمات؛ با بودجه بایت (LRU)"""
+
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            tiles = self._items.get(key)
+            if tiles is not None:
+                self._items.move_to_end(key)
+            return tiles
+
+    def put(self, key, tiles):
+        size = sum(map(len, tiles))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= sum(map(len, old))
+            self._items[key] = tiles; self.size += size
+            while self.size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.size -= sum(map(len, dropped))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear(); self.size = 0
+
+image_cache = ImageCache()
+
+def image_formats():
+    """پسوندهایی که افزونه تصویر Qt این سیستم می‌تواند بنویسد (webp ممکن است نباشد)"""
+    ensure_gui_app()
+    supported = {bytes(f).decode() for f in QImageWriter.supportedImageFormats()}
+    return [ext for ext, fmt in IMAGE_FORMATS.items() if fmt in supported]
+
+def image_format(path):
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext not in IMAGE_FORMATS:
+        raise ValueError(f"فرمت تصویر پشتیبانی نمی‌شود: {ext or path}")
+    return IMAGE_FORMATS[ext]
+
+def _encode(image, fmt, quality):
+    buf = QBuffer(); buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    writer = QImageWriter(buf, fmt.encode())
+    if fmt in LOSSY_FORMATS:
+        writer.setQuality(quality)
+    if not writer.write(image):
+        raise OSError(writer.errorString())
+    return bytes(buf.data())
+
+def render_image_tiles(html, fmt="png", dpi=IMAGE_DPI, quality=IMAGE_QUALITY, workers=BATCH_WORKERS):
+    """سند با عرض صفحه A4 و بدون شکستن صفحه، با DPI داده‌شده؛ [bytes] هر تکه.
+
+    تکه‌ها (حداکثر TILE_PX پیکسل ارتفاع) پشت سر هم رسم و روی چند ترد کد می‌شوند؛
+    حداکثر workers*2 تکه کدنشده در حافظه می‌ماند.
+    """
+    ensure_gui_app()
+    scale = dpi / RESOLUTION
+    width = page_layout().paintRectPixels(RESOLUTION).width()
+    tile = TILE_PX / scale
+    doc = _document(html)
+    doc.setTextWidth(width)
+    if doc.size().height() > tile:
+        # صفحه‌بندی با ارتفاع تکه تا مرز تکه‌ها سطرها را نبرد
+        doc.setPageSize(QSizeF(width, tile))
+    height = doc.documentLayout().blockBoundingRect(doc.lastBlock()).bottom() + doc.documentMargin()
+    dpm = round(dpi / 0.0254)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        tiles, pending = [], []
+        top = 0.0
+        while top < height:
+            h = min(tile, height - top)
+            image = QImage(max(1, round(width * scale)), max(1, round(h * scale)), QImage.Format.Format_RGB32)
+            image.setDotsPerMeterX(dpm); image.setDotsPerMeterY(dpm)
+            image.fill(QColor(Qt.GlobalColor.white))
+            painter = QPainter(image)
+            try:
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+                painter.scale(scale, scale)
+                painter.translate(0, -top)
+                doc.drawContents(painter, QRectF(0, top, width, h))
+            finally:
+                painter.end()
+            pending.append(pool.submit(_encode, image, fmt, quality))
+            del image
+            if len(pending) >= max(1, workers) * 2:
+                tiles.append(pending.pop(0).result())
+            top += tile
+        tiles.extend(f.result() for f in pending)
+    return tiles
+
+def _tile_paths(path, count):
+    if count == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}-{i}{ext}" for i in range(1, count + 1)]
+
+def render_image(html, path, dpi=IMAGE_DPI, quality=IMAGE_QUALITY, cache=image_cache):
+    """ذخیره سند به صورت تصویر (فرمت از پسوند)؛ مسیر فایل‌های نوشته‌شده.
+
+    اگر همین سند با همین تنظیمات قبلاً رندر شده باشد، خروجی کش‌شده دوباره نوشته می‌شود.
+    """
+    fmt = image_format(path)
+    key = hashlib.sha256(f"{fmt}|{dpi}|{quality if fmt in LOSSY_FORMATS else ''}|{html}".encode()).hexdigest()
+    tiles = cache.get(key) if cache is not None else None
+    if tiles is None:
+        tiles = render_image_tiles(html, fmt, dpi, quality)
+        if cache is not None:
+            cache.put(key, tiles)
+    paths = _tile_paths(path, len(tiles))
+    for p, data in zip(paths, tiles):
+        with open(p, "wb") as f:
+            f.write(data)
+    return paths
+
+def invoice_document(db, invoice_id):
+    """HTML یک فاکتور یا None اگر وجود ندارد"""
+    header, items = db.get_invoice(invoice_id)
+    return None if header is None else invoice_html(header, items, company_info(db))
@@ -0,0 +1,155 @@
+import csv
+import os
+from itertools import islice
+
+from app.textnorm import normalize
+
+try:
+    import openpyxl
+except ImportError:  # خواندن xlsx اختیاری است
+    openpyxl = None
+
+DEFAULT_BATCH = 5000
+
+# نام ستون‌های قابل قبول در فایل ورودی (فارسی یا انگلیسی)
+HEADER_ALIASES = {
+    "name": ("name", "نام", "نام مشتری", "نام کالا"),
+    "phone": ("phone", "tel", "تلفن"),
+    "address": ("address", "آدرس"),
+    "price": ("price", "unit_price", "قیمت", "قیمت واحد"),
+}
+
+class ImportCancelled(Exception):
+    pass
+
+# --- readers (generators; کل فایل هیچ‌وقت در حافظه نیست) ---
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield header
+        yield from reader
+
+def read_xlsx(path):
+    if openpyxl is None:
+        raise RuntimeError("برای خواندن فایل xlsx بسته openpyxl را نصب کنید.")
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield ["" if v is None else str(v) for v in row]
+    finally:
+        wb.close()
+
+def read_rows(path):
+    """سطر اول سرستون‌ها و سپس سطرهای داده را برمی‌گرداند"""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(path)
+    return read_csv(path)
+
+def _column_index(header, fields):
+    norm = [normalize(h or "").strip().lower() for h in header]
+    index = {}
+    for field in fields:
+        for alias in HEADER_ALIASES[field]:
+            if alias in norm:
+                index[field] = norm.index(alias); break
+    return index
+
+# --- validation ---
+def _cell(row, index, field):
+    i = index.get(field)
+    if i is None or i >= len(row) or row[i] is None:
+        return ""
+    return str(row[i]).strip()
+
+def clean_customer(row, index):
+    name = _cell(row, index, "name")
+    if not name:
+        raise ValueError("نام خالی است")
+    return (name, normalize(_cell(row, index, "phone")), _cell(row, index, "address"))
+
+def clean_product(row, index):
+    name = _cell(row, index, "name")
+    if not name:
+        raise ValueError("نام خالی است")
+    raw = normalize(_cell(row, index, "price")).replace(",", "").replace("٬", "")
+    try:
+        price = float(raw) if raw else 0.0
+    except ValueError:
+        raise ValueError(f"قیمت نامعتبر: {raw}")
+    if price < 0:
+        raise ValueError("قیمت منفی است")
+    return (name, price)
+
+KINDS = {
+    "customers": (("name", "phone", "address"), clean_customer, "add_customers_many"),
+    "products": (("name", "price"), clean_product, "add_products_many"),
+}
+
+def rejects_path(path):
+    """مسیر پیش‌فرض گزارش سطرهای رد شده: <ورودی>.rejected.csv"""
+    return os.path.splitext(path)[0] + ".rejected.csv"
+
+class _RejectLog:
+    def __init__(self, path):
+        self.path = path
+        self._f = None; self._w = None
+
+    def write(self, line, reason, row):
+        if self.path is None:
+            return
+        if self._w is None:
+            self._f = open(self.path, "w", newline="", encoding="utf-8-sig")
+            self._w = csv.writer(self._f)
+            self._w.writerow(["line", "reason", "row"])
+        self._w.writerow([line, reason, " | ".join("" if v is None else str(v) for v in row)])
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+def import_file(db, kind, path, batch_size=DEFAULT_BATCH, progress=None, reject_path=None):
+    """ورود انبوه در یک تراکنش؛ progress(processed, imported, rejected) اگر False برگرداند لغو می‌شود.
+
+    خروجی: (تعداد واردشده، تعداد ردشده)
+    """
+    fields, clean, insert_many = KINDS[kind]
+    insert_many = getattr(db, insert_many)
+    rows = read_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return 0, 0
+    index = _column_index(header, fields)
+    if "name" not in index:
+        raise ValueError("ستون نام در فایل پیدا نشد.")
+
+    log = _RejectLog(reject_path)
+    stats = {"processed": 0, "imported": 0, "rejected": 0}
+
+    def valid_rows():
+        for line, row in enumerate(rows, start=2):
+            stats["processed"] += 1
+            if not any(row):
+                continue
+            try:
+                yield clean(row, index)
+            except ValueError as e:
+                stats["rejected"] += 1
+                log.write(line, str(e), row)
+
+    it = valid_rows()
+    try:
+        with db.transaction():
+            while True:
+                batch = list(islice(it, batch_size))
+                if not batch:
+                    break
+                insert_many(batch)
+                stats["imported"] += len(batch)
+                if progress and progress(stats["processed"], stats["imported"], stats["rejected"]) is False:
+                    raise ImportCancelled()
+    finally:
+        log.close()
+    return stats["imported"], stats["rejected"]
@@ -0,0 +1,78 @@
+from datetime import date
+from functools import lru_cache
+
+MONTH_NAMES = ("فروردین", "اردیبهشت", "خرداد", "تیر", "مرداد", "شهریور",
+               "مهر", "آبان", "آذر", "دی", "بهمن", "اسفند")
+
+_G_DAYS = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+def gregorian_to_jalali(gy, gm, gd):
+    gy2 = gy + 1 if gm > 2 else gy
+    days = 355666 + 365 * gy + (gy2 + 3) // 4 - (gy2 + 99) // 100 + (gy2 + 399) // 400 + gd + _G_DAYS[gm - 1]
+    jy = -1595 + 33 * (days // 12053)
+    days %= 12053
+    jy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        jy += (days - 1) // 365
+        days = (days - 1) % 365
+    if days < 186:
+        return jy, 1 + days // 31, 1 + days % 31
+    return jy, 7 + (days - 186) // 30, 1 + (days - 186) % 30
+
+def jalali_to_gregorian(jy, jm, jd):
+    jy += 1595
+    days = -355668 + 365 * jy + (jy // 33) * 8 + ((jy % 33) + 3) // 4 + jd
+    days += (jm - 1) * 31 if jm < 7 else (jm - 7) * 30 + 186
+    gy = 400 * (days // 146097)
+    days %= 146097
+    if days > 36524:
+        days -= 1
+        gy += 100 * (days // 36524)
+        days %= 36524
+        if days >= 365:
+            days += 1
+    gy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        gy += (days - 1) // 365
+        days = (days - 1) % 365
+    leap = (gy % 4 == 0 and gy % 100 != 0) or gy % 400 == 0
+    month_days = (31, 29 if leap else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    gd = days + 1
+    gm = 0
+    while gm < 12 and gd > month_days[gm]:
+        gd -= month_days[gm]; gm += 1
+    return gy, gm + 1, gd
+
+# --- جدول مرز ماه‌ها (کش‌شده) ---
+@lru_cache(maxsize=None)
+def month_start(jy, jm):
+    """تاریخ میلادی روز اول ماه شمسی"""
+    return date(*jalali_to_gregorian(jy, jm, 1))
+
+def _next_month(jy, jm):
+    return (jy + 1, 1) if jm == 12 else (jy, jm + 1)
+
+@lru_cache(maxsize=256)
+def month_bounds(start, end):
+    """ماه‌های شمسی که بازه [start, end] را می‌پوشانند: ((jy, jm, first_day, next_first_day), ...)"""
+    jy, jm, _ = gregorian_to_jalali(start.year, start.month, start.day)
+    out = []
+    while month_start(jy, jm) <= end:
+        ny, nm = _next_month(jy, jm)
+        out.append((jy, jm, month_start(jy, jm), month_start(ny, nm)))
+        jy, jm = ny, nm
+    return tuple(out)
+
+# --- نمایش ---
+@lru_cache(maxsize=8192)
+def format_iso(iso_day):
+    """'2024-03-20' -> '1403/01/01' ؛ فقط هنگام نمایش صدا زده می‌شود"""
+    if not iso_day:
+        return ""
+    y, m, d = (int(p) for p in iso_day[:10].split("-"))
+    return "%04d/%02d/%02d" % gregorian_to_jalali(y, m, d)
+
+def format_month(jy, jm):
+    return f"{MONTH_NAMES[jm - 1]} {jy}"
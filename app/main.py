@@ -1,65 +1,367 @@
+import logging
+import os
+import sqlite3
 import sys
+import time
+from decimal import InvalidOperation
+
+_T0 = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QLabel, QLineEdit, QTabWidget,
-    QMessageBox, QHBoxLayout, QComboBox, QDateEdit
+    QTableView, QHeaderView, QLabel, QLineEdit, QTabWidget, QTableWidget, QTableWidgetItem, QCompleter, QSpinBox,
+    QMessageBox, QHBoxLayout, QComboBox, QDateEdit, QFileDialog, QProgressDialog, QProgressBar
 )
-from PyQt6.QtPrintSupport import QPrintDialog, QPrintPreviewDialog
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QCalendar, QEvent, QModelIndex, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
 
-from app.db import Database
+from app import perf as _perf_mod
+from app.backends import configured
+from app.lang import LANGUAGES, get_strings
+from app.pricing import invoice_totals, line_amounts, to_decimal
+from app.models import PagedTableModel, SuggestionModel, iter_pages
+from app.reports import REPORTS, fmt_money, fmt_qty, invoices_in_range
+from app.search import AsyncSearch
 from app.theme import apply_dark_blue_theme
-from app.utils import (
-    export_invoice_pdf, export_invoice_image,
-    export_report_pdf, export_report_image
-)
+from app.workspace import CONSOLIDATED, REGISTRY_NAME, WorkspaceError, WorkspaceManager, default_path
+
+# QtPrintSupport، خروجی PDF/عکس و ورود فایل فقط هنگام اولین استفاده import می‌شوند
+
+log = logging.getLogger("hesabdari.startup")
+
+class StartupTrace(QObject):
+    """زمان هر مرحله راه‌اندازی تا اولین paint پنجره (با HESABDARI_TRACE_STARTUP=1 یا --trace-startup)"""
+
+    def __init__(self, enabled):
+        super().__init__()
+        self.enabled = enabled
+        self._last = _T0
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        log.info("%-24s %8.1f ms  (+%.1f)", phase, (now - _T0) * 1000, (now - self._last) * 1000)
+        self._last = now
+
+    def watch_first_paint(self, widget):
+        if self.enabled:
+            widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            self.mark("first paint")
+        return False
+
+class BackupThread(QThread):
+    """تهیه نسخه پشتیبان (یا بازیابی از restore) در پس‌زمینه تا رابط کاربری و نوشتن‌ها متوقف نشوند"""
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, manager, label, parent=None, restore=None):
+        super().__init__(parent)
+        self.manager = manager; self.label = label; self.restore = restore
+
+    def run(self):
+        try:
+            if self.restore:
+                self.manager.restore(self.restore, progress=self.progress.emit); path = self.restore
+            else:
+                path = self.manager.snapshot(self.label, progress=self.progress.emit)
+        except (OSError, sqlite3.Error) as e:
+            self.failed.emit(str(e)); return
+        self.done.emit(path)
+
+_perf = None  # PerfMonitor وقتی اندازه‌گیری فعال است
+
+SETTINGS_FLUSH_MS = 500
+
+class SettingsBridge(QObject):
+    """اعلان تغییر تنظیمات به ویجت‌ها و ذخیره دسته‌ای کلیدهای تغییرکرده پس از مکثی کوتاه"""
+    changed = pyqtSignal(str, str)
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self._timer = QTimer(self); self._timer.setSingleShot(True); self._timer.setInterval(SETTINGS_FLUSH_MS)
+        self._timer.timeout.connect(settings.flush)
+        self.changed.connect(self._schedule)
+        settings.subscribe(self.changed.emit)
+
+    @pyqtSlot()
+    def _schedule(self):
+        self._timer.start()
+
+def _utils():
+    from app import utils
+    if _perf is not None:
+        # فقط خود رندر اندازه‌گیری می‌شود، نه زمان باز بودن پنجره انتخاب فایل
+        _perf.instrument(utils, "export", ("export_invoices_pdf", "export_invoices_separately", "render_pdf", "render_image"))
+    return utils
+
+def attach_completer(line_edit, catalog, picked=None):
+    """پیشنهاد از Catalog با هر تغییر متن؛ شناسه انتخاب‌شده در ویژگی catalog_id فیلد می‌ماند"""
+    model = SuggestionModel(line_edit)
+    completer = QCompleter(model, line_edit)
+    completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+    line_edit.setCompleter(completer)
+
+    def edited(text):
+        line_edit.setProperty("catalog_id", None)
+        model.set_rows(catalog.suggest(text))
+        if model.rowCount():
+            completer.complete()
+
+    def activated(index):
+        row_id = index.data(Qt.ItemDataRole.UserRole)
+        line_edit.setProperty("catalog_id", row_id)
+        if picked:
+            picked(catalog.get(row_id))
+
+    line_edit.textEdited.connect(edited)
+    completer.activated[QModelIndex].connect(activated)
+    return completer
+
+def make_table_view(model):
+    view = QTableView(); view.setModel(model)
+    # ارتفاع ثابت ردیف‌ها تا نما برای محاسبه اندازه، همه ردیف‌ها را نپیماید
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(28)
+    view.horizontalHeader().setStretchLastSection(True)
+    view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+    return view
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, trace=None, perf=None, paths=None):
         super().__init__()
-        self.setWindowTitle("نرم‌افزار حسابداری و فاکتور")
+        self.trace = trace or StartupTrace(False)
+        self.perf = perf
         self.resize(1100, 720)
 
-        # DB
-        self.db = Database()
+        # دفترها: هر فایل دیتابیس با اتصال‌ها، تنظیمات، جستجو و کاتالوگ خودش باز می‌ماند
+        # paths: فهرست فایل‌ها (بدون خواندن/ذخیره workspaces.json)؛ پیش‌فرض دفترهای جلسه قبل
+        if paths:
+            self.workspaces = WorkspaceManager()
+            for path in paths:
+                self.workspaces.open(path, activate=False)
+            self.workspaces.switch(paths[0])
+        else:
+            default = default_path()
+            self.workspaces = WorkspaceManager(os.path.join(os.path.dirname(os.path.abspath(default)), REGISTRY_NAME))
+            self.workspaces.restore(default)
+        self._views = {}  # path -> (SettingsBridge, AsyncSearch)
+        if perf is not None:
+            perf.instrument(self, "ui", ("refresh_", "print_preview"))
+            perf.instrument_reports(REPORTS, conn=lambda: self.db.conn)
+            perf.instrument_reports(CONSOLIDATED, "consolidated")
+        self._bind(self.workspaces.active)
+        self.workspaces.subscribe(self._on_workspace_switched)
+        self.trace.mark("database")
+
+        # نوار دفترها
+        central = QWidget(); outer = QVBoxLayout(central); outer.setContentsMargins(4, 4, 4, 4)
+        bar = QHBoxLayout()
+        bar.addWidget(QLabel("دفتر:"))
+        self.workspace_combo = QComboBox(); self.workspace_combo.setMinimumWidth(260)
+        self.workspace_combo.activated.connect(self.switch_workspace)
+        btn_open = QPushButton("باز کردن دفتر"); btn_open.clicked.connect(self.open_workspace)
+        btn_new = QPushButton("دفتر جدید"); btn_new.clicked.connect(lambda: self.open_workspace(new=True))
+        btn_close = QPushButton("بستن دفتر"); btn_close.clicked.connect(self.close_workspace)
+        bar.addWidget(self.workspace_combo); bar.addWidget(btn_open); bar.addWidget(btn_new); bar.addWidget(btn_close)
+        bar.addStretch()
+        outer.addLayout(bar)
+        self.refresh_workspaces()
 
-        # Tabs
+        # Tabs: هر تب در اولین نمایش ساخته می‌شود
         self.tabs = QTabWidget()
-        self.setCentralWidget(self.tabs)
+        outer.addWidget(self.tabs)
+        self.setCentralWidget(central)
+        self._tab_builders = [
+            ("tab_dashboard", self.add_dashboard_tab),
+            ("tab_company", self.add_company_tab),
+            ("tab_customers", self.add_customers_tab),
+            ("tab_products", self.add_products_tab),
+            ("tab_invoice", self.add_invoice_tab),
+            ("tab_reports", self.add_reports_tab),
+            ("tab_settings", self.add_settings_tab),
+        ]
+        self._built = set()
+        self._tab_attrs = {}  # index -> نام ویژگی‌هایی که سازنده تب ساخته است
+        for key, _ in self._tab_builders:
+            holder = QWidget(); QVBoxLayout(holder).setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(holder, self.strings[key])
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tabs.currentIndex())
+        self.trace.mark("main window")
+
+    def ensure_tab(self, index):
+        if index < 0 or index in self._built:
+            return
+        self._built.add(index)
+        title, build = self._tab_builders[index]
+        before = set(vars(self))
+        self.tabs.widget(index).layout().addWidget(build())
+        self._tab_attrs[index] = set(vars(self)) - before
+        self.trace.mark(f"tab: {title}")
+
+    def rebuild_tabs(self):
+        """تب‌های ساخته‌شده کنار گذاشته می‌شوند تا با دفتر فعال دوباره ساخته شوند"""
+        for index in self._built:
+            for name in self._tab_attrs.pop(index, ()):
+                value = self.__dict__.pop(name, None)
+                if isinstance(value, QTimer):
+                    value.stop()
+                if isinstance(value, QObject) and value.parent() is self:
+                    value.deleteLater()
+            layout = self.tabs.widget(index).layout()
+            while layout.count():
+                layout.takeAt(0).widget().deleteLater()
+        self._built = set()
+        self.ensure_tab(self.tabs.currentIndex())
+
+    # Workspaces
+    def _bind(self, ws):
+        """ویژگی‌های وابسته به دفتر (db، تنظیمات، جستجو) به دفتر ws اشاره می‌کنند"""
+        view = self._views.get(ws.path)
+        if view is None:
+            if self.perf is not None:
+                self.perf.instrument_database(ws.db)
+            bridge = SettingsBridge(ws.db.settings, self)
+            bridge.changed.connect(lambda key, value, bridge=bridge: bridge is self.settings and self.on_setting_changed(key, value))
+            search = AsyncSearch(ws.db, self)
+            search.finished.connect(lambda kind, q, rows, search=search: search is self.search and self.on_search_finished(kind, q, rows))
+            view = self._views[ws.path] = (bridge, search)
+        self.workspace = ws
+        self.db = ws.db
+        self.settings, self.search = view
+        self.strings = get_strings(self.db.get_setting("lang", "fa"))
+        self.last_invoice_id = None
+        self.setWindowTitle(f"{self.strings['app_title']} - {ws.label}")
+
+    def _on_workspace_switched(self, ws):
+        self._bind(ws)
+        self.retranslate()
+        self.rebuild_tabs()
+        self.refresh_workspaces()
+
+    def refresh_workspaces(self):
+        combo = self.workspace_combo
+        combo.blockSignals(True)
+        combo.clear()
+        for ws in self.workspaces:
+            combo.addItem(ws.label, ws.path)
+        combo.setCurrentIndex(max(0, combo.findData(self.workspace.path)))
+        combo.blockSignals(False)
+
+    def _can_leave_workspace(self):
+        if getattr(self, "invoice_lines", None) and QMessageBox.question(
+                self, "تأیید", "ردیف‌های فاکتور ثبت‌نشده کنار گذاشته شوند؟") != QMessageBox.StandardButton.Yes:
+            return False
+        self.db.settings.flush()
+        return True
 
-        self.add_dashboard_tab()
-        self.add_company_tab()
-        self.add_customers_tab()
-        self.add_products_tab()
-        self.add_invoice_tab()
-        self.add_reports_tab()
-        self.add_settings_tab()
+    def switch_workspace(self, index):
+        path = self.workspace_combo.itemData(index)
+        if path == self.workspace.path:
+            return
+        if not self._can_leave_workspace():
+            self.refresh_workspaces(); return
+        self.workspaces.switch(path)
+
+    def open_workspace(self, new=False):
+        start = os.path.dirname(self.workspace.path)
+        if new:
+            path, _ = QFileDialog.getSaveFileName(self, "دفتر جدید", start, "SQLite (*.db)")
+            if path and not os.path.splitext(path)[1]:
+                path += ".db"
+        else:
+            path, _ = QFileDialog.getOpenFileName(self, "باز کردن دفتر", start, "SQLite (*.db *.sqlite *.sqlite3);;All Files (*)")
+        if not path or not self._can_leave_workspace():
+            return
+        try:
+            self.workspaces.open(path)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "خطا", f"باز کردن دفتر ناموفق بود:\n{e}")
+        self.refresh_workspaces()
+
+    def close_workspace(self):
+        if not self._can_leave_workspace():
+            return
+        ws = self.workspace
+        try:
+            self.workspaces.check_close(ws.path)
+        except WorkspaceError as e:
+            QMessageBox.information(self, "دفتر", str(e)); return
+        # ترد جستجو پیش از بسته شدن اتصال‌های دفتر متوقف می‌شود (Workspace.close منتظر کاتالوگ‌ها می‌ماند)
+        bridge, search = self._views.pop(ws.path)
+        search.shutdown(); search.deleteLater(); bridge.deleteLater()
+        self.workspaces.close(ws.path)
+        self.refresh_workspaces()
+
+    # Settings / language
+    def on_setting_changed(self, key, value):
+        if key == "lang":
+            self.strings = get_strings(value)
+            self.retranslate()
+        elif key == "vat_percent":
+            self.refresh_invoice_totals()
+
+    def retranslate(self):
+        """متن‌های وابسته به زبان از جدول از پیش ساخته‌شده؛ بدون دسترسی به دیسک"""
+        s = self.strings
+        self.setWindowTitle(f"{s['app_title']} - {self.workspace.label}")
+        for i, (key, _) in enumerate(self._tab_builders):
+            self.tabs.setTabText(i, s[key])
+        for label, key in getattr(self, "_company_labels", ()):
+            label.setText(s[key] + ":")
 
     # Dashboard
     def add_dashboard_tab(self):
         w = QWidget(); lay = QVBoxLayout(w)
         title = QLabel("نرم افزار حسابداری"); title.setProperty("title", True); title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         lay.addWidget(title)
-        self.tabs.addTab(w, "داشبورد")
+        return w
 
     # Company
     def add_company_tab(self):
         w = QWidget(); lay = QVBoxLayout(w)
-        def add_row(lbl):
-            lay.addWidget(QLabel(lbl))
-            le = QLineEdit(); lay.addWidget(le); return le
-
-        self.company_name_fa = add_row("نام شرکت (فارسی):")
-        self.company_name_en = add_row("نام شرکت (انگلیسی):")
-        self.company_phone   = add_row("تلفن:")
-        self.company_address_fa = add_row("آدرس (فارسی):")
-        self.company_address_en = add_row("آدرس (انگلیسی):")
+        self._company_labels = []; self._company_fields = {}
+        def add_row(key, setting=None, default=""):
+            label = QLabel(self.strings[key] + ":"); lay.addWidget(label)
+            self._company_labels.append((label, key))
+            le = QLineEdit(self.db.get_setting(setting or key, default)); lay.addWidget(le)
+            self._company_fields[setting or key] = le
+            return le
 
-        lay.addWidget(QLabel("VAT %")); self.vat_rate = QLineEdit("0"); lay.addWidget(self.vat_rate)
+        self.company_name_fa = add_row("company_name_fa")
+        self.company_name_en = add_row("company_name_en")
+        self.company_phone   = add_row("company_phone")
+        self.company_address_fa = add_row("company_address_fa")
+        self.company_address_en = add_row("company_address_en")
+        self.vat_rate = add_row("vat_percent", default="0")
+        self.vat_rate.textChanged.connect(self.refresh_invoice_totals)
+        self.currency_symbol = add_row("currency", "currency_symbol", "ریال")
 
-        btn = QPushButton("ذخیره"); btn.clicked.connect(lambda: QMessageBox.information(self, "ذخیره", "اطلاعات شرکت ذخیره شد."))
+        btn = QPushButton(self.strings["save"]); btn.clicked.connect(self.save_company)
         lay.addWidget(btn)
-        self.tabs.addTab(w, "اطلاعات شرکت")
+        lay.addStretch()
+        return w
+
+    def save_company(self):
+        values = {key: le.text().strip() for key, le in self._company_fields.items()}
+        try:
+            vat = to_decimal(values["vat_percent"])
+            valid = vat.is_finite() and 0 <= vat <= 100
+        except InvalidOperation:
+            valid = False
+        if not valid:
+            QMessageBox.warning(self, self.strings["msg_error"], self.strings["msg_invalid_vat"]); return
+        values["vat_percent"] = str(vat)
+        self.db.settings.update(values)
+        self.db.settings.flush()
+        self.retranslate(); self.refresh_workspaces()  # نام دفتر از نام شرکت است
+        QMessageBox.information(self, self.strings["save"], self.strings["msg_company_saved"])
 
     # Customers
     def add_customers_tab(self):
@@ -70,16 +372,20 @@ class MainWindow(QMainWindow):
         self.customer_address = QLineEdit(); self.customer_address.setPlaceholderText("آدرس")
         self.customer_search = QLineEdit(); self.customer_search.setPlaceholderText("جستجو...")
         btn_add = QPushButton("افزودن"); btn_add.clicked.connect(self.add_customer)
-        btn_search = QPushButton("جستجو"); btn_search.clicked.connect(self.refresh_customers)
+        btn_search = QPushButton("جستجو"); btn_search.clicked.connect(lambda: self.search.request("customers", self.customer_search.text().strip()))
         top.addWidget(self.customer_name); top.addWidget(self.customer_phone); top.addWidget(self.customer_address)
-        top.addWidget(btn_add); top.addWidget(self.customer_search); top.addWidget(btn_search)
+        btn_import = QPushButton("ورود از فایل"); btn_import.clicked.connect(lambda: self.import_from_file("customers"))
+        top.addWidget(btn_add); top.addWidget(btn_import); top.addWidget(self.customer_search); top.addWidget(btn_search)
         lay.addLayout(top)
 
-        self.table_customers = QTableWidget(); self.table_customers.setColumnCount(4)
-        self.table_customers.setHorizontalHeaderLabels(["شناسه","نام","تلفن","آدرس"])
+        self.customers_model = PagedTableModel(
+            lambda q, limit, after: self.db.list_customers(q, limit, after),
+            ["شناسه","نام","تلفن","آدرس"], parent=self)
+        self.table_customers = make_table_view(self.customers_model)
         lay.addWidget(self.table_customers)
-        self.tabs.addTab(w, "مشتریان")
-        self.refresh_customers()
+        self.search.debounce(self.customer_search, "customers")
+        self.search.request("customers", "")
+        return w
 
     def add_customer(self):
         name = self.customer_name.text().strip()
@@ -92,13 +398,8 @@ class MainWindow(QMainWindow):
         self.refresh_customers()
 
     def refresh_customers(self):
-        q = self.customer_search.text().strip() if hasattr(self, 'customer_search') else None
-        rows = self.db.list_customers(q)
-        self.table_customers.setRowCount(0)
-        for r, (id_, name, phone, addr) in enumerate(rows):
-            self.table_customers.insertRow(r)
-            for c, val in enumerate([id_, name, phone, addr]):
-                self.table_customers.setItem(r, c, QTableWidgetItem(str(val)))
+        if not hasattr(self, 'customers_model'): return  # تب هنوز ساخته نشده
+        self.customers_model.set_query(self.customer_search.text().strip())
 
     # Products
     def add_products_tab(self):
@@ -108,16 +409,20 @@ class MainWindow(QMainWindow):
         self.product_price = QLineEdit("0"); self.product_price.setPlaceholderText("قیمت واحد")
         self.product_search = QLineEdit(); self.product_search.setPlaceholderText("جستجوی کالا...")
         btn_add = QPushButton("افزودن"); btn_add.clicked.connect(self.add_product)
-        btn_search = QPushButton("جستجو"); btn_search.clicked.connect(self.refresh_products)
-        top.addWidget(self.product_name); top.addWidget(self.product_price); top.addWidget(btn_add)
+        btn_search = QPushButton("جستجو"); btn_search.clicked.connect(lambda: self.search.request("products", self.product_search.text().strip()))
+        btn_import = QPushButton("ورود از فایل"); btn_import.clicked.connect(lambda: self.import_from_file("products"))
+        top.addWidget(self.product_name); top.addWidget(self.product_price); top.addWidget(btn_add); top.addWidget(btn_import)
         top.addWidget(self.product_search); top.addWidget(btn_search)
         lay.addLayout(top)
 
-        self.table_products = QTableWidget(); self.table_products.setColumnCount(3)
-        self.table_products.setHorizontalHeaderLabels(["شناسه","نام","قیمت واحد"])
+        self.products_model = PagedTableModel(
+            lambda q, limit, after: self.db.list_products(q, limit, after),
+            ["شناسه","نام","قیمت واحد"], formatters={2: lambda v: f"{v or 0:,.0f}"}, parent=self)
+        self.table_products = make_table_view(self.products_model)
         lay.addWidget(self.table_products)
-        self.tabs.addTab(w, "کالاها")
-        self.refresh_products()
+        self.search.debounce(self.product_search, "products")
+        self.search.request("products", "")
+        return w
 
     def add_product(self):
         name = self.product_name.text().strip()
@@ -132,71 +437,383 @@ class MainWindow(QMainWindow):
         self.refresh_products()
 
     def refresh_products(self):
-        q = self.product_search.text().strip() if hasattr(self, 'product_search') else None
-        rows = self.db.list_products(q)
-        self.table_products.setRowCount(0)
-        for r, (id_, name, price) in enumerate(rows):
-            self.table_products.insertRow(r)
-            for c, val in enumerate([id_, name, f"{price:,.0f}"]):
-                self.table_products.setItem(r, c, QTableWidgetItem(str(val)))
+        if not hasattr(self, 'products_model'): return  # تب هنوز ساخته نشده
+        self.products_model.set_query(self.product_search.text().strip())
+
+    def import_from_file(self, kind):
+        from app.importer import import_file, rejects_path, ImportCancelled
+        path, _ = QFileDialog.getOpenFileName(self, "انتخاب فایل", filter="CSV / Excel (*.csv *.xlsx)")
+        if not path: return
+        rejects = rejects_path(path)
+        dlg = QProgressDialog("در حال ورود اطلاعات...", "لغو", 0, 0, self)
+        dlg.setWindowModality(Qt.WindowModality.WindowModal); dlg.setMinimumDuration(300)
+
+        def progress(processed, imported, rejected):
+            dlg.setLabelText(f"{processed:,} سطر خوانده شد — {imported:,} ثبت، {rejected:,} رد")
+            QApplication.processEvents()
+            return not dlg.wasCanceled()
+
+        try:
+            imported, rejected = import_file(self.db, kind, path, progress=progress, reject_path=rejects)
+        except ImportCancelled:
+            QMessageBox.information(self, "لغو شد", "ورود اطلاعات لغو شد و تغییری ثبت نشد."); return
+        except (OSError, ValueError, RuntimeError) as e:
+            QMessageBox.warning(self, "خطا", str(e)); return
+        finally:
+            dlg.close()
+        self.refresh_customers() if kind == "customers" else self.refresh_products()
+        msg = f"{imported:,} سطر ثبت شد."
+        if rejected:
+            msg += f"\n{rejected:,} سطر رد شد؛ جزئیات در\n{rejects}"
+        QMessageBox.information(self, "انجام شد", msg)
+
+    def on_search_finished(self, kind, q, rows):
+        model = self.customers_model if kind == "customers" else self.products_model
+        model.set_rows(q, rows)
 
     # Invoice
     def add_invoice_tab(self):
         w = QWidget(); lay = QVBoxLayout(w)
         row = QHBoxLayout()
+        # کش کالا/مشتری هر دفتر یک بار روی ترد پس‌زمینه بارگذاری می‌شود و با جابه‌جایی می‌ماند
+        self.catalog_products = self.workspace.catalog("products")
+        self.catalog_customers = self.workspace.catalog("customers")
         row.addWidget(QLabel("مشتری:")); self.invoice_customer = QLineEdit(); row.addWidget(self.invoice_customer)
+        attach_completer(self.invoice_customer, self.catalog_customers)
         row.addWidget(QLabel("تاریخ:")); self.invoice_date = QDateEdit(QDate.currentDate()); self.invoice_date.setDisplayFormat("yyyy/MM/dd"); row.addWidget(self.invoice_date)
         lay.addLayout(row)
 
+        # ردیف‌ها
+        entry = QHBoxLayout()
+        self.line_product = QLineEdit(); self.line_product.setPlaceholderText(self.strings["product"])
+        attach_completer(self.line_product, self.catalog_products, self._on_product_picked)
+        self.line_qty = QLineEdit("1"); self.line_qty.setPlaceholderText(self.strings["quantity"])
+        self.line_price = QLineEdit(); self.line_price.setPlaceholderText(self.strings["price"])
+        self.line_discount = QLineEdit("0"); self.line_discount.setPlaceholderText(self.strings["discount"])
+        self.line_product.returnPressed.connect(self.line_qty.setFocus)
+        for le in (self.line_qty, self.line_price, self.line_discount):
+            le.returnPressed.connect(self.add_invoice_line)
+        btn_add_line = QPushButton(self.strings["add_row"]); btn_add_line.clicked.connect(self.add_invoice_line)
+        btn_remove_line = QPushButton(self.strings["remove_row"]); btn_remove_line.clicked.connect(self.remove_invoice_line)
+        entry.addWidget(self.line_product, 3); entry.addWidget(self.line_qty, 1); entry.addWidget(self.line_price, 1)
+        entry.addWidget(self.line_discount, 1); entry.addWidget(btn_add_line); entry.addWidget(btn_remove_line)
+        lay.addLayout(entry)
+
+        self.invoice_lines = []  # [(product_id, name, qty, price, discount_pct)] با مقادیر Decimal
+        self.table_lines = QTableWidget(0, 6)
+        self.table_lines.setHorizontalHeaderLabels(["کالا", "تعداد", "قیمت واحد", "تخفیف", "مالیات", "مبلغ"])
+        self.table_lines.horizontalHeader().setStretchLastSection(True)
+        self.table_lines.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table_lines.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        lay.addWidget(self.table_lines)
+        self.invoice_totals_label = QLabel(); lay.addWidget(self.invoice_totals_label)
+        self.refresh_invoice_totals()
+
         # actions
         actions = QHBoxLayout()
         btn_save = QPushButton("ثبت فاکتور"); btn_save.clicked.connect(self.save_invoice)
         btn_prev = QPushButton("پیش‌نمایش چاپ"); btn_prev.clicked.connect(self.print_preview)
-        btn_pdf  = QPushButton("PDF"); btn_pdf.clicked.connect(lambda: export_invoice_pdf(self))
-        btn_img  = QPushButton("عکس"); btn_img.clicked.connect(lambda: export_invoice_image(self))
+        btn_pdf  = QPushButton("PDF"); btn_pdf.clicked.connect(lambda: _utils().export_invoice_pdf(self))
+        btn_img  = QPushButton("عکس"); btn_img.clicked.connect(lambda: _utils().export_invoice_image(self))
         actions.addWidget(btn_save); actions.addWidget(btn_prev); actions.addWidget(btn_pdf); actions.addWidget(btn_img)
         lay.addLayout(actions)
 
-        self.tabs.addTab(w, "صدور فاکتور")
+        return w
 
     def print_preview(self):
-        dlg = QPrintPreviewDialog(self)
-        dlg.paintRequested.connect(lambda printer: self.render(printer))
-        dlg.exec()
+        _utils().preview_invoice(self)
+
+    def _on_product_picked(self, product):
+        if product is not None:
+            self.line_price.setText(fmt_qty(product[2]).replace(",", ""))
+            self.line_qty.setFocus(); self.line_qty.selectAll()
+
+    def current_vat(self):
+        """درصد مالیات از فیلد vat_rate (اگر تب شرکت ساخته شده) یا تنظیمات"""
+        text = self.vat_rate.text() if hasattr(self, "vat_rate") else self.db.get_setting("vat_percent", "0")
+        try:
+            vat = to_decimal(text.strip())
+        except InvalidOperation:
+            return None
+        return vat if 0 <= vat <= 100 else None
+
+    def add_invoice_line(self):
+        name = self.line_product.text().strip()
+        product_id = self.line_product.property("catalog_id")
+        product = self.catalog_products.get(product_id) if product_id else self.catalog_products.find(name)
+        if product is None and name:
+            product_id = None
+            rows = self.db.list_products(name, 1)  # کش هنوز آماده نیست
+            product = rows[0] if rows and rows[0][1] == name else None
+        if product is None:
+            QMessageBox.warning(self, "خطا", "کالا را از فهرست پیشنهادها انتخاب کنید."); return
+        try:
+            qty = to_decimal(self.line_qty.text().strip() or "1")
+            price = to_decimal(self.line_price.text().strip() or product[2])
+            discount = to_decimal(self.line_discount.text().strip() or "0")
+            valid = qty > 0 and price >= 0 and 0 <= discount <= 100
+            if valid:
+                line_amounts(qty, price, discount, 100)  # مبلغ بزرگ‌تر از دقت Decimal در quantize خطا می‌دهد
+        except InvalidOperation:
+            valid = False
+        if not valid:
+            QMessageBox.warning(self, "خطا", "تعداد، قیمت یا تخفیف نامعتبر است."); return
+        self.invoice_lines.append((product[0], product[1], qty, price, discount))
+        self.line_product.clear(); self.line_product.setProperty("catalog_id", None)
+        self.line_qty.setText("1"); self.line_price.clear(); self.line_discount.setText("0")
+        self.line_product.setFocus()
+        self.refresh_invoice_totals()
+
+    def remove_invoice_line(self):
+        rows = sorted({i.row() for i in self.table_lines.selectedIndexes()}, reverse=True)
+        for r in rows or [len(self.invoice_lines) - 1]:
+            if 0 <= r < len(self.invoice_lines):
+                del self.invoice_lines[r]
+        self.refresh_invoice_totals()
+
+    def refresh_invoice_totals(self):
+        """محاسبه دهدهی دقیق هر ردیف و جمع‌ها با درصد مالیات جاری"""
+        if not hasattr(self, "invoice_lines"): return  # تب هنوز ساخته نشده
+        vat = self.current_vat()
+        if vat is None:
+            self.invoice_totals_label.setText("درصد مالیات نامعتبر است."); return
+        amounts = [line_amounts(qty, price, disc, vat) for _, _, qty, price, disc in self.invoice_lines]
+        self.table_lines.setRowCount(len(amounts))
+        for r, ((_, name, qty, price, _), (gross, discount, tax, total)) in enumerate(zip(self.invoice_lines, amounts)):
+            for c, text in enumerate((name, fmt_qty(qty), fmt_money(price), fmt_money(discount), fmt_money(tax), fmt_money(total))):
+                self.table_lines.setItem(r, c, QTableWidgetItem(text))
+        subtotal, discount, tax, total = invoice_totals(amounts)
+        s = self.strings
+        self.invoice_totals_label.setText(
+            f"{s['subtotal']}: {fmt_money(subtotal)}    {s['discount_sum']}: {fmt_money(discount)}    "
+            f"{s['vat']} ({vat}%): {fmt_money(tax)}    {s['grand_total']}: {fmt_money(total)}")
 
     def save_invoice(self):
+        if not self.invoice_lines:
+            QMessageBox.warning(self, "خطا", "ابتدا حداقل یک ردیف کالا اضافه کنید."); return
+        vat = self.current_vat()
+        if vat is None:
+            QMessageBox.warning(self, "خطا", "درصد مالیات نامعتبر است."); return
         cust = self.invoice_customer.text().strip() or "بدون نام"
-        date = self.invoice_date.date().toString("yyyy/MM/dd")
-        subtotal = 0.0; tax = 0.0; total = 0.0
-        inv_id = self.db.save_invoice_basic(cust, date, subtotal, tax, total)
+        customer_id = self.invoice_customer.property("catalog_id")
+        if customer_id is None:
+            found = self.catalog_customers.find(cust)
+            customer_id = found[0] if found else self.db.find_customer_id(cust)
+        date = self.invoice_date.date().toString(Qt.DateFormat.ISODate)
+        items = [(pid, qty, price, disc) for pid, _, qty, price, disc in self.invoice_lines]
+        inv_id = self.db.add_invoice(date, items, customer_id=customer_id, customer_name=cust, vat_percent=vat)
+        self.last_invoice_id = inv_id
+        self.invoice_lines = []; self.refresh_invoice_totals()
         QMessageBox.information(self, "ثبت شد", f"فاکتور شماره {inv_id} ذخیره شد.")
 
     # Reports
     def add_reports_tab(self):
         w = QWidget(); lay = QVBoxLayout(w)
-        btn_pdf = QPushButton("خروجی PDF گزارش"); btn_pdf.clicked.connect(lambda: export_report_pdf(self))
-        btn_img = QPushButton("خروجی عکس گزارش"); btn_img.clicked.connect(lambda: export_report_image(self))
-        lay.addWidget(btn_pdf); lay.addWidget(btn_img)
-        self.tabs.addTab(w, "گزارش‌ها")
+        row = QHBoxLayout()
+        self.report_kind = QComboBox()
+        for key, (title, *_rest) in REPORTS.items():
+            self.report_kind.addItem(title, key)
+        self.report_kind.insertSeparator(self.report_kind.count())
+        for key, (title, *_rest) in CONSOLIDATED.items():
+            self.report_kind.addItem(title, key)
+        today = QDate.currentDate()
+        jalali = QCalendar(QCalendar.System.Jalali)
+        self.report_from = QDateEdit(QDate(today.year(jalali), today.month(jalali), 1, jalali)); self.report_to = QDateEdit(today)
+        for de in (self.report_from, self.report_to):
+            de.setCalendar(jalali); de.setDisplayFormat("yyyy/MM/dd"); de.setCalendarPopup(True)
+        btn_run = QPushButton("بروزرسانی گزارش"); btn_run.clicked.connect(self.refresh_report)
+        row.addWidget(self.report_kind); row.addWidget(QLabel("از:")); row.addWidget(self.report_from)
+        row.addWidget(QLabel("تا:")); row.addWidget(self.report_to); row.addWidget(btn_run)
+        lay.addLayout(row)
+
+        self.table_report = make_table_view(None)
+        lay.addWidget(self.table_report)
+
+        actions = QHBoxLayout()
+        btn_pdf = QPushButton("خروجی PDF گزارش"); btn_pdf.clicked.connect(lambda: _utils().export_report_pdf(self))
+        btn_img = QPushButton("خروجی عکس گزارش"); btn_img.clicked.connect(lambda: _utils().export_report_image(self))
+        btn_batch = QPushButton("PDF همه فاکتورهای بازه"); btn_batch.clicked.connect(lambda: _utils().export_invoices_batch(self, self.report_invoice_ids()))
+        btn_batch_sep = QPushButton("PDF جداگانه فاکتورها"); btn_batch_sep.clicked.connect(lambda: _utils().export_invoices_batch(self, self.report_invoice_ids(), separate=True))
+        actions.addWidget(btn_pdf); actions.addWidget(btn_img); actions.addWidget(btn_batch); actions.addWidget(btn_batch_sep)
+        lay.addLayout(actions)
+        return w
+
+    def report_range(self):
+        return (self.report_from.date().toString(Qt.DateFormat.ISODate),
+                self.report_to.date().toString(Qt.DateFormat.ISODate))
+
+    def report_invoice_ids(self):
+        return [r[0] for r in invoices_in_range(self.db, *self.report_range())]
+
+    def current_report(self):
+        """(title, headers, rows, formatters) گزارش انتخاب‌شده برای خروجی PDF/تصویر که به همه ردیف‌ها نیاز دارد؛
+        rows کامل خوانده می‌شود تا cursor نیمه‌خوانده snapshot اتصال ترد را باز و checkpoint WAL را معطل نگه ندارد"""
+        key = self.report_kind.currentData()
+        if key in CONSOLIDATED:
+            # یک پرس‌وجو روی همه دفترهای باز (ATTACH)
+            title, headers, query, formatters = CONSOLIDATED[key]
+            return title, headers, list(query(self.workspaces, *self.report_range())), formatters
+        title, headers, query, formatters = REPORTS[key]
+        return title, headers, list(query(self.db, *self.report_range())), formatters
+
+    def refresh_report(self):
+        # گزارش ممکن است صدها هزار ردیف باشد (مثلاً مشتری‌ها در یک سال): صفحه‌به‌صفحه از cursor،
+        # روی اتصالی جدا که با کنار رفتن مدل بسته می‌شود؛ تلفیقی‌ها اتصال ATTACH خود را دارند
+        pool, conn, key = self.db.pool, None, self.report_kind.currentData()
+        try:
+            if key in CONSOLIDATED:
+                title, headers, query, formatters = CONSOLIDATED[key]
+                rows = query(self.workspaces, *self.report_range())
+            else:
+                title, headers, query, formatters = REPORTS[key]
+                conn = pool.dedicated()
+                rows = query(self.db, *self.report_range(), conn=conn)
+        except (WorkspaceError, sqlite3.Error) as e:
+            if conn is not None:
+                pool.discard(conn)
+            QMessageBox.warning(self, "خطا", str(e)); return
+        old = self.table_report.model()
+        self.report_model = PagedTableModel(iter_pages(rows), headers, formatters, parent=self.table_report)
+        if conn is not None:
+            self.report_model.destroyed.connect(lambda *_: pool.discard(conn))
+        self.report_model.set_query(None)
+        self.table_report.setModel(self.report_model)
+        if old is not None:
+            old.deleteLater()
 
     # Settings
     def add_settings_tab(self):
         w = QWidget(); lay = QVBoxLayout(w)
-        # فقط چند دکمه کمکی
+        row = QHBoxLayout()
+        row.addWidget(QLabel(self.strings["lang_label"]))
+        self.lang_combo = QComboBox()
+        for code in LANGUAGES:
+            self.lang_combo.addItem(self.strings[f"lang_{code}"], code)
+        self.lang_combo.setCurrentIndex(max(0, self.lang_combo.findData(self.db.get_setting("lang", "fa"))))
+        self.lang_combo.currentIndexChanged.connect(lambda: self.db.set_setting("lang", self.lang_combo.currentData()))
+        row.addWidget(self.lang_combo); row.addStretch()
+        lay.addLayout(row)
+        # خروجی تصویر
+        row = QHBoxLayout(); utils = _utils()
+        for label, key, default, low, high in (("DPI تصویر:", "image_dpi", utils.IMAGE_DPI, 72, 600),
+                                               ("کیفیت JPEG/WebP:", "image_quality", utils.IMAGE_QUALITY, 1, 100)):
+            spin = QSpinBox(); spin.setRange(low, high)
+            spin.setValue(utils._int_setting(self.db, key, default, low, high))
+            spin.valueChanged.connect(lambda v, key=key: self.db.set_setting(key, v))
+            row.addWidget(QLabel(label)); row.addWidget(spin)
+        row.addStretch()
+        lay.addLayout(row)
+        # نسخه پشتیبان
+        row = QHBoxLayout()
+        btn_backup = QPushButton("تهیه نسخه پشتیبان"); btn_backup.clicked.connect(lambda: self.start_backup("manual"))
+        btn_restore = QPushButton("بازیابی از نسخه پشتیبان"); btn_restore.clicked.connect(self.restore_backup)
+        row.addWidget(btn_backup); row.addWidget(btn_restore)
+        lay.addLayout(row)
+        self.backup_progress = QProgressBar(); self.backup_progress.hide()
+        lay.addWidget(self.backup_progress)
+
         btn_wipe = QPushButton("پاکسازی کامل دیتابیس"); btn_wipe.clicked.connect(self.confirm_wipe)
         lay.addWidget(btn_wipe)
-        self.tabs.addTab(w, "تنظیمات")
+        self._backup_thread = None
+
+        # کارایی
+        lay.addWidget(QLabel("کارایی (زمان‌ها به میلی‌ثانیه):"))
+        if self.perf is None:
+            lay.addWidget(QLabel("اندازه‌گیری غیرفعال است؛ برنامه را با --perf یا HESABDARI_PERF=1 اجرا کنید."))
+            lay.addStretch()
+            return w
+        row = QHBoxLayout()
+        row.addWidget(QLabel(f"گزارش پرس‌وجوهای کند (بیش از {self.perf.slow_ms:g} ms): {self.perf.log_path}"))
+        btn_reset = QPushButton("صفر کردن آمار"); btn_reset.clicked.connect(lambda: (self.perf.reset(), self.perf_model.refresh()))
+        row.addWidget(btn_reset)
+        lay.addLayout(row)
+        self.perf_model = PagedTableModel(
+            lambda q, limit, after: [] if after else self.perf.snapshot(),  # چند ده نام؛ یک صفحه
+            ["نام", "تعداد", "میانگین", "p50", "p95", "بیشینه", "سطرها"],
+            {c: "{:.2f}".format for c in (2, 3, 4, 5)}, parent=self)
+        self.perf_model.set_query(None)
+        lay.addWidget(make_table_view(self.perf_model))
+        self._perf_timer = QTimer(self); self._perf_timer.setInterval(1000)
+        self._perf_timer.timeout.connect(lambda: w.isVisible() and self.perf_model.refresh())
+        self._perf_timer.start()
+        return w
+
+    def start_backup(self, label, then=None, restore=None):
+        """then() پس از موفقیت؛ با restore به جای نسخه گرفتن، دیتابیس از آن فایل بازیابی می‌شود"""
+        if self._backup_thread is not None:
+            QMessageBox.information(self, "پشتیبان", "تهیه نسخه پشتیبان در حال انجام است."); return
+        self.db.settings.flush()  # تا نسخه (یا pre-restore) تنظیمات ذخیره‌نشده را هم داشته باشد
+        t = self._backup_thread = BackupThread(self.db.backups(), label, self, restore)
+        self.backup_progress.setValue(0); self.backup_progress.show()
+        t.progress.connect(lambda done, total: (self.backup_progress.setMaximum(max(total, 1)), self.backup_progress.setValue(done)))
+
+        def finished(path=None, error=None):
+            self.backup_progress.hide(); self._backup_thread = None; t.deleteLater()
+            if error:
+                QMessageBox.warning(self, "خطا", f"{'بازیابی' if restore else 'تهیه نسخه پشتیبان'} ناموفق بود:\n{error}")
+            elif then:
+                then()
+            else:
+                QMessageBox.information(self, "پشتیبان", f"نسخه پشتیبان در مسیر\n{path}\nذخیره شد.")
+
+        t.done.connect(lambda path: finished(path=path))
+        t.failed.connect(lambda err: finished(error=err))
+        t.start()
+
+    def restore_backup(self):
+        manager = self.db.backups()
+        path, _ = QFileDialog.getOpenFileName(self, "انتخاب نسخه پشتیبان", manager.backup_dir, "Backups (*.db *.gz)")
+        if not path: return
+        if QMessageBox.question(self, "تأیید", "داده‌های فعلی با این نسخه جایگزین شوند؟") != QMessageBox.StandardButton.Yes:
+            return
+        # نسخه pre-restore و کپی فایل‌های چند گیگابایتی روی ترد پشتیبان
+        self.start_backup("pre-restore", then=self._restored, restore=path)
+
+    def _restored(self):
+        self.db.settings.reload()
+        self.db.notify("customers"); self.db.notify("products")  # کش کاتالوگ دوباره بارگذاری شود
+        self.refresh_customers(); self.refresh_products()
+        QMessageBox.information(self, "انجام شد", "دیتابیس از نسخه پشتیبان بازیابی شد.")
 
     def confirm_wipe(self):
         if QMessageBox.question(self, "تأیید", "همه داده‌ها حذف شوند؟") == QMessageBox.StandardButton.Yes:
-            self.db.wipe_all()
-            self.refresh_customers(); self.refresh_products()
-            QMessageBox.information(self, "انجام شد", "دیتابیس پاکسازی شد.")
+            # ابتدا نسخه پشتیبان خودکار در پس‌زمینه، سپس پاکسازی
+            self.start_backup("pre-wipe", then=self._wipe_now)
+
+    def _wipe_now(self):
+        self.db.wipe_all(snapshot=False)
+        self.refresh_customers(); self.refresh_products()
+        QMessageBox.information(self, "انجام شد", "دیتابیس پاکسازی شد.\nنسخه پشتیبان پیش از پاکسازی ذخیره شده است.")
+
+    def closeEvent(self, event):
+        for _, search in self._views.values():
+            search.shutdown()
+        if getattr(self, "_backup_thread", None) is not None:
+            self._backup_thread.wait()
+        if getattr(self, "_image_thread", None) is not None:
+            self._image_thread.wait()
+        self.workspaces.close_all()  # تنظیمات همه دفترها ذخیره می‌شود
+        super().closeEvent(event)
 
 def main():
+    trace = StartupTrace(os.environ.get("HESABDARI_TRACE_STARTUP") == "1" or "--trace-startup" in sys.argv)
+    if trace.enabled:
+        logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+    trace.mark("imports")
     app = QApplication(sys.argv)
     apply_dark_blue_theme(app)
-    win = MainWindow(); win.show()
+    trace.mark("QApplication")
+    global _perf
+    if _perf_mod.enabled(sys.argv):
+        _perf = _perf_mod.PerfMonitor()
+    win = MainWindow(trace, _perf)
+    trace.watch_first_paint(win)
+    win.show()
+    trace.mark("show")
+    db_type, _ = configured()
+    if db_type != "sqlite":
+        QMessageBox.warning(win, "پایگاه‌داده", f"db_type={db_type} در settings.ini فقط به عنوان مبدأ انتقال پشتیبانی می‌شود.\n"
+                            "برای انتقال داده‌ها: python -m app migrate\nتا آن زمان برنامه با SQLite کار می‌کند.")
     sys.exit(app.exec())
 
 if __name__ == "__main__":
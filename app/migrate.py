@@ -0,0 +1,138 @@
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+# انتقال جریانی همه جدول‌ها بین دو Backend (مثلاً بایگانی Access -> SQLite):
+# هر جدول روی ترد خودش صفحه‌به‌صفحه (keyset روی کلید) خوانده می‌شود، یک نویسنده هر صفحه را
+# در تراکنش جدا می‌نویسد و پیشرفت در فایل checkpoint ثبت می‌شود تا اجرای بعدی از همان‌جا ادامه دهد.
+# در هر لحظه حداکثر workers*QUEUE_DEPTH صفحه در حافظه است.
+
+TABLES = ("customers", "products", "settings", "invoices", "invoice_items")
+KEYS = {"settings": "key"}
+CHUNK = 5000
+WORKERS = 4
+QUEUE_DEPTH = 2
+
+class MigrationError(Exception):
+    pass
+
+def _plain(value):
+    """نوع‌های درایورها (Decimal پول، datetime تاریخ Access) به نوع‌های ساده"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+class Checkpoint:
+    """{table: {"after": آخرین کلید، "rows": تعداد، "done": bool}} ؛ با جایگزینی اتمی ذخیره می‌شود"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tables = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.tables = json.load(f)["tables"]
+
+    def update(self, table, **values):
+        self.tables.setdefault(table, {"after": None, "rows": 0, "done": False}).update(values)
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tables": self.tables}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def plan(source, target, checkpoint, tables=TABLES):
+    """[(table, columns, key, after)] برای جدول‌هایی که در هر دو طرف هستند و تمام نشده‌اند"""
+    out = []
+    for table in tables:
+        src, dst = source.columns(table), target.columns(table)
+        if src is None or dst is None:
+            continue
+        key = KEYS.get(table, "id")
+        columns = [c for c in src if c in dst]
+        if key not in columns:
+            raise MigrationError(f"{table}: ستون کلید {key} نیست")
+        state = checkpoint.tables.get(table)
+        if state and state["done"]:
+            continue
+        last = target.max_key(table, key)
+        if state is None and last is not None:
+            raise MigrationError(f"{table}: جدول مقصد خالی نیست (برای ادامه، فایل checkpoint لازم است)")
+        # مقصد در شروع خالی بوده، پس بزرگ‌ترین کلید آن آخرین سطر نوشته‌شده است
+        # (حتی اگر برنامه پس از commit و پیش از ذخیره checkpoint متوقف شده باشد)
+        out.append((table, columns, key, last))
+    return out
+
+def _reader(source, table, columns, key, after, chunk, out, stop):
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1); return
+            except queue.Full:
+                pass
+    k = columns.index(key)
+    try:
+        while not stop.is_set():
+            rows = source.read_after(table, columns, key, after, chunk)
+            if not rows:
+                break
+            after = rows[-1][k]
+            put((table, after, [tuple(map(_plain, r)) for r in rows]))
+            if len(rows) < chunk:
+                break
+        put((table, None, None))
+    except BaseException as e:
+        put((table, e, None))
+    finally:
+        source.release()
+
+def migrate(source, target, checkpoint_path=None, tables=TABLES, chunk=CHUNK, workers=WORKERS, progress=None):
+    """progress(table, rows_copied) ؛ خروجی {table: rows} برای این اجرا"""
+    checkpoint = Checkpoint(checkpoint_path)
+    jobs = plan(source, target, checkpoint, tables)
+    copied = {table: 0 for table, *_ in jobs}
+    if not jobs:
+        checkpoint.remove()
+        return copied
+    out = queue.Queue(maxsize=max(1, workers) * QUEUE_DEPTH)
+    stop = threading.Event()
+    columns = {table: cols for table, cols, _, _ in jobs}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool, target.bulk_load():
+        try:
+            for table, cols, key, after in jobs:
+                checkpoint.update(table, after=after)
+                pool.submit(_reader, source, table, cols, key, after, chunk, out, stop)
+            pending = set(columns)
+            while pending:
+                table, after, rows = out.get()
+                if rows is None:
+                    if isinstance(after, BaseException):
+                        raise MigrationError(f"{table}: {after}") from after
+                    pending.discard(table)
+                    checkpoint.update(table, done=True)
+                    continue
+                with target.transaction():
+                    target.write_rows(table, columns[table], rows)
+                copied[table] += len(rows)
+                checkpoint.update(table, after=after, rows=checkpoint.tables[table]["rows"] + len(rows))
+                if progress:
+                    progress(table, copied[table])
+        finally:
+            stop.set()
+    checkpoint.remove()
+    return copied
@@ -0,0 +1,120 @@
+from itertools import islice
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QAbstractTableModel, QModelIndex
+
+PAGE_SIZE = 200
+
+def iter_pages(rows):
+    """fetch_page روی یک iterator/cursor؛ هر بار صفحه بعدی را از جریان نتایج می‌خواند"""
+    it = iter(rows)
+    return lambda q, limit, after: list(islice(it, limit))
+
+class PagedTableModel(QAbstractTableModel):
+    """مدل جدولی که ردیف‌ها را صفحه‌به‌صفحه و فقط هنگام نیاز از دیتابیس می‌خواند"""
+    # fetch_page(q, limit, after) -> list[tuple] ؛ after آخرین ردیف خوانده‌شده (None برای صفحه اول)
+    # تا صفحه بعد با keyset ادامه دهد ؛ formatters: {column: callable}
+
+    def __init__(self, fetch_page, headers, formatters=None, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self._fetch_page = fetch_page
+        self._headers = list(headers)
+        self._formatters = formatters or {}
+        self._page_size = page_size
+        self._rows = []
+        self._query = None
+        self._exhausted = True
+
+    # --- query control ---
+    def set_query(self, q=None):
+        self.beginResetModel()
+        self._query = q or None
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def set_rows(self, q, rows):
+        """نتیجه صفحه اول که از قبل (مثلاً روی ترد جستجو) خوانده شده"""
+        self.beginResetModel()
+        self._query = q or None
+        self._rows = list(rows)
+        self._exhausted = len(self._rows) < self._page_size
+        self.endResetModel()
+
+    def refresh(self):
+        self.set_query(self._query)
+
+    def query(self):
+        return self._query
+
+    def row_data(self, row):
+        return self._rows[row]
+
+    # --- lazy loading ---
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        page = self._fetch_page(self._query, self._page_size, self._rows[-1] if self._rows else None)
+        if len(page) < self._page_size:
+            self._exhausted = True
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        val = self._rows[index.row()][index.column()]
+        fmt = self._formatters.get(index.column())
+        return fmt(val) if fmt else ("" if val is None else str(val))
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+class SuggestionModel(QAbstractListModel):
+    """مدل پیشنهادهای QCompleter؛ ردیف‌ها از Catalog.suggest جایگزین می‌شوند (بدون فیلتر خود Qt)"""
+    # rows: [(id, text, detail)] ؛ EditRole متنی است که در فیلد نوشته می‌شود
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def row_data(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row_id, text, detail = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{text}  —  {detail}" if detail not in (None, "") else text
+        if role == Qt.ItemDataRole.EditRole:
+            return text
+        if role == Qt.ItemDataRole.UserRole:
+            return row_id
+        return None
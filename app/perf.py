@@ -0,0 +1,238 @@
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+import types
+from bisect import bisect_left
+from itertools import islice
+from logging.handlers import RotatingFileHandler
+
+# اندازه‌گیری مسیرهای پرتکرار: متدهای Database و refresh_*/export_* پنجره اصلی.
+# فقط با HESABDARI_PERF=1 یا --perf فعال می‌شود؛ در حالت غیرفعال هیچ متدی پوشانده نمی‌شود.
+
+SLOW_MS = float(os.environ.get("HESABDARI_SLOW_MS", 100))
+LOG_NAME = "slow-queries.log"
+LOG_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+# مرزهای سطل‌های هیستوگرام (میلی‌ثانیه)، تقریباً لگاریتمی
+BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+EXPLAIN_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+SKIP_METHODS = {"transaction", "bulk_load", "close", "backups"}
+_END = object()
+
+log = logging.getLogger("hesabdari.perf")
+
+def enabled(argv=()):
+    return os.environ.get("HESABDARI_PERF") == "1" or "--perf" in argv
+
+class Histogram:
+    __slots__ = ("counts", "n", "total", "max", "rows")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.n = 0; self.total = 0.0; self.max = 0.0; self.rows = 0
+
+    def add(self, ms, rows=None):
+        self.counts[bisect_left(BOUNDS, ms)] += 1
+        self.n += 1; self.total += ms
+        if ms > self.max: self.max = ms
+        if rows: self.rows += rows
+
+    def percentile(self, p):
+        """مرز بالای سطلی که صدک p در آن است (برای سطل آخر بیشینه واقعی)"""
+        target = p / 100 * self.n; seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= target:
+                return min(BOUNDS[i], self.max) if i < len(BOUNDS) else self.max
+        return 0.0
+
+class PerfMonitor:
+    """هیستوگرام زمان و تعداد سطر برای هر نام؛ پرس‌وجوهای کند با EXPLAIN QUERY PLAN ثبت می‌شوند"""
+
+    def __init__(self, slow_ms=SLOW_MS, log_path=None):
+        self.slow_ms = slow_ms
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.log_path = None
+        if log_path:
+            self.set_log_path(log_path)
+
+    def set_log_path(self, path):
+        if self.log_path == path:
+            return
+        for h in list(log.handlers):
+            log.removeHandler(h); h.close()
+        handler = RotatingFileHandler(path, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log.addHandler(handler); log.setLevel(logging.INFO); log.propagate = False
+        self.log_path = path
+
+    def record(self, name, ms, rows=None):
+        with self._lock:
+            h = self.stats.get(name)
+            if h is None:
+                h = self.stats[name] = Histogram()
+            h.add(ms, rows)
+
+    def snapshot(self):
+        """[(name, count, avg, p50, p95, max, rows)] به ترتیب بیشترین زمان کل"""
+        with self._lock:
+            items = [(name, h.n, h.total / h.n, h.percentile(50), h.percentile(95), h.max, h.rows, h.total)
+                     for name, h in self.stats.items() if h.n]
+        items.sort(key=lambda r: r[-1], reverse=True)
+        return [r[:-1] for r in items]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    # --- SQL trace ---
+    def _frames(self):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _trace(self, sql):
+        frames = getattr(self._local, "frames", None)
+        if not frames or sql.startswith("--"):  # "-- TRIGGER ..." عبارت‌های داخل تریگر
+            return
+        frame = frames[-1]
+        # با اجرای تریگرها همان عبارت بیرونی دوباره گزارش می‌شود
+        if not frame or frame[-1] != sql:
+            frame.append(sql)
+
+    def attach(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    def timed(self, name, fn, conn=None):
+        """fn را با ثبت زمان می‌پوشاند؛ conn() اتصال ترد جاری برای EXPLAIN"""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            frames = self._frames(); frames.append([])
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - t0) * 1000
+                statements = frames.pop()
+                if frames:
+                    frames[-1].extend(statements)
+            if isinstance(result, (sqlite3.Cursor, types.GeneratorType)):
+                # cursor/generator: بیشتر کار هنگام خواندن سطرهاست، پس در پایان خواندن ثبت می‌شود
+                return _TimedRows(self, name, result, ms, statements, conn)
+            self._done(name, ms, len(result) if isinstance(result, list) else None, statements, conn)
+            return result
+        wrapper.__perf__ = True
+        return wrapper
+
+    def _done(self, name, ms, rows, statements, conn):
+        self.record(name, ms, rows)
+        if ms >= self.slow_ms:
+            self._log_slow(name, ms, rows, statements, conn() if conn else None)
+
+    def _log_slow(self, name, ms, rows, statements, conn):
+        lines = [f"{ms:9.1f} ms  {name}" + (f"  rows={rows}" if rows is not None else "")]
+        for sql in statements[:20]:
+            lines.append("    " + " ".join(sql.split())[:2000])
+            if conn is not None and sql.lstrip().upper().startswith(EXPLAIN_STATEMENTS):
+                try:
+                    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+                        lines.append(f"        {row[-1]}")
+                except sqlite3.Error:
+                    pass
+        log.info("\n".join(lines))
+
+    # --- instrumentation ---
+    def instrument_database(self, db):
+        """همه متدهای عمومی این نمونه Database پوشانده می‌شوند و trace روی اتصال‌ها فعال می‌شود"""
+        self.set_log_path(os.path.join(os.path.dirname(os.path.abspath(db.db_name)), LOG_NAME))
+        db.pool.add_hook(self.attach)
+        conn = lambda: db.conn
+        for name in dir(type(db)):
+            if name.startswith("_") or name in SKIP_METHODS:
+                continue
+            attr = getattr(type(db), name)
+            if callable(attr) and not isinstance(attr, type):
+                setattr(db, name, self.timed(f"db.{name}", getattr(db, name), conn))
+        return db
+
+    def instrument(self, obj, prefix, names, conn=None):
+        """متدها/توابع obj که با یکی از names شروع می‌شوند (یک بار) پوشانده می‌شوند"""
+        for name in dir(obj):
+            if not name.startswith(tuple(names)):
+                continue
+            fn = getattr(obj, name)
+            if callable(fn) and not getattr(fn, "__perf__", False):
+                setattr(obj, name, self.timed(f"{prefix}.{name}", fn, conn))
+        return obj
+
+    def instrument_reports(self, reports, prefix="report", conn=None):
+        """query هر گزارش در دیکشنری key -> (title, headers, query, formatters) پوشانده می‌شود"""
+        for key, (title, headers, query, formatters) in list(reports.items()):
+            if not getattr(query, "__perf__", False):
+                reports[key] = (title, headers, self.timed(f"{prefix}.{key}", query, conn), formatters)
+        return reports
+
+    def format(self):
+        rows = self.snapshot()
+        out = [f"{'name':<32} {'count':>7} {'avg':>9} {'p50':>9} {'p95':>9} {'max':>9} {'rows':>9}"]
+        for name, n, avg, p50, p95, mx, r in rows:
+            out.append(f"{name:<32} {n:>7} {avg:>9.2f} {p50:>9.2f} {p95:>9.2f} {mx:>9.2f} {r:>9}")
+        return "\n".join(out)
+
+class _TimedRows:
+    """نتیجه تنبل یک تابع پوشانده‌شده؛ زمان هر next روی زمان اجرا جمع و با پایان خواندن
+    (یا رها شدن نیمه‌کاره) ثبت می‌شود. ویژگی‌های دیگر (description و ...) از خود cursor است"""
+
+    def __init__(self, monitor, name, rows, ms, statements, conn):
+        self._monitor = monitor; self._name = name; self._rows = rows
+        self._ms = ms; self._statements = statements; self._conn = conn
+        self._n = 0; self._done = False
+
+    def __getattr__(self, attr):
+        return getattr(self._rows, attr)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frames = self._monitor._frames(); frames.append(self._statements)  # generator ها پرس‌وجو را اینجا اجرا می‌کنند
+        t0 = time.perf_counter()
+        try:
+            row = next(self._rows, _END)
+        finally:
+            self._ms += (time.perf_counter() - t0) * 1000
+            frames.pop()
+        if row is _END:
+            self._finish(); raise StopIteration
+        self._n += 1
+        return row
+
+    def fetchone(self):
+        return next(self, None)
+
+    def fetchmany(self, size=None):
+        return list(islice(self, size or getattr(self._rows, "arraysize", 1)))
+
+    def fetchall(self):
+        return list(self)
+
+    def close(self):
+        self._finish()
+        close = getattr(self._rows, "close", None)
+        if close is not None:
+            close()
+
+    def _finish(self, explain=True):
+        if not self._done:
+            self._done = True
+            self._monitor._done(self._name, self._ms, self._n, self._statements, self._conn if explain else None)
+
+    def __del__(self):
+        # ممکن است پس از بسته شدن دیتابیس باشد؛ EXPLAIN اتصال تازه باز نکند
+        self._finish(explain=False)
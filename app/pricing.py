@@ -0,0 +1,33 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# مبالغ به ریال و بدون اعشار گرد می‌شوند
+MONEY = Decimal("1")
+HUNDRED = Decimal(100)
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == "":
+        return Decimal(0)
+    # float از طریق str تبدیل می‌شود تا خطای نمایش دودویی وارد محاسبه نشود
+    value = Decimal(str(value).replace(",", ""))
+    if not value.is_finite():
+        raise InvalidOperation(f"عدد نامعتبر: {value}")  # NaN در مقایسه‌ها خطا می‌دهد
+    return value
+
+def money(value):
+    return to_decimal(value).quantize(MONEY, rounding=ROUND_HALF_UP)
+
+def line_amounts(quantity, unit_price, discount_pct=0, vat_percent=0):
+    """(gross, discount, tax, total) یک ردیف فاکتور با حساب دهدهی دقیق"""
+    gross = money(to_decimal(quantity) * to_decimal(unit_price))
+    discount = money(gross * to_decimal(discount_pct) / HUNDRED)
+    tax = money((gross - discount) * to_decimal(vat_percent) / HUNDRED)
+    return gross, discount, tax, gross - discount + tax
+
+def invoice_totals(lines):
+    """جمع ردیف‌هایی که line_amounts برگردانده: subtotal, discount, tax, total"""
+    subtotal = discount = tax = total = Decimal(0)
+    for g, d, t, n in lines:
+        subtotal += g; discount += d; tax += t; total += n
+    return subtotal, discount, tax, total
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+
+from app.jalali import month_bounds, format_iso, format_month
+
+# همه گزارش‌ها روی ستون‌های تاریخ ISO و ایندکس‌دار اجرا می‌شوند و یک cursor
+# برمی‌گردانند تا نتیجه‌های بزرگ صفحه‌به‌صفحه (fetchmany) خوانده شوند؛ با conn
+# پرس‌وجو روی اتصال جدا (مثلاً cursor طولانی نمای گزارش) اجرا می‌شود.
+# تبدیل به تاریخ شمسی فقط در formatter ها و هنگام نمایش انجام می‌شود.
+
+def _iso(d):
+    return d.isoformat() if isinstance(d, date) else str(d)
+
+def _next_month(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _full_months(start, end):
+    """[lo, hi): ماه‌های میلادی کامل داخل بازه؛ اگر نباشد lo = hi = روز بعد از end"""
+    s, e = date.fromisoformat(_iso(start)), date.fromisoformat(_iso(end))
+    lo = s if s.day == 1 else _next_month(s)
+    hi = _next_month(e) if (e + timedelta(days=1)).day == 1 else e.replace(day=1)
+    if lo >= hi:
+        lo = hi = e + timedelta(days=1)
+    return lo.isoformat(), hi.isoformat()
+
+# kind -> ستون‌های agg_{kind} و agg_{kind}_month
+_ROLLUP_COLUMNS = {"customer": "customer_id, invoices, tax, total",
+                   "product": "product_id, quantity, discount, tax, total"}
+
+def rollup_rows(kind, start, end, schema=""):
+    """(sql, args) ردیف‌های خلاصه بازه: ماه‌های کامل از agg_{kind}_month و روزهای لبه از agg_{kind}"""
+    lo, hi = _full_months(start, end)
+    cols, table = _ROLLUP_COLUMNS[kind], f"{schema}agg_{kind}"
+    sql = f"""
+        SELECT {cols} FROM {table}_month WHERE month >= ? AND month < ?
+        UNION ALL SELECT {cols} FROM {table} WHERE day >= ? AND day < ?
+        UNION ALL SELECT {cols} FROM {table} WHERE day >= ? AND day <= ?"""
+    return sql, [lo[:7], hi[:7], _iso(start), lo, hi, _iso(end)]
+
+def sales_by_period(db, start, end, period="day", conn=None):
+    """(period, invoices, subtotal, discount, tax, total) از جدول خلاصه روزانه"""
+    if period == "jalali_month":
+        return _sales_by_jalali_month(db, start, end, conn)
+    key = {"day": "day", "month": "substr(day,1,7)", "year": "substr(day,1,4)"}[period]
+    return (conn or db.conn).execute(f"""
+        SELECT {key}, sum(invoices), sum(subtotal), sum(discount), sum(tax), sum(total)
+        FROM agg_daily WHERE day BETWEEN ? AND ? GROUP BY 1 ORDER BY 1
+    """, (_iso(start), _iso(end)))
+
+def _sales_by_jalali_month(db, start, end, conn=None):
+    conn = conn or db.conn
+    start, end = _iso(start), _iso(end)
+    bounds = month_bounds(date.fromisoformat(start), date.fromisoformat(end))
+    if not bounds:
+        return conn.execute("SELECT 0,0,0,0,0,0 WHERE 0")
+    values = ",".join("(?,?,?)" for _ in bounds)
+    args = []
+    for jy, jm, lo, hi in bounds:
+        args += [jy * 100 + jm, max(lo.isoformat(), start), hi.isoformat()]
+    # هر ماه شمسی یک بازه روی کلید اصلی agg_daily است
+    return conn.execute(f"""
+        WITH m(k, lo, hi) AS (VALUES {values})
+        SELECT m.k, sum(a.invoices), sum(a.subtotal), sum(a.discount), sum(a.tax), sum(a.total)
+        FROM m JOIN agg_daily a ON a.day >= m.lo AND a.day < m.hi AND a.day <= ?
+        GROUP BY m.k ORDER BY m.k
+    """, args + [end])
+
+def tax_by_jalali_month(db, start, end, conn=None):
+    """(month, taxable, tax)"""
+    for k, _, subtotal, discount, tax, _ in _sales_by_jalali_month(db, start, end, conn):
+        yield k, (subtotal or 0) - (discount or 0), tax
+
+def sales_by_customer(db, start, end, conn=None):
+    """(customer_id, name, invoices, tax, total)"""
+    rows, args = rollup_rows("customer", start, end)
+    # نام پس از جمع زدن و فقط یک بار برای هر مشتری خوانده می‌شود
+    return (conn or db.conn).execute(f"""
+        SELECT a.customer_id, coalesce(c.name, '-'), a.invoices, a.tax, a.total
+        FROM (SELECT customer_id, sum(invoices) AS invoices, sum(tax) AS tax, sum(total) AS total
+              FROM ({rows}) GROUP BY customer_id) a
+        LEFT JOIN customers c ON c.id = a.customer_id ORDER BY 5 DESC
+    """, args)
+
+def sales_by_product(db, start, end, conn=None):
+    """(product_id, name, quantity, discount, tax, total)"""
+    rows, args = rollup_rows("product", start, end)
+    return (conn or db.conn).execute(f"""
+        SELECT a.product_id, coalesce(p.name, '-'), a.quantity, a.discount, a.tax, a.total
+        FROM (SELECT product_id, sum(quantity) AS quantity, sum(discount) AS discount, sum(tax) AS tax, sum(total) AS total
+              FROM ({rows}) GROUP BY product_id) a
+        LEFT JOIN products p ON p.id = a.product_id ORDER BY 6 DESC
+    """, args)
+
+def invoices_in_range(db, start, end, conn=None):
+    """(id, date, customer, subtotal, discount, tax, total) — فهرست کامل، مرتب بر اساس تاریخ"""
+    return (conn or db.conn).execute("""
+        SELECT id, date, customer, subtotal, discount, tax, total
+        FROM invoices WHERE date BETWEEN ? AND ? ORDER BY date, id
+    """, (_iso(start), _iso(end)))
+
+# --- formatters (فقط هنگام نمایش) ---
+def fmt_money(v):
+    return f"{v or 0:,.0f}"
+
+def fmt_qty(v):
+    return f"{v or 0:,.2f}".rstrip("0").rstrip(".")
+
+def fmt_jalali_month(k):
+    return format_month(k // 100, k % 100)
+
+_MONEY5 = {c: fmt_money for c in (2, 3, 4, 5)}
+_PERIOD_HEADERS = ["دوره", "تعداد فاکتور", "جمع جزء", "تخفیف", "مالیات", "جمع کل"]
+
+# key -> (title, headers, query(db, start, end, conn=None), formatters)
+REPORTS = {
+    "daily": ("فروش روزانه", _PERIOD_HEADERS,
+              lambda db, s, e, conn=None: sales_by_period(db, s, e, "day", conn), {0: format_iso, **_MONEY5}),
+    "jalali_month": ("فروش ماهانه", _PERIOD_HEADERS,
+                     lambda db, s, e, conn=None: sales_by_period(db, s, e, "jalali_month", conn), {0: fmt_jalali_month, **_MONEY5}),
+    "tax": ("مالیات بر ارزش افزوده (ماهانه)", ["ماه", "مبلغ مشمول", "مالیات"],
+            tax_by_jalali_month, {0: fmt_jalali_month, 1: fmt_money, 2: fmt_money}),
+    "customer": ("فروش به تفکیک مشتری", ["شناسه", "مشتری", "تعداد فاکتور", "مالیات", "جمع کل"],
+                 sales_by_customer, {3: fmt_money, 4: fmt_money}),
+    "product": ("فروش به تفکیک کالا", ["شناسه", "کالا", "تعداد", "تخفیف", "مالیات", "جمع کل"],
+                sales_by_product, {2: fmt_qty, **_MONEY5}),
+    "invoices": ("فهرست فاکتورها", ["شماره", "تاریخ", "مشتری", "جمع جزء", "تخفیف", "مالیات", "جمع کل"],
+                 invoices_in_range, {1: format_iso, 3: fmt_money, 4: fmt_money, 5: fmt_money, 6: fmt_money}),
+}
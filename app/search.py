@@ -0,0 +1,85 @@
+import sqlite3
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from app.models import PAGE_SIZE
+
+DEBOUNCE_MS = 250
+
+class SearchWorker(QObject):
+    """اجرای جستجو روی ترد جدا؛ ConnectionManager برای این ترد اتصال جداگانه می‌سازد"""
+    found = pyqtSignal(str, int, str, object)  # kind, generation, query, rows
+
+    def __init__(self, db, latest):
+        super().__init__()
+        self.db = db
+        self._latest = latest  # kind -> آخرین generation درخواست‌شده (از ترد GUI نوشته می‌شود)
+        self._conn = None
+
+    @pyqtSlot(str, int, str)
+    def search(self, kind, gen, q):
+        if self._latest.get(kind) != gen:
+            return  # درخواست کهنه؛ قبل از اجرا کنار گذاشته می‌شود
+        if self._conn is None:
+            self._conn = self.db.conn  # اتصال مخصوص همین ترد
+        fetch = getattr(self.db, f"list_{kind}")
+        while self._latest.get(kind) == gen:
+            try:
+                rows = fetch(q or None, PAGE_SIZE)
+            except sqlite3.Error as e:
+                if "interrupt" in str(e):
+                    continue  # اگر interrupt برای درخواست نوع دیگری بود دوباره اجرا می‌شود
+                return  # مثلاً اتصال بسته‌شده هنگام بستن دفتر؛ خطا در slot برنامه را می‌بندد
+            if self._latest.get(kind) == gen:
+                self.found.emit(kind, gen, q, rows)
+            return
+
+    def interrupt(self):
+        if self._conn is not None:
+            self._conn.interrupt()
+
+    @pyqtSlot()
+    def close(self):
+        if self._conn is not None:
+            self.db.pool.release(); self._conn = None
+
+class AsyncSearch(QObject):
+    """جستجوی همزمان با تایپ: debounce روی ترد GUI، اجرا روی ترد کارگر"""
+    requested = pyqtSignal(str, int, str)
+    finished = pyqtSignal(str, str, object)  # kind, query, rows
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self._latest = {}
+        self._timers = {}
+        self._thread = QThread(self)
+        self._worker = SearchWorker(db, self._latest)
+        self._worker.moveToThread(self._thread)
+        self.requested.connect(self._worker.search)
+        self._worker.found.connect(self._on_found)
+        self._thread.finished.connect(self._worker.close)
+        self._thread.start()
+
+    def debounce(self, line_edit, kind, delay=DEBOUNCE_MS):
+        timer = QTimer(self); timer.setSingleShot(True); timer.setInterval(delay)
+        timer.timeout.connect(lambda: self.request(kind, line_edit.text().strip()))
+        line_edit.textChanged.connect(lambda _: timer.start())
+        line_edit.returnPressed.connect(lambda: self.request(kind, line_edit.text().strip()))
+        self._timers[kind] = timer
+
+    def request(self, kind, q):
+        timer = self._timers.get(kind)
+        if timer is not None:
+            timer.stop()
+        gen = self._latest.get(kind, 0) + 1
+        self._latest[kind] = gen
+        self._worker.interrupt()  # sqlite3 interrupt از هر تردی مجاز است
+        self.requested.emit(kind, gen, q)
+
+    def _on_found(self, kind, gen, q, rows):
+        if self._latest.get(kind) == gen:
+            self.finished.emit(kind, q, rows)
+
+    def shutdown(self):
+        self._latest.clear()
+        self._thread.quit(); self._thread.wait()
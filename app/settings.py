@@ -0,0 +1,93 @@
+import configparser
+import os
+import threading
+from functools import lru_cache
+
+# تنظیمات در حافظه: assets/settings.ini به عنوان پیش‌فرض، جدول settings روی آن.
+# خواندن هرگز به دیسک نمی‌رسد؛ نوشتن فوراً در کش اعمال و کلیدهای تغییرکرده یک‌جا ذخیره می‌شوند.
+
+INI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "settings.ini")
+FLUSH_BATCH = 64  # با این تعداد کلید تغییرکرده بدون انتظار برای flush ذخیره می‌شود
+
+@lru_cache(maxsize=4)
+def load_ini(path=INI_PATH):
+    """کلیدهای بخش [app] با نام خودشان، بقیه بخش‌ها با پیشوند (مثلاً sqlite.db_file)"""
+    cp = configparser.ConfigParser(interpolation=None)
+    cp.read(path, encoding="utf-8")  # نبودن فایل خطا نیست
+    values = {}
+    for section in cp.sections():
+        for key, value in cp.items(section):
+            values[key if section == "app" else f"{section}.{key}"] = value
+    return values
+
+class Settings:
+    """کش تنظیمات یک Database؛ listener(key, value) پس از هر تغییر صدا زده می‌شود"""
+
+    def __init__(self, db, ini_path=INI_PATH):
+        self.db = db
+        self.ini_path = ini_path
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._dirty = {}
+        self.reload()
+
+    def reload(self):
+        """خواندن دوباره از INI و دیتابیس (مثلاً پس از بازیابی نسخه پشتیبان)؛ تغییرات ذخیره‌نشده کنار می‌روند"""
+        stored = dict(self.db.conn.execute("SELECT key, value FROM settings"))
+        values = {**load_ini(self.ini_path), **stored}
+        with self._lock:
+            self._values = values
+            self._stored = set(stored)
+            self._dirty = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def stored(self, key, default=None):
+        """مقدار همین دیتابیس (ذخیره‌شده یا در انتظار flush)، بدون پیش‌فرض INI"""
+        return self._values.get(key, default) if key in self._stored else default
+
+    def set(self, key, value):
+        value = "" if value is None else str(value)
+        with self._lock:
+            if self._values.get(key) == value:
+                return
+            self._values[key] = value
+            self._stored.add(key)
+            self._dirty[key] = value
+            full = len(self._dirty) >= FLUSH_BATCH
+        for listener in list(self._listeners):
+            listener(key, value)
+        if full:
+            self.flush()
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def pending(self):
+        return len(self._dirty)
+
+    def flush(self):
+        """ذخیره کلیدهای تغییرکرده در یک تراکنش؛ تعداد کلیدها را برمی‌گرداند"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?) "
+                                 "ON CONFLICT(key) DO UPDATE SET value=excluded.value", dirty.items())
+        except BaseException:
+            with self._lock:
+                for key, value in dirty.items():
+                    self._dirty.setdefault(key, value)
+            raise
+        return len(dirty)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
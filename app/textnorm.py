@@ -0,0 +1,54 @@
+import re
+
+# یکسان‌سازی حروف عربی/فارسی و ارقام برای جستجو و ایندکس FTS
+CHAR_MAP = {
+    "ي": "ی",
+    "ى": "ی",
+    "ك": "ک",
+}
+for _i in range(10):
+    CHAR_MAP[chr(0x06F0 + _i)] = str(_i)  # ارقام فارسی
+    CHAR_MAP[chr(0x0660 + _i)] = str(_i)  # ارقام عربی
+
+PHONE_SEPARATORS = " -()+./"
+
+_TRANS = str.maketrans(CHAR_MAP)
+_NEEDS_TRANS = re.compile("[" + "".join(CHAR_MAP) + "]")
+_PHONE_TRANS = str.maketrans({**CHAR_MAP, **{ch: None for ch in PHONE_SEPARATORS}})
+_PHONE_RE = re.compile(r"^[\d\s\-()+./]+$")
+_TOKEN_RE = re.compile(r"\w+")
+
+def normalize(text):
+    # translate با جدول dict روی متن غیر ASCII کند است؛ بیشتر متن‌ها نیازی به آن ندارند
+    return text.translate(_TRANS) if text and _NEEDS_TRANS.search(text) else text
+
+def normalize_phone(text):
+    return text.translate(_PHONE_TRANS) if text else text
+
+def register_sql_functions(conn):
+    """توابع یکسان‌سازی را برای استفاده در تریگرهای FTS روی اتصال ثبت می‌کند"""
+    conn.create_function("fa_norm", 1, normalize, deterministic=True)
+    conn.create_function("fa_norm_phone", 1, normalize_phone, deterministic=True)
+
+SQL_CHUNK = 8  # replace های تو در تو در هر سطح؛ حدود ۳۰ سطح پشته parser را پر می‌کند
+
+def sql_normalize(expr, phone=False):
+    """معادل normalize/normalize_phone با replace خود SQLite؛ برای تریگرهای FTS که باید بدون
+    توابع برنامه (مثلاً از sqlite3 خط فرمان یا ابزارهای دیگر) هم کار کنند"""
+    pairs = list(CHAR_MAP.items()) + ([(ch, "") for ch in PHONE_SEPARATORS] if phone else [])
+    for i in range(0, len(pairs), SQL_CHUNK):
+        chunk = expr if i == 0 else "v"
+        for src, dst in pairs[i:i + SQL_CHUNK]:
+            chunk = f"replace({chunk},'{src}','{dst}')"
+        expr = chunk if i == 0 else f"(SELECT {chunk} FROM (SELECT {expr} AS v))"
+    return expr
+
+def fts_query(q):
+    """تبدیل متن جستجو به عبارت MATCH با جستجوی پیشوندی؛ اگر توکنی نماند None"""
+    q = normalize(q.strip())
+    if _PHONE_RE.match(q):
+        q = normalize_phone(q)
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
@@ -16,7 +16,7 @@ def apply_dark_blue_theme(app):
         QLineEdit, QComboBox, QDateEdit, QSpinBox, QDoubleSpinBox {
             background-color: #1a1d2b; border: 1px solid #343a52; padding: 6px; border-radius: 6px;
         }
-        QTableWidget { background-color: #161927; gridline-color: #2f3550; selection-background-color: #2c3155; }
+        QTableWidget, QTableView { background-color: #161927; gridline-color: #2f3550; selection-background-color: #2c3155; }
         QHeaderView::section { background-color: #222742; color: #ddd; padding: 6px; border: none; }
         QLabel[title="true"] { font-size: 26px; font-weight: 800; margin: 40px 0; }
     """
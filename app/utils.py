@@ -1,7 +1,10 @@
-from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from PyQt6.QtGui import QPainter
-from PyQt6.QtCore import QSize
-from PyQt6.QtPrintSupport import QPrinter
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QApplication
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+from app.documents import (
+    IMAGE_DPI, IMAGE_QUALITY, export_invoices_pdf, export_invoices_separately, image_formats,
+    invoice_document, page_layout, print_pages, render_image, render_pdf, report_html
+)
 
 def _choose_path(parent, title, filters, default_ext):
     path, sel = QFileDialog.getSaveFileName(parent, title, filter=filters)
@@ -11,39 +14,108 @@ def _choose_path(parent, title, filters, default_ext):
         path = f"{path}.{default_ext}"
     return path
 
-def _render_widget_to_pdf(widget, out_path):
-    printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-    printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-    printer.setOutputFileName(out_path)
-    # A4 size in points ~ 2480x3508 at 300dpi, but QPrinter handles auto scaling
-    painter = QPainter(printer)
-    widget.render(painter)
-    painter.end()
+class ImageExportThread(QThread):
+    """رندر و کد کردن تصویر در پس‌زمینه تا پنجره برای سندهای بلند قفل نشود"""
+    done = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, html, path, dpi, quality, parent=None):
+        super().__init__(parent)
+        self.html = html; self.path = path; self.dpi = dpi; self.quality = quality
+
+    def run(self):
+        try:
+            paths = render_image(self.html, self.path, self.dpi, self.quality)
+        except (OSError, ValueError) as e:
+            self.failed.emit(str(e)); return
+        self.done.emit(paths)
+
+def _int_setting(db, key, default, low, high):
+    try:
+        return min(high, max(low, int(db.get_setting(key, default))))
+    except (TypeError, ValueError):
+        return default
+
+def _export_image(parent, html, title):
+    if getattr(parent, "_image_thread", None) is not None:
+        QMessageBox.information(parent, "خروجی", "ساخت تصویر قبلی هنوز تمام نشده است."); return
+    exts = image_formats()
+    path = _choose_path(parent, title, "Images (" + " ".join(f"*.{e}" for e in exts) + ")", "png")
+    if not path: return
+    dpi = _int_setting(parent.db, "image_dpi", IMAGE_DPI, 72, 600)
+    quality = _int_setting(parent.db, "image_quality", IMAGE_QUALITY, 1, 100)
+    t = parent._image_thread = ImageExportThread(html, path, dpi, quality, parent)
+
+    def finished(paths=None, error=None):
+        parent._image_thread = None; t.deleteLater()
+        if error:
+            QMessageBox.warning(parent, "خطا", f"ساخت تصویر ناموفق بود:\n{error}")
+        elif len(paths) == 1:
+            QMessageBox.information(parent, "فایل ذخیره شد", f"عکس در مسیر\n{path}\nذخیره شد.")
+        else:
+            QMessageBox.information(parent, "فایل‌ها ذخیره شد", f"سند بلند در {len(paths)} تکه\n{paths[0]} ...\nذخیره شد.")
 
-def _render_widget_to_image(widget, out_path):
-    pm = widget.grab()  # QPixmap
-    pm.save(out_path)
+    t.done.connect(lambda paths: finished(paths=paths))
+    t.failed.connect(lambda err: finished(error=err))
+    t.start()
 
 def export_invoice_pdf(parent):
+    inv_id = getattr(parent, "last_invoice_id", None)
+    if inv_id is None:
+        QMessageBox.warning(parent, "خطا", "ابتدا فاکتور را ثبت کنید."); return
     path = _choose_path(parent, "ذخیره PDF فاکتور", "PDF Files (*.pdf)", "pdf")
     if not path: return
-    _render_widget_to_pdf(parent.centralWidget(), path)
+    export_invoices_pdf(parent.db, [inv_id], path)
     QMessageBox.information(parent, "فایل ذخیره شد", f"PDF در مسیر\n{path}\nذخیره شد.")
 
+def preview_invoice(parent):
+    """پیش‌نمایش چاپ همان سند خروجی PDF فاکتور (A4 و حاشیه‌ها یکسان)"""
+    from PyQt6.QtPrintSupport import QPrintPreviewDialog
+    inv_id = getattr(parent, "last_invoice_id", None)
+    html = invoice_document(parent.db, inv_id) if inv_id is not None else None
+    if html is None:
+        QMessageBox.warning(parent, "خطا", "ابتدا فاکتور را ثبت کنید."); return
+    dlg = QPrintPreviewDialog(parent)
+    dlg.printer().setPageLayout(page_layout())
+    dlg.paintRequested.connect(lambda printer: print_pages([html], printer))
+    dlg.exec()
+
 def export_invoice_image(parent):
-    path = _choose_path(parent, "ذخیره تصویر فاکتور", "Images (*.png *.jpg)", "png")
-    if not path: return
-    _render_widget_to_image(parent.centralWidget(), path)
-    QMessageBox.information(parent, "فایل ذخیره شد", f"عکس در مسیر\n{path}\nذخیره شد.")
+    inv_id = getattr(parent, "last_invoice_id", None)
+    html = invoice_document(parent.db, inv_id) if inv_id is not None else None
+    if html is None:
+        QMessageBox.warning(parent, "خطا", "ابتدا فاکتور را ثبت کنید."); return
+    _export_image(parent, html, "ذخیره تصویر فاکتور")
 
 def export_report_pdf(parent):
+    title, headers, rows, formatters = parent.current_report()
     path = _choose_path(parent, "ذخیره PDF گزارش", "PDF Files (*.pdf)", "pdf")
     if not path: return
-    _render_widget_to_pdf(parent.centralWidget(), path)
+    render_pdf([report_html(title, headers, rows, formatters)], path)
     QMessageBox.information(parent, "فایل ذخیره شد", f"PDF در مسیر\n{path}\nذخیره شد.")
 
-def export_report_image(parent):
-    path = _choose_path(parent, "ذخیره تصویر گزارش", "Images (*.png *.jpg)", "png")
+def export_invoices_batch(parent, invoice_ids, separate=False):
+    if not invoice_ids:
+        QMessageBox.information(parent, "خروجی", "فاکتوری در این بازه نیست."); return
+    if separate:
+        out_dir = QFileDialog.getExistingDirectory(parent, "پوشه خروجی فاکتورها")
+        if not out_dir: return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            export_invoices_separately(parent.db, invoice_ids, out_dir)
+        finally:
+            QApplication.restoreOverrideCursor()
+        QMessageBox.information(parent, "فایل‌ها ذخیره شد", f"{len(invoice_ids):,} فاکتور در\n{out_dir}\nذخیره شد.")
+        return
+    path = _choose_path(parent, "ذخیره PDF فاکتورها", "PDF Files (*.pdf)", "pdf")
     if not path: return
-    _render_widget_to_image(parent.centralWidget(), path)
-    QMessageBox.information(parent, "فایل ذخیره شد", f"عکس در مسیر\n{path}\nذخیره شد.")
+    QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+    try:
+        export_invoices_pdf(parent.db, invoice_ids, path)
+    finally:
+        QApplication.restoreOverrideCursor()
+    QMessageBox.information(parent, "فایل ذخیره شد", f"PDF در مسیر\n{path}\nذخیره شد.")
+
+def export_report_image(parent):
+    title, headers, rows, formatters = parent.current_report()
+    _export_image(parent, report_html(title, headers, rows, formatters), "ذخیره تصویر گزارش")
@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from urllib.parse import quote
+
+from app.catalog import Catalog
+from app.db import Database
+from app.jalali import month_bounds
+from app.reports import _iso, fmt_jalali_month, fmt_money, fmt_qty, rollup_rows
+from app.settings import load_ini
+
+# چند دفتر (شرکت) هم‌زمان: هر فایل SQLite یک Workspace با Database (اتصال هر ترد)، کش تنظیمات
+# و کاتالوگ خودش است و جابه‌جایی فقط Workspace فعال را عوض می‌کند (بدون اتصال دوباره).
+# گزارش‌های تلفیقی روی اتصالی جدا اجرا می‌شوند که همه فایل‌ها را فقط‌خواندنی ATTACH کرده
+# و برای هر گزارش یک پرس‌وجوی UNION ALL روی جدول‌های خلاصه می‌سازد.
+
+LEGACY_DB = "hesabdari.db"
+REGISTRY_NAME = "workspaces.json"
+MAX_ATTACHED = 10  # پیش‌فرض SQLITE_MAX_ATTACHED
+
+class WorkspaceError(Exception):
+    pass
+
+def default_path(values=None):
+    """sqlite.db_file از settings.ini؛ اگر آن فایل نیست ولی hesabdari.db قدیمی هست، همان"""
+    values = load_ini() if values is None else values
+    target = values.get("sqlite.db_file") or LEGACY_DB
+    if not os.path.exists(target) and os.path.exists(LEGACY_DB):
+        return LEGACY_DB
+    return target
+
+class Workspace:
+    """یک فایل دیتابیس با Database، تنظیمات و کاتالوگ‌های خودش"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.db = Database(self.path)
+        self._catalogs = {}
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def name(self):
+        # company_name_fa نمونه settings.ini برای همه دفترها یکی است؛ فقط مقدار خود دیتابیس
+        return self.db.settings.stored("company_name_fa") or os.path.splitext(self.file_name)[0]
+
+    @property
+    def label(self):
+        return f"{self.name} ({self.file_name})"
+
+    def catalog(self, kind):
+        """Catalog کالا/مشتری این دفتر؛ در اولین درخواست در پس‌زمینه بارگذاری می‌شود"""
+        catalog = self._catalogs.get(kind)
+        if catalog is None:
+            catalog = self._catalogs[kind] = Catalog(self.db, kind)
+            catalog.load_async()
+        return catalog
+
+    def close(self):
+        for catalog in self._catalogs.values():
+            catalog.close()  # ترد بارگذاری هنوز از اتصال خودش می‌خواند
+        self.db.close()
+
+class WorkspaceManager:
+    """Workspace های باز به ترتیب باز شدن؛ listener(workspace) پس از هر جابه‌جایی"""
+
+    def __init__(self, registry=None):
+        self.registry = registry
+        self.active = None
+        self._items = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._report_conn = None
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, path):
+        return self._items.get(os.path.abspath(path))
+
+    def open(self, path, activate=True):
+        ws = self.get(path)
+        if ws is None:
+            ws = Workspace(path)
+            with self._lock:
+                self._items[ws.path] = ws
+                self._report_conn = None  # فهرست ATTACH تغییر کرده
+        if activate:
+            self.switch(ws.path)
+        else:
+            self.save()
+        return ws
+
+    def switch(self, path):
+        ws = self.get(path)
+        if ws is None:
+            raise WorkspaceError(f"دفتر باز نیست: {path}")
+        if ws is not self.active:
+            self.active = ws
+            for listener in list(self._listeners):
+                listener(ws)
+        self.save()
+        return ws
+
+    def check_close(self, path):
+        if self.get(path) is not None and len(self._items) == 1:
+            raise WorkspaceError("دست‌کم یک دفتر باید باز بماند.")
+
+    def close(self, path):
+        """بستن یک دفتر؛ اگر فعال بود، اولین دفتر باقی‌مانده فعال می‌شود"""
+        ws = self.get(path)
+        if ws is None:
+            return
+        self.check_close(path)
+        with self._lock:
+            del self._items[ws.path]
+            self._report_conn = None
+        if ws is self.active:
+            self.switch(next(iter(self._items)))
+        else:
+            self.save()
+        ws.close()
+
+    def close_all(self):
+        with self._lock:
+            items, self._items = list(self._items.values()), {}
+            self._report_conn = None
+        for ws in items:
+            ws.close()
+        self.active = None
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    # --- registry ---
+    def restore(self, default):
+        """باز کردن دفترهای ذخیره‌شده در registry (فایل‌هایی که هنوز هستند) یا فقط default"""
+        paths, active = [], None
+        if self.registry and os.path.exists(self.registry):
+            try:
+                with open(self.registry, encoding="utf-8") as f:
+                    data = json.load(f)
+                paths, active = [p for p in data.get("paths", []) if os.path.exists(p)], data.get("active")
+            except (OSError, ValueError):
+                pass
+        for path in paths or [default]:
+            self.open(path, activate=False)
+        self.switch(active if self.get(active or "") else next(iter(self._items)))
+        return self.active
+
+    def save(self):
+        if not self.registry or self.active is None:
+            return
+        tmp = self.registry + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"paths": list(self._items), "active": self.active.path}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.registry)
+
+    # --- consolidated reports ---
+    def _connection(self):
+        """اتصال گزارش با همه دفترها ATTACH شده (w0, w1, ...)؛ با تغییر فهرست دوباره ساخته می‌شود"""
+        with self._lock:
+            if self._report_conn is not None:
+                return self._report_conn
+            items = list(self._items.values())
+            if len(items) > MAX_ATTACHED:
+                raise WorkspaceError(f"گزارش تلفیقی حداکثر {MAX_ATTACHED} دفتر را پشتیبانی می‌کند.")
+            # اتصال قبلی بسته نمی‌شود تا cursor گزارش‌های در حال نمایش معتبر بمانند
+            conn = sqlite3.connect(":memory:", uri=True, check_same_thread=False)
+            for i, ws in enumerate(items):
+                conn.execute(f"ATTACH DATABASE ? AS w{i}", (f"file:{quote(ws.path)}?mode=ro",))
+            self._report_conn = conn
+            self._schemas = [(f"w{i}", ws) for i, ws in enumerate(items)]
+            return conn
+
+    def _union(self, arm, args):
+        """arm با {s} به جای نام schema؛ اولین ? هر بازو نام دفتر است و سپس args"""
+        conn = self._connection()
+        parts, values = [], []
+        for schema, ws in self._schemas:
+            parts.append(arm.format(s=schema))
+            values += [ws.label, *args]
+        return conn, "\nUNION ALL\n".join(parts), values
+
+    def sales_by_company(self, start, end):
+        """(company, invoices, subtotal, discount, tax, total)"""
+        conn, union, args = self._union("""
+            SELECT ? AS company, sum(invoices) AS invoices, sum(subtotal) AS subtotal,
+                   sum(discount) AS discount, sum(tax) AS tax, sum(total) AS total
+            FROM {s}.agg_daily WHERE day BETWEEN ? AND ?""", (_iso(start), _iso(end)))
+        return conn.execute(f"""
+            SELECT company, coalesce(invoices, 0), subtotal, discount, tax, total
+            FROM ({union}) ORDER BY 6 DESC
+        """, args)
+
+    def sales_by_jalali_month(self, start, end):
+        """(month, invoices, subtotal, discount, tax, total) جمع همه دفترها"""
+        start, end = _iso(start), _iso(end)
+        bounds = month_bounds(date.fromisoformat(start), date.fromisoformat(end))
+        conn, union, args = self._union("""
+            SELECT ? AS company, day, invoices, subtotal, discount, tax, total
+            FROM {s}.agg_daily WHERE day BETWEEN ? AND ?""", (start, end))
+        if not bounds:
+            return conn.execute("SELECT 0,0,0,0,0,0 WHERE 0")
+        values = ",".join("(?,?,?)" for _ in bounds)
+        months = []
+        for jy, jm, lo, hi in bounds:
+            months += [jy * 100 + jm, max(lo.isoformat(), start), hi.isoformat()]
+        return conn.execute(f"""
+            WITH m(k, lo, hi) AS (VALUES {values})
+            SELECT m.k, sum(a.invoices), sum(a.subtotal), sum(a.discount), sum(a.tax), sum(a.total)
+            FROM m JOIN ({union}) a ON a.day >= m.lo AND a.day < m.hi
+            GROUP BY m.k ORDER BY m.k
+        """, months + args)
+
+    def sales_by_customer(self, start, end):
+        """(customer, companies, invoices, tax, total) ؛ مشتری‌ها بر اساس نام یکی می‌شوند"""
+        rows, rollup_args = rollup_rows("customer", start, end, "{s}.")
+        conn, union, args = self._union(f"""
+            SELECT ? AS company, coalesce(c.name, '-') AS name, a.invoices, a.tax, a.total
+            FROM (SELECT customer_id, sum(invoices) AS invoices, sum(tax) AS tax, sum(total) AS total
+                  FROM ({rows}) GROUP BY customer_id) a
+            LEFT JOIN {{s}}.customers c ON c.id = a.customer_id""", rollup_args)
+        return conn.execute(f"""
+            SELECT name, count(DISTINCT company), sum(invoices), sum(tax), sum(total)
+            FROM ({union}) GROUP BY name ORDER BY 5 DESC
+        """, args)
+
+    def sales_by_product(self, start, end):
+        """(product, companies, quantity, discount, tax, total) ؛ کالاها بر اساس نام یکی می‌شوند"""
+        rows, rollup_args = rollup_rows("product", start, end, "{s}.")
+        conn, union, args = self._union(f"""
+            SELECT ? AS company, coalesce(p.name, '-') AS name, a.quantity, a.discount, a.tax, a.total
+            FROM (SELECT product_id, sum(quantity) AS quantity, sum(discount) AS discount, sum(tax) AS tax, sum(total) AS total
+                  FROM ({rows}) GROUP BY product_id) a
+            LEFT JOIN {{s}}.products p ON p.id = a.product_id""", rollup_args)
+        return conn.execute(f"""
+            SELECT name, count(DISTINCT company), sum(quantity), sum(discount), sum(tax), sum(total)
+            FROM ({union}) GROUP BY name ORDER BY 6 DESC
+        """, args)
+
+_MONEY = {c: fmt_money for c in (2, 3, 4, 5)}
+
+# key -> (title, headers, query(manager, start, end), formatters) مانند REPORTS
+CONSOLIDATED = {
+    "all_company": ("تلفیقی: فروش به تفکیک شرکت", ["شرکت", "تعداد فاکتور", "جمع جزء", "تخفیف", "مالیات", "جمع کل"],
+                    WorkspaceManager.sales_by_company, _MONEY),
+    "all_jalali_month": ("تلفیقی: فروش ماهانه همه شرکت‌ها", ["ماه", "تعداد فاکتور", "جمع جزء", "تخفیف", "مالیات", "جمع کل"],
+                         WorkspaceManager.sales_by_jalali_month, {0: fmt_jalali_month, **_MONEY}),
+    "all_customer": ("تلفیقی: فروش به تفکیک مشتری", ["مشتری", "تعداد شرکت", "تعداد فاکتور", "مالیات", "جمع کل"],
+                     WorkspaceManager.sales_by_customer, {3: fmt_money, 4: fmt_money}),
+    "all_product": ("تلفیقی: فروش به تفکیک کالا", ["کالا", "تعداد شرکت", "تعداد", "تخفیف", "مالیات", "جمع کل"],
+                    WorkspaceManager.sales_by_product, {2: fmt_qty, 3: fmt_money, 4: fmt_money, 5: fmt_money}),
+}
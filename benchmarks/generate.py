@@ -0,0 +1,105 @@
+"""تولید داده مصنوعی (با seed ثابت) برای بنچمارک‌ها
+
+    python -m benchmarks.generate --scale 10k --db benchmarks/data/10k/hesabdari.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from app.db import Database
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+BATCH = 20_000
+
+FIRST_NAMES = ["علی", "محمد", "حسین", "رضا", "مهدی", "امیر", "حسن", "سعید", "مجید", "کاوه",
+               "فاطمه", "زهرا", "مریم", "سارا", "نرگس", "لیلا", "مینا", "الهام", "نیلوفر", "شیرین"]
+LAST_NAMES = ["محمدی", "حسینی", "رضایی", "احمدی", "کریمی", "موسوی", "جعفری", "صادقی", "رحیمی", "کاظمی",
+              "قاسمی", "نوری", "عباسی", "یزدانی", "شریفی", "طاهری", "اکبری", "فرهادی", "زارعی", "ملکی"]
+CITIES = ["تهران", "اصفهان", "شیراز", "مشهد", "تبریز", "کرج", "قم", "اهواز", "رشت", "یزد"]
+STREETS = ["خیابان آزادی", "خیابان انقلاب", "خیابان ولیعصر", "بلوار کشاورز", "خیابان شریعتی",
+           "خیابان فردوسی", "بلوار امام", "خیابان حافظ", "خیابان سعدی", "میدان بهار"]
+PRODUCTS = ["دفتر", "خودکار", "مداد", "کاغذ A4", "کلاسور", "ماشین حساب", "چسب", "قیچی", "منگنه", "پوشه",
+            "لپ‌تاپ", "ماوس", "کیبورد", "مانیتور", "هدفون", "فلش", "هارد", "پرینتر", "کابل", "شارژر"]
+VARIANTS = ["ساده", "طرح‌دار", "بزرگ", "کوچک", "اداری", "حرفه‌ای", "اقتصادی", "وارداتی", "ایرانی", "ویژه"]
+
+def _batches(it, size=BATCH):
+    batch = []
+    for row in it:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch; batch = []
+    if batch:
+        yield batch
+
+def customers(rng, n):
+    for _ in range(n):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = "09" + "".join(rng.choice("0123456789") for _ in range(9))
+        address = f"{rng.choice(CITIES)}، {rng.choice(STREETS)}، پلاک {rng.randint(1, 400)}"
+        yield name, phone, address
+
+def products(rng, n):
+    for i in range(n):
+        yield f"{rng.choice(PRODUCTS)} {rng.choice(VARIANTS)} {i}", float(rng.randint(10, 50_000) * 1000)
+
+def invoices(rng, n, n_customers, n_products, prices, start, days, vat=9):
+    """(header, items) با مبالغ از پیش محاسبه‌شده؛ شناسه‌ها از 1 به ترتیب"""
+    for inv_id in range(1, n + 1):
+        day = (start + timedelta(days=rng.randrange(days))).isoformat()
+        cid = rng.randint(1, n_customers)
+        items = []; subtotal = discount = tax = 0.0
+        for _ in range(rng.randint(1, 5)):
+            pid = rng.randint(1, n_products); qty = rng.randint(1, 10); price = prices[pid - 1]
+            gross = qty * price; disc = round(gross * rng.choice((0, 0, 5, 10)) / 100)
+            t = round((gross - disc) * vat / 100)
+            items.append((inv_id, pid, qty, price, disc, t, gross - disc + t))
+            subtotal += gross; discount += disc; tax += t
+        yield (inv_id, cid, day, subtotal, discount, tax, subtotal - discount + tax), items
+
+def generate(db, n, seed=1404, start=date(2023, 3, 21), days=730, log=print):
+    rng = random.Random(seed)
+    n_products = max(1000, n // 10)
+    t0 = time.perf_counter()
+    with db.transaction():
+        for b in _batches(customers(rng, n)):
+            db.add_customers_many(b)
+        log(f"customers: {n:,} ({time.perf_counter() - t0:.1f}s)")
+        prices = []
+        for b in _batches(products(rng, n_products)):
+            db.add_products_many(b); prices += [p for _, p in b]
+        log(f"products: {n_products:,} ({time.perf_counter() - t0:.1f}s)")
+    done = 0
+    for b in _batches(invoices(rng, n, n, n_products, prices, start, days), BATCH // 4):
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO invoices (id,customer_id,date,subtotal,discount,tax,total,customer) "
+                "VALUES (?,?,?,?,?,?,?,(SELECT name FROM customers WHERE id=?))",
+                [h + (h[1],) for h, _ in b])
+            conn.executemany(
+                "INSERT INTO invoice_items (invoice_id,product_id,quantity,unit_price,discount,tax,total,description) "
+                "VALUES (?,?,?,?,?,?,?,(SELECT name FROM products WHERE id=?))",
+                [it + (it[1],) for _, items in b for it in items])
+        done += len(b)
+        log(f"invoices: {done:,} ({time.perf_counter() - t0:.1f}s)")
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.generate")
+    p.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    p.add_argument("--db", required=True)
+    p.add_argument("--seed", type=int, default=1404)
+    args = p.parse_args(argv)
+    if os.path.exists(args.db):
+        print(f"{args.db} exists", file=sys.stderr); return 1
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    db = Database(args.db)
+    try:
+        generate(db, SCALES[args.scale], args.seed, log=lambda m: print(m, file=sys.stderr))
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""اجرای بنچمارک‌ها روی داده مصنوعی و مقایسه با baseline
+
+    python -m benchmarks.run --scale 10k                 # اجرا و مقایسه با baseline-10k.json
+    python -m benchmarks.run --scale 10k --save-baseline # ذخیره نتیجه به عنوان baseline
+
+دیتابیس در benchmarks/data/<scale>/hesabdari.db ساخته می‌شود (اگر نباشد).
+سطرهایی که بنچمارک‌های نوشتن اضافه می‌کنند در پایان حذف می‌شوند تا اجراها قابل مقایسه بمانند.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from app.db import Database
+from benchmarks.generate import SCALES, generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPEAT = 5
+THRESHOLD = 0.20  # کندتر شدن بیش از 20% پسرفت حساب می‌شود
+PAGE = 200
+
+def measure(fn, repeat=REPEAT, ops=1):
+    """زمان هر اجرا با perf_counter؛ میانه و کمینه به میلی‌ثانیه"""
+    fn()  # گرم کردن کش صفحه‌ها و statement cache
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+    med = statistics.median(times)
+    return {"median_ms": round(med * 1000, 3), "min_ms": round(min(times) * 1000, 3),
+            "ops_per_s": round(ops / med, 1) if med else None}
+
+@contextmanager
+def _scratch(db):
+    """سطرهای جدید customers/products/invoices پس از بنچمارک حذف می‌شوند"""
+    top = {t: db.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {t}").fetchone()[0]
+           for t in ("customers", "products", "invoices")}
+    try:
+        yield
+    finally:
+        with db.transaction() as conn:
+            for t, last in top.items():
+                conn.execute(f"DELETE FROM {t} WHERE id > ?", (last,))
+
+# --- cases ---
+def bench_db(db, repeat):
+    r = {}
+    for kind, q in (("customers", "محمد"), ("products", "دفتر")):
+        fn = getattr(db, f"list_{kind}")
+        # صفحه‌های بعدی با keyset: آخرین ردیف صفحه قبل
+        deep, next_ = (fn(None, 50 * PAGE) or [None])[-1], (fn(q, PAGE) or [None])[-1]
+        r[f"list_{kind}.page"] = measure(lambda: fn(None, PAGE), repeat)
+        r[f"list_{kind}.page_deep"] = measure(lambda: fn(None, PAGE, deep), repeat)
+        r[f"list_{kind}.query_page"] = measure(lambda: fn(q, PAGE), repeat)
+        r[f"list_{kind}.query_page_next"] = measure(lambda: fn(q, PAGE, next_), repeat)
+        r[f"list_{kind}.query_prefix"] = measure(lambda: fn(q[:2], PAGE), repeat)
+        r[f"list_{kind}.query_phone"] = measure(lambda: fn("0912", PAGE), repeat)
+        has_fts, db.has_fts = db.has_fts, False
+        try:
+            r[f"list_{kind}.query_like"] = measure(lambda: fn(q, PAGE), repeat)
+        finally:
+            db.has_fts = has_fts
+    return r
+
+def bench_writes(db, repeat, n=500):
+    r = {}
+    with _scratch(db):
+        r["insert.customer"] = measure(lambda: [db.add_customer("مشتری آزمایشی", "09120000000", "تهران") for _ in range(n)], repeat, n)
+        r["insert.product"] = measure(lambda: [db.add_product("کالای آزمایشی", 1000) for _ in range(n)], repeat, n)
+        rows = [("مشتری انبوه", "09350000000", "شیراز")] * (n * 20)
+        def many():
+            with db.transaction():
+                db.add_customers_many(rows)
+        r["insert.customers_many"] = measure(many, repeat, len(rows))
+        r["save_invoice_basic"] = measure(
+            lambda: [db.save_invoice_basic("مشتری آزمایشی", "2024-05-01", 1000, 90, 1090) for _ in range(n)], repeat, n)
+        items = [(1, 2, 15000, 0), (2, 1, 250000, 5), (3, 4, 8000, 10)]
+        r["add_invoice"] = measure(lambda: [db.add_invoice("2024-05-01", items, customer_id=1, vat_percent=9) for _ in range(n // 5)], repeat, n // 5)
+    return r
+
+def bench_reports(db, repeat):
+    from app.reports import REPORTS
+    r = {}
+    for key, (_, _, query, _) in REPORTS.items():
+        r[f"report.{key}"] = measure(lambda: list(query(db, "2023-03-21", "2024-03-19")), repeat)
+    return r
+
+def bench_gui(db_path, repeat):
+    """پر شدن جدول مشتریان و خروجی PDF/تصویر در پنجره اصلی (offscreen)"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from app.documents import export_invoices_pdf, export_invoices_separately, invoice_document, render_image
+    from app.main import MainWindow
+    app = QApplication.instance() or QApplication([])
+    r = {}
+    t0 = time.perf_counter()
+    win = MainWindow(paths=[db_path]); win.show(); app.processEvents()
+    try:
+        r["gui.startup"] = {"median_ms": round((time.perf_counter() - t0) * 1000, 3)}
+        win.tabs.setCurrentIndex(2); app.processEvents()
+
+        def refresh(q=""):
+            win.customer_search.setText(q)
+            win.refresh_customers(); app.processEvents()
+        r["gui.refresh_customers"] = measure(refresh, repeat)
+        r["gui.refresh_customers.query"] = measure(lambda: refresh("محمد"), repeat)
+
+        def scroll():
+            refresh()
+            bar = win.table_customers.verticalScrollBar()
+            for _ in range(10):
+                bar.setValue(bar.maximum()); app.processEvents()
+        r["gui.scroll_customers_10_pages"] = measure(scroll, repeat)
+        refresh()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ids = [row[0] for row in win.db.conn.execute("SELECT id FROM invoices ORDER BY id LIMIT 50")]
+            r["pdf.invoice"] = measure(lambda: export_invoices_pdf(win.db, ids[:1], os.path.join(tmp, "one.pdf")), repeat)
+            r["pdf.batch_50"] = measure(lambda: export_invoices_pdf(win.db, ids, os.path.join(tmp, "batch.pdf")), repeat, len(ids))
+            r["pdf.separate_50"] = measure(lambda: export_invoices_separately(win.db, ids, os.path.join(tmp, "sep")), repeat, len(ids))
+            html = invoice_document(win.db, ids[0])
+            r["image.invoice"] = measure(lambda: render_image(html, os.path.join(tmp, "inv.png"), cache=None), repeat)
+            r["image.invoice.cached"] = measure(lambda: render_image(html, os.path.join(tmp, "inv.png")), repeat)
+
+            # جابه‌جایی بین دو دفتر باز (اتصال‌ها و کش‌ها می‌مانند، فقط تب‌ها دوباره ساخته می‌شوند)
+            other = win.workspaces.open(os.path.join(tmp, "other.db"), activate=False).path
+            def switch():
+                for path in (other, db_path):
+                    win.workspaces.switch(path); app.processEvents()
+            r["gui.switch_workspace"] = measure(switch, repeat, 2)
+            win.workspaces.switch(other); win.close_workspace()
+    finally:
+        win.close()
+    return r
+
+# --- baseline ---
+def compare(results, baseline, threshold=THRESHOLD):
+    """(name, base_ms, now_ms, change) برای نام‌های مشترک؛ change نسبت تغییر میانه است"""
+    out = []
+    for name, now in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("median_ms"):
+            continue
+        change = now["median_ms"] / base["median_ms"] - 1
+        out.append((name, base["median_ms"], now["median_ms"], change, change > threshold))
+    return out
+
+def meta(scale):
+    return {"scale": scale, "rows": SCALES[scale], "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    p.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    p.add_argument("--db", help="دیتابیس آماده (پیش‌فرض: benchmarks/data/<scale>/hesabdari.db)")
+    p.add_argument("--repeat", type=int, default=REPEAT)
+    p.add_argument("--only", action="append", choices=("db", "writes", "reports", "gui"))
+    p.add_argument("--out", help="فایل JSON نتایج (پیش‌فرض: results-<scale>.json)")
+    p.add_argument("--baseline", help="پیش‌فرض: benchmarks/baseline-<scale>.json")
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--threshold", type=float, default=THRESHOLD)
+    p.add_argument("--fail-on-regression", action="store_true")
+    args = p.parse_args(argv)
+
+    db_path = os.path.abspath(args.db or os.path.join(HERE, "data", args.scale, "hesabdari.db"))
+    if not os.path.exists(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        print(f"generating {args.scale} -> {db_path}", file=sys.stderr)
+        gen = Database(db_path)
+        try:
+            generate(gen, SCALES[args.scale], log=lambda m: print(m, file=sys.stderr))
+        finally:
+            gen.close()
+
+    groups = args.only or ["db", "writes", "reports", "gui"]
+    results = {}
+    db = Database(db_path)
+    try:
+        if "db" in groups: results.update(bench_db(db, args.repeat))
+        if "writes" in groups: results.update(bench_writes(db, args.repeat))
+        if "reports" in groups: results.update(bench_reports(db, args.repeat))
+    finally:
+        db.close()
+    if "gui" in groups:
+        results.update(bench_gui(db_path, args.repeat))
+
+    doc = {"meta": meta(args.scale), "results": results}
+    out = args.out or f"results-{args.scale}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+
+    baseline_path = args.baseline or os.path.join(HERE, f"baseline-{args.scale}.json")
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved: {baseline_path}", file=sys.stderr)
+
+    width = max(map(len, results)) if results else 0
+    regressions = 0
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        for name, base, now, change, bad in compare(results, baseline, args.threshold):
+            regressions += bad
+            print(f"{name:<{width}}  {base:>10.3f} -> {now:>10.3f} ms  {change:+7.1%}{'  REGRESSION' if bad else ''}")
+    else:
+        for name, r in results.items():
+            print(f"{name:<{width}}  {r['median_ms']:>10.3f} ms")
+    print(f"results: {out}", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+import pytest
+
+from app.backup import BackupManager
+from app.db import Database
+
+class _Stop(Exception):
+    pass
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "co.db"))
+    db.add_customer("علی", "0912", "")
+    yield db
+    db.close()
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_restore_roundtrip(db, compress):
+    manager = db.backups(compress=compress)
+    snap = manager.snapshot()
+    db.add_customer("مریم", "0935", "")
+    steps = []
+    manager.restore(snap, progress=lambda done, total: steps.append((done, total)))
+    assert [r[1] for r in db.list_customers()] == ["علی"]
+    assert steps and steps[-1][0] == steps[-1][1]
+    assert len(manager.snapshots()) == 2 and any(p.endswith("-pre-restore.db" + (".gz" if compress else "")) for p in manager.snapshots())
+    assert sorted(os.listdir(manager.backup_dir)) == sorted(os.path.basename(p) for p in manager.snapshots())
+
+def test_restore_missing_snapshot_takes_no_copy(db, tmp_path):
+    manager = db.backups()
+    with pytest.raises(FileNotFoundError):
+        manager.restore(str(tmp_path / "nothere.db.gz"))
+    assert manager.snapshots() == []
+
+def test_restore_invalid_snapshot_takes_no_copy(db, tmp_path):
+    bad = tmp_path / "bad.db"
+    bad.write_bytes(b"not a database" * 100)
+    manager = db.backups()
+    with pytest.raises(sqlite3.DatabaseError):
+        manager.restore(str(bad))
+    assert manager.snapshots() == []
+    assert [r[1] for r in db.list_customers()] == ["علی"]
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_failed_snapshot_leaves_nothing(db, compress):
+    manager = db.backups(compress=compress)
+    def stop(done, total):
+        raise _Stop()
+    with pytest.raises(_Stop):
+        manager.snapshot(progress=stop)
+    assert manager.snapshots() == []
+    assert os.listdir(manager.backup_dir) == []
@@ -0,0 +1,73 @@
+import pytest
+
+from app import catalog as catalog_mod
+from app.catalog import Catalog
+from app.db import Database
+
+NAMES = ["شامپو بچه", "کرم دست", "ضد شوره شامپو", "شامپو", "صابون", "SHAMPOO Pro"]
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "cat.db"))
+    with db.transaction():
+        db.add_products_many([(n, 1000 * (i + 1)) for i, n in enumerate(NAMES)])
+    yield db
+    db.close()
+
+@pytest.fixture
+def catalog(db):
+    catalog = Catalog(db, "products")
+    catalog.load()
+    yield catalog
+    catalog.close()
+
+def _names(rows):
+    return [r[1] for r in rows]
+
+def test_prefix_then_infix(catalog):
+    assert _names(catalog.suggest("شامپو")) == ["شامپو", "شامپو بچه", "ضد شوره شامپو"]
+    assert catalog.suggest("شامپو")[0] == (4, "شامپو", 4000.0)
+    assert _names(catalog.suggest("شا")) == ["شامپو", "شامپو بچه"]  # میان نام فقط از سه حرف
+    assert _names(catalog.suggest("pro")) == ["SHAMPOO Pro"] and _names(catalog.suggest("shamp")) == ["SHAMPOO Pro"]
+    assert catalog.suggest("  ") == [] and catalog.suggest("پنیر") == []
+
+def test_limit(catalog):
+    assert _names(catalog.suggest("شامپو", limit=2)) == ["شامپو", "شامپو بچه"]
+
+@pytest.mark.parametrize("grams", [True, False])
+def test_infix_without_trigram_postings(catalog, monkeypatch, grams):
+    if grams:
+        monkeypatch.setattr(catalog_mod, "POSTING_SCAN", 0)  # سه‌حرفی پرتکرار: جستجو در متن پیوسته
+    else:
+        catalog._grams = None  # هنوز ساخته نشده
+    assert _names(catalog.suggest("وره")) == ["ضد شوره شامپو"]
+    assert _names(catalog.suggest("امپو")) == ["شامپو بچه", "ضد شوره شامپو", "شامپو"]  # به ترتیب شناسه
+
+def test_arabic_letters_are_normalized(db):
+    db.add_customer("علي رضايي", "0912", "")
+    catalog = Catalog(db, "customers"); catalog.load()
+    try:
+        assert catalog.suggest("علی") == [(1, "علي رضايي", "0912")]
+        assert _names(catalog.suggest("رضای")) == ["علي رضايي"]
+        assert catalog.find("علی رضایی ")[0] == 1 and catalog.find("علی") is None
+        assert catalog.get(1)[2] == "0912" and catalog.get(2) is None
+    finally:
+        catalog.close()
+
+def test_falls_back_to_database_until_loaded(db):
+    catalog = Catalog(db, "products")
+    try:
+        assert not catalog.ready() and len(catalog) == 0 and catalog.get(1) is None
+        assert "شامپو" in _names(catalog.suggest("شامپو"))  # از FTS دیتابیس؛ بارگذاری شروع می‌شود
+        assert catalog.wait(10) and len(catalog) == len(NAMES)
+    finally:
+        catalog.close()
+
+def test_add_appends_and_bulk_change_reloads(db, catalog):
+    row_id = db.add_product("شامپو نعناع", 500)
+    assert catalog.ready() and catalog.get(row_id) == (row_id, "شامپو نعناع", 500.0)
+    assert _names(catalog.suggest("شامپو ن")) == ["شامپو نعناع"] and _names(catalog.suggest("نعناع")) == ["شامپو نعناع"]
+    with db.transaction():
+        db.add_products_many([("شامپو گیاهی", 700)])
+    assert catalog.wait(10)
+    assert "شامپو گیاهی" in _names(catalog.suggest("گیاه")) and len(catalog) == len(NAMES) + 2
@@ -0,0 +1,132 @@
+import json
+import os
+
+import pytest
+
+from app.cli import main
+from app.db import Database
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "cli.db")
+    db = Database(path)
+    c = db.add_customer("علی", "0912", "تهران")
+    p = db.add_product("شامپو", 1000)
+    db.add_invoice("2024-03-20", [(p, 2, 1000, 0)], customer_id=c, vat_percent=9)
+    db.add_invoice("2024-05-01", [(p, 1, 1000, 0)], customer_id=c, vat_percent=9)
+    db.close()
+    return path
+
+def test_report_rejects_non_iso_dates(db_path, capsys):
+    with pytest.raises(SystemExit) as e:
+        main(["--db", db_path, "report", "daily", "--from", "2024/01/01", "--to", "2024-12-31"])
+    assert e.value.code == 2
+    assert "--from" in capsys.readouterr().err
+
+def test_report_date_range(db_path, capsys):
+    assert main(["--db", db_path, "report", "daily", "--from", "2024-03-01", "--to", "2024-03-31", "--format", "jsonl"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["دوره"] for r in rows] == ["2024-03-20"]
+
+@pytest.mark.parametrize("make, message", [
+    (lambda tmp: str(tmp / "nothere.csv"), "nothere.csv"),
+    (lambda tmp: (tmp / "bad.csv").write_text("x,y\n1,2\n") and str(tmp / "bad.csv"), "ستون نام"),
+])
+def test_import_errors_exit_1(db_path, tmp_path, capsys, make, message):
+    assert main(["--db", db_path, "import", "customers", make(tmp_path)]) == 1
+    err = capsys.readouterr().err
+    assert message in err and "Traceback" not in err
+
+@pytest.mark.parametrize("argv", [["export", "customers"], ["report", "daily", "--from", "2024-01-01", "--to", "2024-12-31"],
+                                  ["backup"], ["wipe", "--yes"]])
+def test_missing_db_is_not_created(tmp_path, capsys, argv):
+    path = tmp_path / "typo.db"
+    assert main(["--db", str(path), *argv]) == 1
+    assert "typo.db" in capsys.readouterr().err
+    assert not path.exists()
+
+def test_consolidated_missing_other_db(db_path, tmp_path, capsys):
+    argv = ["--db", db_path, "consolidated", "all_company", str(tmp_path / "other.db"), "--from", "2024-01-01", "--to", "2024-12-31"]
+    assert main(argv) == 1
+    assert not (tmp_path / "other.db").exists()
+
+def test_import_creates_db(tmp_path, capsys):
+    src = tmp_path / "c.csv"
+    src.write_text("name,phone\nعلی,0912\n", encoding="utf-8")
+    assert main(["--db", str(tmp_path / "new.db"), "import", "customers", str(src)]) == 0
+    assert json.loads(capsys.readouterr().out) == {"imported": 1, "rejected": 0}
+
+def test_import_writes_default_rejects(tmp_path, capsys):
+    src = tmp_path / "p.csv"
+    src.write_text("name,price\nشامپو,1000\nصابون,abc\n,5\n", encoding="utf-8")
+    assert main(["--db", str(tmp_path / "new.db"), "import", "products", str(src)]) == 0
+    assert json.loads(capsys.readouterr().out) == {"imported": 1, "rejected": 2}
+    lines = (tmp_path / "p.rejected.csv").read_text(encoding="utf-8-sig").splitlines()
+    assert lines[0] == "line,reason,row" and [l.split(",")[0] for l in lines[1:]] == ["3", "4"]
+
+def test_export_csv(db_path, capsys):
+    assert main(["--db", db_path, "export", "customers"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("id,name") and lines[1].startswith("1,علی,0912")
+
+def test_report_render(db_path, capsys):
+    assert main(["--db", db_path, "report", "daily", "--from", "2024-03-01", "--to", "2024-03-31", "--render", "--format", "jsonl"]) == 0
+    row = json.loads(capsys.readouterr().out)
+    assert row["دوره"] == "1403/01/01" and row["جمع کل"] == "2,180"
+
+def test_export_jsonl(db_path, capsys):
+    assert main(["--db", db_path, "export", "invoices", "--format", "jsonl"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r["date"], r["total"]) for r in rows] == [("2024-03-20", 2180), ("2024-05-01", 1090)]
+
+def test_backup_list_restore(db_path, tmp_path, capsys):
+    backups = str(tmp_path / "bk")
+    assert main(["--db", db_path, "backup", "--dir", backups, "--no-compress"]) == 0
+    snap = json.loads(capsys.readouterr().out)["backup"]
+    assert snap.endswith("-manual.db")
+    db = Database(db_path); db.add_customer("مریم", "", ""); db.close()
+    assert main(["--db", db_path, "backups", "--dir", backups]) == 0
+    assert capsys.readouterr().out.splitlines() == [snap]
+    assert main(["--db", db_path, "restore", snap, "--dir", backups]) == 0
+    db = Database(db_path)
+    assert [r[1] for r in db.list_customers()] == ["علی"]
+    db.close()
+    assert main(["--db", db_path, "restore", str(tmp_path / "nothere.db"), "--dir", backups]) == 1
+    assert "nothere.db" in capsys.readouterr().err
+
+def test_wipe_requires_yes(db_path, tmp_path, capsys):
+    assert main(["--db", db_path, "wipe"]) == 2
+    assert "--yes" in capsys.readouterr().err
+    assert main(["--db", db_path, "wipe", "--yes"]) == 0
+    db = Database(db_path)
+    assert db.list_customers() == [] and db.conn.execute("SELECT count(*) FROM invoices").fetchone()[0] == 0
+    db.close()
+    assert any(p.endswith(".db.gz") and "-pre-wipe" in p for p in os.listdir(tmp_path / "backups"))
+
+def test_consolidated(db_path, tmp_path, capsys):
+    other = str(tmp_path / "other.db")
+    db = Database(other); c = db.add_customer("علی", "", ""); p = db.add_product("صابون", 500)
+    db.add_invoice("2024-03-25", [(p, 2, 500, 0)], customer_id=c, vat_percent=0); db.close()
+    argv = ["--db", db_path, "consolidated", "all_customer", other, "--from", "2024-01-01", "--to", "2024-12-31", "--format", "jsonl"]
+    assert main(argv) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r["مشتری"], r["تعداد شرکت"], r["تعداد فاکتور"], r["جمع کل"]) for r in rows] == [("علی", 2, 3, 4270)]
+
+def test_migrate_dbapi_sqlite(db_path, tmp_path, capsys):
+    target = str(tmp_path / "copy.db")
+    assert main(["--db", target, "migrate", "--from-type", "dbapi-sqlite", "--from", db_path, "--workers", "1"]) == 0
+    copied = json.loads(capsys.readouterr().out)
+    assert copied["customers"] == 1 and copied["invoices"] == 2
+    assert not os.path.exists(target + ".migrate.json")  # پس از پایان کامل حذف می‌شود
+    db = Database(target)
+    assert [r[1] for r in db.list_customers("علی")] == ["علی"]
+    db.close()
+
+def test_pdf(db_path, tmp_path, capsys):
+    pytest.importorskip("PyQt6.QtGui")
+    out = str(tmp_path / "all.pdf")
+    assert main(["--db", db_path, "pdf", "--from", "2024-03-01", "--to", "2024-03-31", "--out", out]) == 0
+    assert json.loads(capsys.readouterr().out) == {"invoices": 1, "file": out}
+    assert open(out, "rb").read(5) == b"%PDF-"
+    assert main(["--db", db_path, "pdf", "--from", "2024-01-01", "--to", "2024-12-31", "--out-dir", str(tmp_path / "inv"), "--workers", "2"]) == 0
+    assert sorted(os.listdir(tmp_path / "inv")) == ["invoice-1.pdf", "invoice-2.pdf"]
@@ -0,0 +1,221 @@
+import sqlite3
+import time
+from decimal import Decimal, InvalidOperation
+
+import pytest
+
+from app.backends import open_backend
+from app.backup import BackupManager
+from app.catalog import Catalog
+from app.db import Database
+from app.pricing import invoice_totals, line_amounts, to_decimal
+
+AGG_TABLES = {
+    "agg_daily": "SELECT day, invoices, subtotal, discount, tax, total FROM agg_daily",
+    "agg_customer": "SELECT day, customer_id, invoices, tax, total FROM agg_customer",
+    "agg_product": "SELECT day, product_id, quantity, discount, tax, total FROM agg_product",
+    "agg_customer_month": "SELECT month, customer_id, invoices, tax, total FROM agg_customer_month",
+    "agg_product_month": "SELECT month, product_id, quantity, discount, tax, total FROM agg_product_month",
+}
+
+def _aggregates(db):
+    """ردیف‌های غیرصفر جدول‌های خلاصه (حذف همه فاکتورهای یک روز ردیف صفر باقی می‌گذارد)"""
+    out = {}
+    for table, sql in AGG_TABLES.items():
+        rows = db.conn.execute(sql).fetchall()
+        out[table] = sorted(r for r in rows if any(round(v, 6) for v in r[-3:]))
+    return out
+
+@pytest.fixture
+def db():
+    db = Database(":memory:")
+    yield db
+    db.close()
+
+def _sample_invoices(db):
+    c1 = db.add_customer("علی رضایی", "0912", "تهران")
+    c2 = db.add_customer("مریم احمدی", "0935", "شیراز")
+    p1 = db.add_product("شامپو", 125000)
+    p2 = db.add_product("صابون", 30000)
+    return [
+        db.add_invoice("2024-03-20", [(p1, 2, 125000, 10), (p2, 1, 30000, 0)], customer_id=c1, vat_percent=9),
+        db.add_invoice("2024/03/20", [(p2, 3, 30000, 5)], customer_id=c2, vat_percent=9),
+        db.add_invoice("2024-04-02", [(p1, 1, 125000, 0)], customer_id=c1, vat_percent=10),
+    ]
+
+# --- جدول‌های خلاصه ---
+def test_aggregates_follow_inserts(db):
+    _sample_invoices(db)
+    daily = dict((r[0], r[1:]) for r in db.conn.execute("SELECT day, invoices, total FROM agg_daily"))
+    expected = db.conn.execute("SELECT date, count(*), total(total) FROM invoices GROUP BY date").fetchall()
+    assert daily == {d: (n, t) for d, n, t in expected}
+    assert "2024-03-20" in daily  # تاریخ yyyy/MM/dd هنگام ثبت ISO می‌شود
+
+def test_aggregates_insert_delete_symmetry(db):
+    before = _aggregates(db)
+    ids = _sample_invoices(db)
+    for inv_id in ids:
+        db.delete_invoice(inv_id)
+    assert _aggregates(db) == before
+    assert db.conn.execute("SELECT count(*) FROM invoice_items").fetchone()[0] == 0
+
+def test_rebuild_matches_incremental(db):
+    ids = _sample_invoices(db)
+    db.delete_invoice(ids[1])
+    incremental = _aggregates(db)
+    db.rebuild_aggregates()
+    assert _aggregates(db) == incremental
+
+# --- اعلان تغییرها ---
+class _Stop(Exception):
+    pass
+
+def test_bulk_notify_after_commit(tmp_path):
+    path = str(tmp_path / "n.db")
+    db = Database(path)
+    try:
+        db.add_product("اول", 1)
+        catalog = Catalog(db, "products"); catalog.load()
+        seen = []
+        # اتصال جدا، مانند بارگذاری Catalog روی ترد دیگر
+        db.subscribe(lambda table, row: seen.append(sqlite3.connect(path).execute("SELECT count(*) FROM products").fetchone()[0]))
+        with db.transaction():
+            db.add_products_many([(f"کالا {i}", i) for i in range(1000)])
+            assert seen == []
+        assert seen == [1001]
+        assert catalog.wait(10) and len(catalog) == 1001
+
+        with pytest.raises(_Stop):
+            with db.transaction():
+                db.add_products_many([("برگشت", 1)])
+                raise _Stop()
+        db.add_product("بعدی", 2)
+        assert seen == [1001, 1002]  # اعلان تراکنش برگشت‌خورده اجرا نمی‌شود
+    finally:
+        db.close()
+
+# --- نسخه پشتیبان ---
+def test_backup_rotation_keeps_other_databases(tmp_path):
+    backups = tmp_path / "backups"; backups.mkdir()
+    names = ["co-20240101-100000-auto.db.gz", "co-20240102-100000-manual.db", "co-20240103-100000-pre-restore.db.gz",
+             "co-2-20240101-100000-auto.db.gz", "co-2-20240104-100000-auto.db.gz", "co-20240105-100000-auto.db.gz.tmp"]
+    for n in names:
+        (backups / n).write_bytes(b"")
+    manager = BackupManager(str(tmp_path / "co.db"), keep=2)
+    assert [p.rsplit("/", 1)[1] for p in manager.snapshots()] == names[2:0:-1] + names[:1]
+    manager.rotate()
+    assert sorted(p.name for p in backups.iterdir()) == sorted(names[1:])
+
+# --- مهاجرت طرح ---
+def test_open_does_not_wait_for_writer(tmp_path):
+    path = str(tmp_path / "busy.db")
+    Database(path).close()
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")  # مانند ورود داده یا مهاجرت طولانی
+    try:
+        started = time.monotonic()
+        db = Database(path)
+        assert time.monotonic() - started < 1 and db.has_fts
+        assert db.list_customers("x") == []
+        db.close()
+    finally:
+        writer.rollback(); writer.close()
+
+def test_fts_triggers_without_app_functions(tmp_path):
+    path = str(tmp_path / "plain.db")
+    Database(path).close()
+    plain = sqlite3.connect(path)  # بدون register_sql_functions، مانند ابزارهای بیرونی
+    plain.execute("INSERT INTO customers (name, phone, address) VALUES (?,?,?)", ("علي كريمي", "+۹۸ (۹۱۲) ٤٥٦-7890", "تهران"))
+    plain.execute("UPDATE customers SET address='كرج' WHERE name LIKE 'علي%'")
+    plain.execute("INSERT INTO products (name, price) VALUES ('كيف ۲۰', 1)")
+    plain.commit(); plain.close()
+
+    db = Database(path)
+    try:
+        assert [r[1] for r in db.list_customers("علی کریمی")] == ["علي كريمي"]
+        assert len(db.list_customers("98912456")) == 1 and len(db.list_customers("کرج")) == 1
+        assert db.list_customers("تهران") == []
+        assert [r[1] for r in db.list_products("کیف 20")] == ["كيف ۲۰"]
+    finally:
+        db.close()
+
+def test_fts_triggers_upgraded_from_v1(tmp_path):
+    path = str(tmp_path / "v1.db")
+    db = Database(path)
+    db.add_customer("مشتري قديمي", "0912", "")
+    with db.transaction() as conn:
+        conn.execute("DROP TRIGGER customers_fts_ai")
+        conn.execute("CREATE TRIGGER customers_fts_ai AFTER INSERT ON customers BEGIN "
+                     "INSERT INTO customers_fts(rowid,name,phone,address) VALUES (new.id,fa_norm(new.name),fa_norm_phone(new.phone),fa_norm(new.address)); END")
+        conn.execute("PRAGMA user_version=1")
+    db.close()
+
+    db = Database(path)
+    try:
+        assert "fa_norm" not in db.conn.execute("SELECT sql FROM sqlite_master WHERE name='customers_fts_ai'").fetchone()[0]
+        assert len(db.list_customers("مشتری قدیمی")) == 1
+    finally:
+        db.close()
+
+def _pages(fetch, q, limit):
+    rows, after = [], None
+    while True:
+        page = fetch(q, limit, after)
+        rows += page
+        if len(page) < limit:
+            return rows
+        after = page[-1]
+
+@pytest.mark.parametrize("rank_limit", [1000, 5])
+def test_list_keyset_pages(tmp_path, monkeypatch, rank_limit):
+    monkeypatch.setattr("app.db.RANK_LIMIT", rank_limit)  # 5: جستجوی «گسترده» به ترتیب rowid
+    db = Database(str(tmp_path / "k.db"))
+    try:
+        with db.transaction():
+            db.add_customers_many([(f"مشتری {i} {'تهران' if i % 3 else 'کرج'}", "", "") for i in range(47)])
+        assert _pages(db.list_customers, None, 10) == db.list_customers()
+        for q in ("مشتری", "کرج", "مشتری کرج"):
+            paged, full = _pages(db.list_customers, q, 4), db.list_customers(q)
+            assert paged == full and len({r[0] for r in paged}) == len(paged)
+        assert len(_pages(db.list_customers, "کرج", 4)) == 16
+        db.has_fts = False  # LIKE
+        assert _pages(db.list_customers, "کرج", 4) == db.list_customers("کرج") and len(db.list_customers("کرج")) == 16
+    finally:
+        db.close()
+
+def test_backend_keyset_pages(tmp_path):
+    path = str(tmp_path / "b.db")
+    db = Database(path)
+    with db.transaction():
+        db.add_products_many([(f"کالا {i}", i) for i in range(23)])
+    db.close()
+    backend = open_backend("dbapi-sqlite", path)
+    try:
+        assert [r[0] for r in _pages(backend.list_products, None, 5)] == list(range(23, 0, -1))
+        assert len(_pages(backend.list_products, "کالا 1", 3)) == 11
+    finally:
+        backend.close()
+
+# --- مبالغ ---
+def test_line_amounts_rounding():
+    assert line_amounts(3, "33333.5", 10, 9) == (Decimal(100001), Decimal(10000), Decimal(8100), Decimal(98101))
+    assert line_amounts(1, "2.5")[0] == Decimal(3)  # ROUND_HALF_UP، نه گرد کردن بانکی
+    assert line_amounts("0.1", "0.2", 0, 0)[0] == Decimal(0)
+    assert line_amounts(1, 0.1 + 0.2)[0] == Decimal(0)  # float از طریق str
+
+@pytest.mark.parametrize("text", ["nan", "NaN", "inf", "-Infinity", "sNaN"])
+def test_to_decimal_rejects_non_finite(text):
+    with pytest.raises(InvalidOperation):
+        to_decimal(text)
+    assert to_decimal("1,250.5") == Decimal("1250.5")
+
+def test_line_amounts_overflow_raises():
+    # add_invoice_line پیش از افزودن ردیف همین را بررسی می‌کند
+    with pytest.raises(InvalidOperation):
+        line_amounts("1e30", 1)
+    with pytest.raises(InvalidOperation):
+        line_amounts("inf", 1)
+
+def test_invoice_totals_sum_lines():
+    lines = [line_amounts(2, 125000, 10, 9), line_amounts(1, 30000, 0, 9)]
+    assert invoice_totals(lines) == (Decimal(280000), Decimal(25000), Decimal(22950), Decimal(277950))
@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+from app.db import Database
+from app.importer import ImportCancelled, import_file, rejects_path
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "imp.db"))
+    yield db
+    db.close()
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def _rejects(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+def test_customers_persian_headers_normalized(db, tmp_path):
+    src = _write(tmp_path / "c.csv", "نام,تلفن,آدرس\nعلي,۰۹۱۲ ۱۲۳,تهران\n,0935,شیراز\n,,\nمریم,,\n")
+    reject = rejects_path(src)
+    assert import_file(db, "customers", src, reject_path=reject) == (2, 1)
+    assert sorted(r[1:] for r in db.list_customers()) == [("علي", "0912 123", "تهران"), ("مریم", "", "")]
+    assert _rejects(reject) == [["line", "reason", "row"], ["3", "نام خالی است", " | 0935 | شیراز"]]
+
+def test_products_price_validation(db, tmp_path):
+    src = _write(tmp_path / "p.csv", "name,price\nشامپو,\"1,250\"\nصابون,abc\nکیف,-5\nمسواک,۳۰۰۰\nدفتر,\n")
+    reject = str(tmp_path / "rej.csv")
+    assert import_file(db, "products", src, batch_size=2, reject_path=reject) == (3, 2)
+    assert sorted(r[1:] for r in db.list_products()) == [("دفتر", 0.0), ("شامپو", 1250.0), ("مسواک", 3000.0)]
+    assert [(r[0], r[1]) for r in _rejects(reject)[1:]] == [("3", "قیمت نامعتبر: abc"), ("4", "قیمت منفی است")]
+
+def test_no_rejects_file_when_all_valid(db, tmp_path):
+    src = _write(tmp_path / "ok.csv", "name,price\nشامپو,10\n")
+    assert import_file(db, "products", src, reject_path=rejects_path(src)) == (1, 0)
+    assert not (tmp_path / "ok.rejected.csv").exists()
+
+def test_missing_name_column(db, tmp_path):
+    src = _write(tmp_path / "bad.csv", "title,price\nشامپو,10\n")
+    with pytest.raises(ValueError, match="ستون نام"):
+        import_file(db, "products", src)
+    assert db.list_products() == []
+
+def test_empty_file(db, tmp_path):
+    assert import_file(db, "customers", _write(tmp_path / "empty.csv", "")) == (0, 0)
+
+def test_cancel_rolls_back_all_batches(db, tmp_path):
+    db.add_product("موجود", 1)
+    src = _write(tmp_path / "many.csv", "name,price\n" + "".join(f"کالا {i},{i}\n" for i in range(25)))
+    calls = []
+
+    def progress(processed, imported, rejected):
+        calls.append(imported)
+        return imported < 20  # لغو پس از دسته دوم
+
+    with pytest.raises(ImportCancelled):
+        import_file(db, "products", src, batch_size=10, progress=progress)
+    assert calls == [10, 20]
+    assert [r[1] for r in db.list_products()] == ["موجود"]
+    db.add_product("بعدی", 2)  # تراکنش بسته شده و اتصال قابل استفاده است
+    assert len(db.list_products()) == 2
+
+def test_xlsx(db, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    wb.active.append(["نام کالا", "قیمت واحد"]); wb.active.append(["شامپو", 1200]); wb.active.append([None, 5])
+    path = str(tmp_path / "p.xlsx"); wb.save(path)
+    assert import_file(db, "products", path) == (1, 1)
+    assert [r[1:] for r in db.list_products()] == [("شامپو", 1200.0)]
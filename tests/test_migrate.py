@@ -0,0 +1,68 @@
+import pytest
+
+from app.backends import open_backend
+from app.db import AGG_TABLES, Database
+from app.migrate import MigrationError, migrate
+
+class _Stop(Exception):
+    pass
+
+def _source(path, n=7):
+    src = Database(path)
+    with src.transaction():
+        src.add_customers_many([(f"مشتری {i}", f"0912{i:07d}", "") for i in range(n)])
+        src.add_products_many([(f"کالا {i}", 1000 + i) for i in range(n)])
+    src.add_invoice("2024-03-20", [(1, 2, 1000, 0)], customer_id=1, vat_percent=9)
+    return src
+
+def _aggregates(db):
+    return {t: sorted(db.conn.execute(f"SELECT * FROM {t}").fetchall()) for t in AGG_TABLES}
+
+def _counts(db):
+    return {t: db.conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+            for t in ("customers", "products", "invoices", "invoice_items")}
+
+def test_migrate_resumes_from_checkpoint(tmp_path):
+    src = _source(str(tmp_path / "src.db"))
+    dst = Database(str(tmp_path / "dst.db"))
+    checkpoint = str(tmp_path / "dst.migrate.json")
+    try:
+        def stop(table, rows):
+            raise _Stop()
+        with pytest.raises(_Stop):
+            migrate(src, dst, checkpoint, chunk=2, workers=1, progress=stop)
+        assert (tmp_path / "dst.migrate.json").exists()
+        assert sum(_counts(dst).values()) < sum(_counts(src).values())
+
+        migrate(src, dst, checkpoint, chunk=2, workers=1)
+        assert _counts(dst) == _counts(src)
+        assert not (tmp_path / "dst.migrate.json").exists()
+        assert _aggregates(dst) == _aggregates(src)
+    finally:
+        src.close(); dst.close()
+
+def test_migrate_refuses_non_empty_target(tmp_path):
+    src = _source(str(tmp_path / "src.db"))
+    dst = Database(str(tmp_path / "dst.db"))
+    try:
+        dst.add_customer("موجود", "", "")
+        with pytest.raises(MigrationError):
+            migrate(src, dst, str(tmp_path / "dst.migrate.json"))
+    finally:
+        src.close(); dst.close()
+
+def test_migrate_into_dbapi_sqlite(tmp_path):
+    src = _source(str(tmp_path / "src.db"))
+    Database(str(tmp_path / "dst.db")).close()
+    dst = open_backend("dbapi-sqlite", str(tmp_path / "dst.db"))
+    expected = _counts(src)
+    try:
+        migrate(src, dst, str(tmp_path / "dst.migrate.json"), workers=1)
+    finally:
+        src.close(); dst.close()
+    dst = Database(str(tmp_path / "dst.db"))
+    try:
+        assert _counts(dst) == expected
+        assert [r[1] for r in dst.list_customers("مشتری 3")] == ["مشتری 3"]
+    finally:
+        dst.close()
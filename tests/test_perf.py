@@ -0,0 +1,35 @@
+from app.db import Database
+from app.perf import PerfMonitor
+from app.reports import REPORTS
+
+def _db(path, n=50):
+    db = Database(path)
+    with db.transaction():
+        db.add_customers_many([(f"مشتری {i}", "", "") for i in range(n)])
+        db.add_products_many([("کالا", 1000)])
+    for i in range(n):
+        db.add_invoice("2024-03-20", [(1, 1, 1000, 0)], customer_id=i + 1)
+    return db
+
+def test_reports_and_cursors_are_timed_until_consumed(tmp_path):
+    db = _db(str(tmp_path / "p.db"))
+    try:
+        monitor = PerfMonitor(slow_ms=0)
+        monitor.instrument_database(db)
+        reports = monitor.instrument_reports(dict(REPORTS), conn=lambda: db.conn)
+        rows = reports["customer"][2](db, "2024-01-01", "2024-12-31")
+        assert "report.customer" not in monitor.stats  # هنوز خوانده نشده
+        assert len(list(rows)) == 50
+        assert sum(1 for _ in reports["tax"][2](db, "2024-01-01", "2024-12-31")) == 1
+        cur = db.iter_rows("customers")
+        assert [d[0] for d in cur.description][:2] == ["id", "name"]
+        assert len(cur.fetchmany(10)) == 10 and len(cur.fetchall()) == 40
+
+        stats = {name: (n, r) for name, n, *_, r in monitor.snapshot()}
+        assert stats["report.customer"] == (1, 50) and stats["report.tax"] == (1, 1)
+        assert stats["db.iter_rows"] == (1, 50)
+        logged = (tmp_path / "slow-queries.log").read_text(encoding="utf-8")
+        assert "report.customer" in logged and "agg_customer" in logged  # SQL و EXPLAIN QUERY PLAN
+        assert "report.tax" in logged and "agg_daily" in logged  # پرس‌وجوی generator هنگام خواندن
+    finally:
+        db.close()
@@ -0,0 +1,89 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from app.db import Database
+from app.jalali import month_bounds
+from app.reports import REPORTS, fmt_jalali_month, sales_by_customer, sales_by_period, sales_by_product, tax_by_jalali_month
+
+@pytest.fixture
+def db():
+    db = Database(":memory:")
+    yield db
+    db.close()
+
+def _sample_invoices(db):
+    c1 = db.add_customer("علی رضایی", "0912", "تهران")
+    c2 = db.add_customer("مریم احمدی", "0935", "شیراز")
+    p1 = db.add_product("شامپو", 125000)
+    p2 = db.add_product("صابون", 30000)
+    return [
+        db.add_invoice("2024-03-20", [(p1, 2, 125000, 10), (p2, 1, 30000, 0)], customer_id=c1, vat_percent=9),
+        db.add_invoice("2024/03/20", [(p2, 3, 30000, 5)], customer_id=c2, vat_percent=9),
+        db.add_invoice("2024-04-02", [(p1, 1, 125000, 0)], customer_id=c1, vat_percent=10),
+    ]
+
+# --- تقویم شمسی ---
+def test_month_bounds():
+    assert month_bounds(date(2024, 3, 20), date(2024, 4, 25)) == (
+        (1403, 1, date(2024, 3, 20), date(2024, 4, 20)),
+        (1403, 2, date(2024, 4, 20), date(2024, 5, 21)),
+    )
+
+def test_month_bounds_leap_esfand():
+    (jy, jm, lo, hi), nowruz = month_bounds(date(2025, 3, 1), date(2025, 3, 25))
+    assert (jy, jm) == (1403, 12) and (hi - lo).days == 30  # ۱۴۰۳ کبیسه است
+    assert nowruz[:3] == (1404, 1, date(2025, 3, 21))
+
+# --- گزارش‌ها ---
+def test_jalali_month_and_tax(db):
+    p = db.add_product("شامپو", 1000)
+    for day in ("2024-03-19", "2024-03-20", "2024-04-19", "2024-04-20", "2024-05-01"):
+        db.add_invoice(day, [(p, 1, 1000, 0)], vat_percent=10)
+    rows = list(sales_by_period(db, "2024-03-01", "2024-04-30", "jalali_month"))
+    assert [(r[0], r[1], r[5]) for r in rows] == [(140212, 1, 1100), (140301, 2, 2200), (140302, 1, 1100)]  # ۵ مه بیرون از بازه
+    assert list(tax_by_jalali_month(db, "2024-03-20", "2024-04-19")) == [(140301, 2000, 200)]
+    assert list(sales_by_period(db, "2024-05-01", "2024-03-01", "jalali_month")) == []
+    assert fmt_jalali_month(140301) == REPORTS["jalali_month"][3][0](140301)
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-01-01", "2024-12-31"), ("2024-03-01", "2024-04-30"), ("2024-03-20", "2024-04-02"),
+    ("2024-02-29", "2024-05-01"), ("2024-03-02", "2024-03-30"), ("2024-04-30", "2024-04-30"), ("2024-05-01", "2024-03-01"),
+])
+def test_reports_from_rollups_match_invoices(db, start, end):
+    ids = _sample_invoices(db)
+    c, p = db.add_customer("رضا", "", ""), db.add_product("مسواک", 50000)
+    for day in ("2024-02-29", "2024-03-01", "2024-03-31", "2024-04-30", "2024-05-01"):
+        db.add_invoice(day, [(p, 2, 50000, 0)], customer_id=c, vat_percent=9)
+    db.add_invoice("2024-04-15", [(p, 1, 50000, 0)], vat_percent=9)  # بدون مشتری
+    db.delete_invoice(ids[2])
+    customers = db.conn.execute("""
+        SELECT coalesce(customer_id,0), count(*), total(tax), total(total) FROM invoices
+        WHERE date BETWEEN ? AND ? GROUP BY 1""", (start, end)).fetchall()
+    products = db.conn.execute("""
+        SELECT coalesce(it.product_id,0), total(it.quantity), total(it.discount), total(it.tax), total(it.total)
+        FROM invoice_items it JOIN invoices i ON i.id = it.invoice_id WHERE i.date BETWEEN ? AND ? GROUP BY 1""", (start, end)).fetchall()
+    nonzero = lambda rows: sorted(r for r in rows if r[-1])  # فاکتور حذف‌شده ردیف صفر باقی می‌گذارد
+    assert nonzero((r[0], *r[2:]) for r in sales_by_customer(db, start, end)) == sorted(customers)
+    assert nonzero((r[0], *r[2:]) for r in sales_by_product(db, start, end)) == sorted(products)
+
+# --- مهاجرت طرح ---
+def test_invoice_dates_migrated_to_iso(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE invoices (id INTEGER PRIMARY KEY AUTOINCREMENT, customer TEXT, date TEXT, subtotal REAL, tax REAL, total REAL)")
+    conn.executemany("INSERT INTO invoices (customer, date, subtotal, tax, total) VALUES (?,?,?,?,?)",
+                     [("الف", "2024/03/20", 100, 9, 109), ("ب", "2024-03-21", 200, 18, 218)])
+    conn.commit(); conn.close()
+
+    db = Database(path)
+    try:
+        dates = [r[0] for r in db.conn.execute("SELECT date FROM invoices ORDER BY id")]
+        assert dates == ["2024-03-20", "2024-03-21"]
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+        assert db.conn.execute("SELECT invoices, total FROM agg_daily WHERE day='2024-03-20'").fetchone() == (1, 109)
+        assert db.conn.execute("SELECT invoices, total FROM agg_customer_month WHERE month='2024-03'").fetchone() == (2, 327)
+    finally:
+        db.close()
+
@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+from app import settings as settings_mod
+from app.db import Database
+from app.lang import LANGUAGES, get_strings
+
+def _stored(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT key, value FROM settings"))
+    finally:
+        conn.close()
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "s.db")
+
+def test_ini_defaults_until_stored(path):
+    db = Database(path)
+    try:
+        s = db.settings
+        assert s.get("vat_percent") == "9" and s.get("sqlite.db_file") == "data.db"
+        assert s.stored("company_name_fa") is None  # پیش‌فرض INI مقدار این دیتابیس نیست
+        s.set("company_name_fa", "شرکت الف")
+        assert s.get("company_name_fa") == "شرکت الف" and s.stored("company_name_fa") == "شرکت الف"
+    finally:
+        db.close()
+
+def test_set_is_cached_until_flush(path):
+    db = Database(path)
+    try:
+        seen = []
+        db.settings.subscribe(lambda key, value: seen.append((key, value)))
+        db.set_setting("vat_percent", 10)
+        db.set_setting("vat_percent", "10")  # بدون تغییر: نه listener نه نوشتن
+        db.set_setting("lang", "en")
+        assert seen == [("vat_percent", "10"), ("lang", "en")]
+        assert db.get_setting("vat_percent") == "10" and db.settings.pending() == 2
+        assert _stored(path) == {}
+        assert db.settings.flush() == 2 and db.settings.flush() == 0
+        assert _stored(path) == {"vat_percent": "10", "lang": "en"}
+    finally:
+        db.close()
+
+def test_flush_batch(path, monkeypatch):
+    monkeypatch.setattr(settings_mod, "FLUSH_BATCH", 3)
+    db = Database(path)
+    try:
+        for i in range(3):
+            db.set_setting(f"k{i}", i)
+        assert db.settings.pending() == 0 and len(_stored(path)) == 3
+    finally:
+        db.close()
+
+def test_close_flushes(path):
+    db = Database(path)
+    db.set_setting("currency_symbol", "تومان")
+    db.close()
+    db = Database(path)
+    try:
+        assert db.get_setting("currency_symbol") == "تومان"
+    finally:
+        db.close()
+
+def test_reload_drops_pending_and_reads_database(path):
+    db = Database(path)
+    try:
+        db.set_setting("vat_percent", 10); db.settings.flush()
+        db.set_setting("lang", "en")  # ذخیره‌نشده
+        other = sqlite3.connect(path)  # مانند بازیابی نسخه پشتیبان از بیرون کش
+        other.execute("UPDATE settings SET value='12' WHERE key='vat_percent'"); other.commit(); other.close()
+        assert db.get_setting("vat_percent") == "10"
+        db.settings.reload()
+        assert db.get_setting("vat_percent") == "12" and db.get_setting("lang") == "fa"
+        assert db.settings.pending() == 0 and db.settings.stored("lang") is None
+    finally:
+        db.close()
+
+def test_failed_flush_keeps_changes(path):
+    db = Database(path)
+    try:
+        db.set_setting("vat_percent", 10)
+        with db.transaction() as conn:
+            conn.execute("DROP TABLE settings")
+        with pytest.raises(sqlite3.OperationalError):
+            db.settings.flush()
+        assert db.settings.pending() == 1 and db.get_setting("vat_percent") == "10"
+        with db.transaction() as conn:
+            conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        assert db.settings.flush() == 1
+    finally:
+        db.close()
+
+def test_strings_shared_and_read_only():
+    assert LANGUAGES == ("fa", "en")
+    assert get_strings("FA") is get_strings("fa") and get_strings("de") is get_strings("en")
+    assert get_strings("fa").keys() == get_strings("en").keys()
+    with pytest.raises(TypeError):
+        get_strings("en")["status_ready"] = "x"
@@ -0,0 +1,80 @@
+import os
+import threading
+
+import pytest
+
+from app import workspace as workspace_mod
+from app.db import Database
+from app.workspace import Workspace, WorkspaceError, WorkspaceManager
+
+def test_name_from_file_until_company_name_is_set(tmp_path):
+    path = str(tmp_path / "acme.db")
+    ws = Workspace(path)
+    try:
+        assert ws.db.get_setting("company_name_fa")  # پیش‌فرض نمونه settings.ini
+        assert ws.name == "acme" and ws.label == "acme (acme.db)"
+        ws.db.set_setting("company_name_fa", "شرکت آلفا")
+        assert ws.name == "شرکت آلفا"
+    finally:
+        ws.close()
+    ws = Workspace(path)
+    try:
+        assert ws.name == "شرکت آلفا" and os.path.basename(ws.path) == "acme.db"
+    finally:
+        ws.close()
+
+def test_close_waits_for_catalog_loader(tmp_path):
+    errors = []
+    hook, threading.excepthook = threading.excepthook, lambda args: errors.append(args.exc_value)
+    try:
+        ws = Workspace(str(tmp_path / "big.db"))
+        with ws.db.transaction():
+            ws.db.add_customers_many([(f"مشتری {i}", "", "") for i in range(50000)])
+        catalog = ws.catalog("customers")  # بارگذاری روی ترد پس‌زمینه
+        ws.close()
+        assert not catalog._loader.is_alive() and errors == []
+    finally:
+        threading.excepthook = hook
+
+def _company(path, name, invoices):
+    db = Database(path)
+    db.set_setting("company_name_fa", name)
+    c = db.add_customer("علی", "", ""); p = db.add_product("شامپو", 1000)
+    for day, qty in invoices:
+        db.add_invoice(day, [(p, qty, 1000, 0)], customer_id=c, vat_percent=0)
+    db.close()
+    return path
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = WorkspaceManager()
+    manager.open(_company(str(tmp_path / "a.db"), "الف", [("2024-03-19", 1), ("2024-03-20", 2), ("2024-04-25", 1)]))
+    manager.open(_company(str(tmp_path / "b.db"), "ب", [("2024-04-20", 3)]))
+    yield manager
+    manager.close_all()
+
+def test_consolidated_by_company(manager):
+    rows = list(manager.sales_by_company("2024-03-20", "2024-04-20"))
+    assert [(r[0], r[1], r[5]) for r in rows] == [("ب (b.db)", 1, 3000), ("الف (a.db)", 1, 2000)]
+    assert [r[1] for r in manager.sales_by_company("2025-01-01", "2025-01-31")] == [0, 0]
+
+def test_consolidated_by_jalali_month(manager):
+    # 1403/01/01 = 2024-03-20 و 1403/02/01 = 2024-04-20
+    rows = list(manager.sales_by_jalali_month("2024-03-01", "2024-04-30"))
+    assert [(r[0], r[1], r[5]) for r in rows] == [(140212, 1, 1000), (140301, 1, 2000), (140302, 2, 4000)]
+
+def test_consolidated_merges_names_across_files(manager):
+    assert [tuple(r) for r in manager.sales_by_customer("2024-03-20", "2024-04-30")] == [("علی", 2, 3, 0, 6000)]
+    assert [tuple(r) for r in manager.sales_by_product("2024-03-01", "2024-04-30")] == [("شامپو", 2, 7, 0, 0, 7000)]
+
+def test_consolidated_follows_open_and_close(manager, tmp_path):
+    assert len(list(manager.sales_by_company("2024-01-01", "2024-12-31"))) == 2
+    manager.open(_company(str(tmp_path / "c.db"), "ج", []), activate=False)
+    assert len(list(manager.sales_by_company("2024-01-01", "2024-12-31"))) == 3
+    manager.close(str(tmp_path / "a.db"))
+    assert [r[0] for r in manager.sales_by_company("2024-01-01", "2024-12-31")] == ["ب (b.db)", "ج (c.db)"]
+
+def test_consolidated_attach_limit(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace_mod, "MAX_ATTACHED", 1)
+    with pytest.raises(WorkspaceError, match="حداکثر 1"):
+        manager.sales_by_company("2024-01-01", "2024-12-31")